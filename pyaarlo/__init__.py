@@ -1,18 +1,27 @@
 import base64
 import datetime
+import hashlib
+import json
 import logging
 import os
 import pprint
 import threading
 import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import partial
 
 from .backend import ArloBackEnd
 from .background import ArloBackground
-from .base import ArloBase
+from .base import ArloBase, index_automations
+from .callbacks import ArloCallbacks
 from .camera import ArloCamera
 from .cfg import ArloCfg
 from .constant import (
+    AUTOMATION_PATH,
     BLANK_IMAGE,
+    DEFINITIONS_CHUNK_SIZE,
+    DEFINITIONS_PATH,
     DEVICES_PATH,
     FAST_REFRESH_INTERVAL,
     MODEL_ESSENTIAL_SPOTLIGHT,
@@ -45,7 +54,16 @@ from .constant import (
 from .doorbell import ArloDoorBell
 from .light import ArloLight
 from .media import ArloMediaLibrary
-from .storage import ArloStorage
+from .metrics import ArloMetrics, ArloMetricsServer
+from .ping import ArloPinger
+from .profiler import ArloProfiler
+from .registry import ArloDeviceRegistry
+from .startup import ArloStartup
+from .storage import ArloSqliteStorage, ArloStorage
+from .telemetry import ArloTelemetry
+from .timers import ArloTimerWheel
+from .tracing import ArloTracer
+from .warmstart import ArloWarmStart
 from .location import ArloLocation
 from .sensor import ArloSensor
 from .util import time_to_arlotime
@@ -78,6 +96,33 @@ class PyArlo(object):
       you can lower this value.
     * **save_state** - Store device state across restarts. Default `True`.
     * **state_file** - Where to store state. Default is `${storage_dir}/${name.}pickle`
+    * **snapshot_storage** - Make device state copy-on-write so attribute reads never wait on the event
+      thread or a state save. Writes cost a little more. Default `False`.
+    * **state_db** - Keep device state, and a history of attribute changes, in a SQLite database.
+      Default `False`.
+    * **state_db_file** - Where to store the database. Default is `${storage_dir}/${name}.sqlite`
+    * **history_days** - How many days of attribute history to keep. `0` means no limit. Default `7`.
+    * **history_max_rows** - Most attribute changes to keep. `0` means no limit. Default `100000`.
+    * **warm_start** - Save the device list and media library index and, on the next start, rebuild the
+      devices from them straight away. The login and refresh then happen in the background. Needs `save_state`.
+      Default `False`.
+    * **max_parallel** - Size of the pool used to refresh devices in parallel. Requests to Arlo are still sent
+      one at a time, the pool lets devices wait for their bases and events at the same time. Default `4`.
+    * **group_pings** - Ping base stations that share an xcloud id with one request instead of one each.
+      Default `False`.
+    * **ping_quiet_time** - Only ping a base station once it has been quiet for this many seconds, any packet
+      from it shows it is still connected. `0` pings every time. Default `0`.
+    * **fast_lane** - Resources and attributes whose packets are handled on a thread of their own so they don't
+      queue behind slow background jobs. Under an `ArloManager` every account shares one fast lane thread. An empty
+      list turns this off. Default `['buttonPressed', 'motionDetected']`.
+    * **telemetry_size** - Number of samples of battery level, signal strength and ambient sensor readings to keep
+      in memory for each device. `0` disables it. Default `0`.
+    * **trace_events** - Time event packets from when they arrive to when their callbacks run and estimate the
+      clock skew against Arlo's servers, see `event_trace`. Default `False`.
+    * **metrics_port** - Serve metrics about requests, events, background jobs, downloads and state saves in
+      the Prometheus text format on `http://metrics_host:metrics_port/metrics`. `0` turns metrics off.
+      Default `0`.
+    * **metrics_host** - Address the metrics are served on. Default `127.0.0.1`.
     * **refresh_devices_every** - Time, in hours, to refresh the device list from Arlo. This can help keep the login
       from timing out.
     * **stream_timeout** - Time, in seconds, for the event stream to close after receiving no packets. 0 means
@@ -157,13 +202,22 @@ class PyArlo(object):
     def __init__(self, **kwargs):
         """Constructor for the PyArlo object."""
         # get this out quick
+        self._profiler = ArloProfiler()
         self.info(f"pyarlo {__version__} starting...")
 
         # core values
         self._last_error = None
+        self._startup_timings = {}
+        self._started = False
+        self._refreshed = False
+        self._warm_pending = False
 
-        # Set up the config first.
+        # Set up the config first. An ArloManager passes itself in so we
+        # can share its threads.
+        self._manager = kwargs.pop("manager", None)
         self._cfg = ArloCfg(self, **kwargs)
+        self._metrics = ArloMetrics(self._cfg.metrics_port != 0)
+        self._metrics_server = None
 
         # Create storage/scratch directory.
         if self._cfg.save_state or self._cfg.dump or self._cfg.save_session:
@@ -174,21 +228,59 @@ class PyArlo(object):
                 self.warning(f"Problem creating {self._cfg.storage_dir}")
 
         # Create remaining components.
-        self._bg = ArloBackground(self)
-        self._st = ArloStorage(self)
-        self._be = ArloBackEnd(self)
+        if self._manager is not None:
+            self._bg = ArloBackground(self, self._manager.worker)
+            self._pool = self._manager.share_pool(self._cfg.max_parallel)
+        else:
+            self._bg = ArloBackground(self)
+            self._pool = ThreadPoolExecutor(max_workers=self._cfg.max_parallel, thread_name_prefix="ArloWorker")
+        if not self._cfg.fast_lane:
+            self._fast_bg = None
+        elif self._manager is not None:
+            self._fast_bg = ArloBackground(self, self._manager.fast_worker)
+        else:
+            self._fast_bg = ArloBackground(self, name="ArloFastLane")
+        self._pinger = ArloPinger(self, self._pool)
+        if self._manager is not None:
+            self._timers = self._manager.share_timers(self._bg.run)
+        else:
+            self._timers = ArloTimerWheel(self, dispatch=self._bg.run)
+        if self._cfg.state_db:
+            self._st = ArloSqliteStorage(self)
+        else:
+            self._st = ArloStorage(self)
+        self._tm = ArloTelemetry(self) if self._cfg.telemetry_size else None
+        self._tracer = ArloTracer(self._cfg.trace_events)
+
+        # With a warm start snapshot we log in later, in the background.
+        self._warm = ArloWarmStart(self)
+        snapshot = self._warm.load() if self._cfg.warm_start else None
+        self._be = ArloBackEnd(self, login=snapshot is None)
         self._ml = ArloMediaLibrary(self)
+        if self._metrics.enabled:
+            self._metrics.add_collector(self._collect_metrics)
+            try:
+                self._metrics_server = ArloMetricsServer(self, self._metrics, self._cfg.metrics_host,
+                                                         self._cfg.metrics_port)
+            except OSError as e:
+                self.error(f"metrics: can't listen on {self._cfg.metrics_port}: {e}")
 
         # Make sure they are empty.
-        self._locations = []
-        self._bases = []
-        self._cameras = []
-        self._lights = []
-        self._doorbells = []
-        self._sensors = []
+        self._registry = ArloDeviceRegistry()
+        self._locations = self._registry.devices("locations")
+        self._bases = self._registry.devices("bases")
+        self._cameras = self._registry.devices("cameras")
+        self._lights = self._registry.devices("lights")
+        self._doorbells = self._registry.devices("doorbells")
+        self._sensors = self._registry.devices("sensors")
+        self._devices = []
+        self._device_hashes = {}
+        self._device_cbs = ArloCallbacks("*")
+        self._location_data = {}
 
         # Failed to login, then stop now!
-        if not self._be.is_connected:
+        if snapshot is None and not self._be.is_connected:
+            self._profiler.finish()
             return
 
         self._lock = threading.Condition()
@@ -209,123 +301,178 @@ class PyArlo(object):
         # Get locations for multi location sites.
         # Get devices, fill local db, and create device instance.
         self.info("pyaarlo starting")
-        self._started = False
-        if self._be.multi_location:
-            self._refresh_locations()
-        self._refresh_devices()
+        if snapshot is not None:
+            # Serve what we saved last time and bring it up to date in the
+            # background.
+            self._warm_pending = True
+            with self._profiler.phase("restore"):
+                self._restore(snapshot)
+            threading.Thread(target=self._reconcile, name="ArloReconcile", daemon=True).start()
+        else:
+            if self._be.multi_location:
+                with self._profiler.phase("locations"):
+                    self._refresh_locations()
+            with self._profiler.phase("devices"):
+                self._refresh_devices()
+            self._start(self._cfg.synchronous_mode)
 
+        # Wait for initial refresh
+        if self._cfg.wait_for_initial_setup:
+            with self._lock:
+                while not self._started:
+                    self.debug("waiting for initial setup...")
+                    self._lock.wait(1)
+            self.debug("setup finished...")
+
+    def _create_devices(self):
+        """Create device objects from the device list."""
+        self._device_hashes = {}
         for device in self._devices:
-            dname = device.get("deviceName")
-            dtype = device.get("deviceType")
-            device_state = device.get("state", "unknown").lower()
-            if device_state not in VALID_DEVICE_STATES:
-                self.info(f"skipping {dname}: state is {device_state}")
-                continue
+            self._device_hashes[device.get("deviceId", None)] = self._device_hash(device)
+            self._create_device(device)
 
-            # This needs it's own code now... Does no parent indicate a base station???
-            if (
-                dtype == "basestation"
-                or dtype == "arlobridge"
-                or dtype.lower() == 'hub'
-                or device.get("modelId") == "ABC1000"
-                or device.get("modelId").startswith(MODEL_GO)
-                or dtype == "arloq"
-                or dtype == "arloqs"
-            ):
-                self._bases.append(ArloBase(dname, self, device))
-
-            # Newer devices can connect directly to wifi and can be its own base station,
-            # it can also be assigned to a real base station
-            if device.get("modelId").startswith((
-                    MODEL_WIRED_VIDEO_DOORBELL,
-                    MODEL_PRO_3_FLOODLIGHT,
-                    MODEL_PRO_4,
-                    MODEL_PRO_5,
-                    MODEL_ESSENTIAL_SPOTLIGHT,
-                    MODEL_ESSENTIAL_XL_SPOTLIGHT,
-                    MODEL_ESSENTIAL_INDOOR,
-                    MODEL_ESSENTIAL_INDOOR_GEN2_2K,
-                    MODEL_ESSENTIAL_INDOOR_GEN2_HD,
-                    MODEL_ESSENTIAL_XL_OUTDOOR_GEN2_2K,
-                    MODEL_ESSENTIAL_XL_OUTDOOR_GEN2_HD,
-                    MODEL_ESSENTIAL_OUTDOOR_GEN2_2K,
-                    MODEL_ESSENTIAL_OUTDOOR_GEN2_HD,
-                    MODEL_WIRED_VIDEO_DOORBELL_GEN2_HD,
-                    MODEL_WIRED_VIDEO_DOORBELL_GEN2_2K,
-                    MODEL_ESSENTIAL_VIDEO_DOORBELL,
-                    MODEL_GO_2
-            )):
-                parent_id = device.get("parentId", None)
-                if parent_id is None or parent_id == device.get("deviceId", None):
-                    self._bases.append(ArloBase(dname, self, device))
-
-            if (
-                dtype == "camera"
-                or dtype == "arloq"
-                or dtype == "arloqs"
-                or device.get("modelId").startswith((
-                    MODEL_GO,
-                    MODEL_WIRED_VIDEO_DOORBELL,
-                    MODEL_WIRED_VIDEO_DOORBELL_GEN2_HD,
-                    MODEL_WIRED_VIDEO_DOORBELL_GEN2_2K,
-                    MODEL_ESSENTIAL_VIDEO_DOORBELL
-                ))
-            ):
-                self._cameras.append(ArloCamera(dname, self, device))
-            if dtype == "doorbell":
-                self._doorbells.append(ArloDoorBell(dname, self, device))
-            if dtype == "lights":
-                self._lights.append(ArloLight(dname, self, device))
-            if dtype == "sensors":
-                self._sensors.append(ArloSensor(dname, self, device))
-
-        # Save out unchanging stats!
+    def _create_device(self, device):
+        """Create the objects for a device list entry.
+
+        One entry can produce more than one object, a base station and a
+        camera for example.
+
+        :return: A list of the objects created.
+        """
+        created = []
+        dname = device.get("deviceName")
+        dtype = device.get("deviceType")
+        device_state = device.get("state", "unknown").lower()
+        if device_state not in VALID_DEVICE_STATES:
+            self.info(f"skipping {dname}: state is {device_state}")
+            return created
+
+        def add(kind, obj):
+            created.append(self._registry.add(kind, obj))
+            self._device_event(obj, "added")
+
+        # This needs it's own code now... Does no parent indicate a base station???
+        if (
+            dtype == "basestation"
+            or dtype == "arlobridge"
+            or dtype.lower() == 'hub'
+            or device.get("modelId") == "ABC1000"
+            or device.get("modelId").startswith(MODEL_GO)
+            or dtype == "arloq"
+            or dtype == "arloqs"
+        ):
+            add("bases", ArloBase(dname, self, device))
+
+        # Newer devices can connect directly to wifi and can be its own base station,
+        # it can also be assigned to a real base station
+        if device.get("modelId").startswith((
+                MODEL_WIRED_VIDEO_DOORBELL,
+                MODEL_PRO_3_FLOODLIGHT,
+                MODEL_PRO_4,
+                MODEL_PRO_5,
+                MODEL_ESSENTIAL_SPOTLIGHT,
+                MODEL_ESSENTIAL_XL_SPOTLIGHT,
+                MODEL_ESSENTIAL_INDOOR,
+                MODEL_ESSENTIAL_INDOOR_GEN2_2K,
+                MODEL_ESSENTIAL_INDOOR_GEN2_HD,
+                MODEL_ESSENTIAL_XL_OUTDOOR_GEN2_2K,
+                MODEL_ESSENTIAL_XL_OUTDOOR_GEN2_HD,
+                MODEL_ESSENTIAL_OUTDOOR_GEN2_2K,
+                MODEL_ESSENTIAL_OUTDOOR_GEN2_HD,
+                MODEL_WIRED_VIDEO_DOORBELL_GEN2_HD,
+                MODEL_WIRED_VIDEO_DOORBELL_GEN2_2K,
+                MODEL_ESSENTIAL_VIDEO_DOORBELL,
+                MODEL_GO_2
+        )):
+            parent_id = device.get("parentId", None)
+            if parent_id is None or parent_id == device.get("deviceId", None):
+                add("bases", ArloBase(dname, self, device))
+
+        if (
+            dtype == "camera"
+            or dtype == "arloq"
+            or dtype == "arloqs"
+            or device.get("modelId").startswith((
+                MODEL_GO,
+                MODEL_WIRED_VIDEO_DOORBELL,
+                MODEL_WIRED_VIDEO_DOORBELL_GEN2_HD,
+                MODEL_WIRED_VIDEO_DOORBELL_GEN2_2K,
+                MODEL_ESSENTIAL_VIDEO_DOORBELL
+            ))
+        ):
+            add("cameras", ArloCamera(dname, self, device))
+        if dtype == "doorbell":
+            add("doorbells", ArloDoorBell(dname, self, device))
+        if dtype == "lights":
+            add("lights", ArloLight(dname, self, device))
+        if dtype == "sensors":
+            add("sensors", ArloSensor(dname, self, device))
+
+        return created
+
+    def _save_totals(self):
         self._st.set(["ARLO", TOTAL_CAMERAS_KEY], len(self._cameras), prefix="aarlo")
         self._st.set(["ARLO", TOTAL_BELLS_KEY], len(self._doorbells), prefix="aarlo")
         self._st.set(["ARLO", TOTAL_LIGHTS_KEY], len(self._lights), prefix="aarlo")
 
-        # Subscribe to events.
-        self._be.start_monitoring()
+    def _start(self, wait):
+        """Start monitoring and do the initial refresh.
 
-        # Now ping the bases.
-        self._ping_bases()
+        :param wait: If `True` wait for the refresh to finish.
+        """
+        # Save out device counts.
+        self._save_totals()
 
-        # Initial config and state retrieval.
-        if self._cfg.synchronous_mode:
-            # Synchronous; run them one after the other
+        # Subscribe to events and ping the bases.
+        with self._profiler.phase("monitoring"):
+            self._be.start_monitoring()
+            self._ping_bases()
+
+        # Initial config and state retrieval. Synchronous mode waits for it
+        # here, otherwise it runs alongside everything else.
+        if wait:
             self.debug("getting initial settings")
-            self._refresh_bases(initial=True)
-            self._refresh_modes()
-            self._refresh_ambient_sensors()
-            self._refresh_doorbells()
-            self._ml.load()
-            self._refresh_camera_thumbnails(True)
-            self._refresh_camera_media(True)
-            self._initial_refresh_done()
+            self._run_startup()
         else:
-            # Asynchronous; queue them to run one after the other
             self.debug("queueing initial settings")
-            self._bg.run(self._refresh_bases, initial=True)
-            self._bg.run(self._refresh_modes)
-            self._bg.run(self._refresh_ambient_sensors)
-            self._bg.run(self._refresh_doorbells)
-            self._bg.run(self._ml.load)
-            self._bg.run(self._refresh_camera_thumbnails, wait=False)
-            self._bg.run(self._refresh_camera_media, wait=False)
-            self._bg.run(self._initial_refresh_done)
+            threading.Thread(target=self._run_startup, name="ArloStartup", daemon=True).start()
 
         # Register house keeping cron jobs.
         self.debug("registering cron jobs")
         self._bg.run_every(self._fast_refresh, FAST_REFRESH_INTERVAL)
         self._bg.run_every(self._slow_refresh, SLOW_REFRESH_INTERVAL)
 
-        # Wait for initial refresh
-        if self._cfg.wait_for_initial_setup:
-            with self._lock:
-                while not self._started:
-                    self.debug("waiting for initial setup...")
-                    self._lock.wait(1)
-            self.debug("setup finished...")
+    def _restore(self, snapshot):
+        """Rebuild the devices from a warm start snapshot.
+
+        Device state comes from the state file, this just needs to recreate
+        the objects. Everything is marked as started straight away.
+        """
+        self.debug("warm start: restoring")
+        self._create_locations(snapshot["locations"])
+        self._devices = snapshot["devices"]
+        self._create_devices()
+        self._ml.load(snapshot["library"])
+        self._initial_refresh_done()
+
+    def _reconcile(self):
+        """Log in and bring warm start objects up to date.
+
+        Only real changes trigger callbacks.
+        """
+        self.debug("warm start: reconciling")
+        logged_in = self._be.login()
+        self._warm_pending = False
+        if not logged_in:
+            self.error("warm start: failed to log in")
+            self._profiler.finish()
+            return
+        if self._be.multi_location:
+            with self._profiler.phase("locations"):
+                self._refresh_locations()
+        with self._profiler.phase("devices"):
+            self._refresh_devices()
+        self._start(True)
 
     def __repr__(self):
         # Representation string of object.
@@ -337,37 +484,121 @@ class PyArlo(object):
     def _v3_modes(self):
         return self.cfg.mode_api.lower() == "v3"
 
+    @staticmethod
+    def _device_hash(device):
+        return hashlib.sha1(json.dumps(device, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _device_objects(self, device_id):
+        """Return all the objects created for device id."""
+        objects = []
+        for kind in ("bases", "cameras", "doorbells", "lights", "sensors"):
+            obj = self._registry.lookup(kind, "device_id", device_id)
+            if obj is not None:
+                objects.append((kind, obj))
+        return objects
+
+    def _retire_device(self, device_id):
+        """Remove the objects for a device that has gone from the account."""
+        for kind, obj in self._device_objects(device_id):
+            self.info(f"removing {obj.name}")
+            self._registry.remove(kind, obj)
+            obj.detach()
+            self._device_event(obj, "removed")
+
+    def _device_event(self, obj, event):
+        """Tell the device callbacks about an added or removed object.
+
+        A failing callback is logged and doesn't stop the refresh.
+        """
+        for cb in self._device_cbs.get(event):
+            try:
+                cb(obj, event)
+            except Exception as e:
+                self.error(f"device-callback-error={type(e).__name__}\n{traceback.format_exc()}")
+
+    def _setup_devices(self, objects):
+        """Do the initial refresh for objects added after start up."""
+        for obj in objects:
+            if isinstance(obj, ArloBase):
+                self._pool.submit(self._refresh_base, obj, True)
+                self._pool.submit(self._refresh_base_mode, obj)
+            if isinstance(obj, ArloCamera):
+                self._pool.submit(obj.update_ambient_sensors)
+                self._pool.submit(obj.update_last_image)
+            if isinstance(obj, ArloDoorBell):
+                self._pool.submit(obj.update_silent_mode)
+
     def _refresh_devices(self):
         """Read in the devices list.
+
         This returns all devices known to the Arlo system. The newer devices
         include state information - battery levels etc - while the old devices
         don't. We update what we can.
+
+        Each entry is hashed and unchanged entries are skipped. Objects are
+        created for new devices and removed for devices that have gone.
         """
         url = DEVICES_PATH + "?t={}".format(time_to_arlotime())
-        self._devices = self._be.get(url)
-        if not self._devices:
+        devices = self._be.get(url)
+        if not devices:
             self.warning("No devices returned from " + url)
-            self._devices = []
-        self.vdebug(f"devices={pprint.pformat(self._devices)}")
-        
-        # Newer devices include information in this response. Be sure to update it.
-        for device in self._devices:
+            return
+        self.vdebug(f"devices={pprint.pformat(devices)}")
+
+        hashes = {}
+        added = []
+        for device in devices:
             device_id = device.get("deviceId", None)
+            digest = self._device_hash(device)
+            hashes[device_id] = digest
+            if self._device_hashes.get(device_id, None) == digest:
+                self.vdebug(f"{device_id} unchanged")
+                continue
+
+            objects = self._device_objects(device_id)
+            if not objects:
+                self.vdebug(f"creating {device_id} from device refresh")
+                added += self._create_device(device)
+                continue
+
+            # Newer devices include information in this response. Be sure to update it.
             props = device.get("properties", None)
-            self.vdebug(f"device-id={device_id}")
-            if device_id is not None and props is not None:
-                device = self.lookup_device_by_id(device_id)
-                if device is not None:
-                    self.vdebug(f"updating {device_id} from device refresh")
-                    device.update_resources(props)
-                else:
-                    self.vdebug(f"not updating {device_id} from device refresh")
+            if props is not None:
+                self.vdebug(f"updating {device_id} from device refresh")
+                for _, obj in objects:
+                    obj.update_resources(props)
+
+        removed = [device_id for device_id in self._device_hashes if device_id not in hashes]
+        for device_id in removed:
+            self._retire_device(device_id)
+
+        self._devices = devices
+        self._device_hashes = hashes
+        if added or removed:
+            self._save_totals()
+
+        # Devices found after the initial refresh need their own.
+        if added and self._refreshed:
+            self._setup_devices(added)
+
+    def _create_locations(self, location_data):
+        """Create location objects, keeping any we already have."""
+        existing = {location.device_id: location for location in self._locations}
+        for key, user in (("userLocations", True), ("sharedLocations", False)):
+            for attrs in location_data.get(key, []):
+                if existing.pop(attrs.get("locationId", "unknown"), None) is None:
+                    self._registry.add("locations", ArloLocation(self, attrs, user))
+        for location in existing.values():
+            self.info(f"removing {location.name}")
+            self._registry.remove("locations", location)
+            location.detach()
+        self._location_data = location_data
+        self.vdebug("locations={}".format(pprint.pformat(self._locations)))
 
     def _refresh_locations(self):
         """Retrieve location list from the backend
         """
         self.debug("_refresh_locations")
-        self._locations = []
 
         elocation_data = self._be.get(LOCATIONS_EMERGENCY_PATH)
         if elocation_data:
@@ -379,13 +610,8 @@ class PyArlo(object):
         location_data = self._be.get(url)
         if not location_data:
             self.warning("No locations returned from " + url)
-        else:
-            for user_location in location_data.get("userLocations", []):
-                self._locations.append(ArloLocation(self, user_location, True))
-            for shared_location in location_data.get("sharedLocations", []):
-                self._locations.append(ArloLocation(self, shared_location, False))
-
-        self.vdebug("locations={}".format(pprint.pformat(self._locations)))
+            return
+        self._create_locations(location_data)
 
     def _refresh_camera_thumbnails(self, wait=False):
         """Request latest camera thumbnails, called at start up."""
@@ -405,26 +631,108 @@ class PyArlo(object):
         for doorbell in self._doorbells:
             doorbell.update_silent_mode()
 
+    def _collect_metrics(self):
+        return [
+            ("background_queue_depth", self._bg.stats()["queued"], {}),
+            ("media_download_queue", self._ml.downloads_queued, {}),
+        ]
+
     def _ping_bases(self):
+        bases = []
         for base in self._bases:
             if base.has_capability(PING_CAPABILITY):
-                base.ping()
+                bases.append(base)
             else:
                 self.vdebug(f"NO ping to {base.device_id}")
+        self._pinger.ping(bases)
 
     def _refresh_bases(self, initial):
+        definitions = self._fetch_definitions()
         for base in self._bases:
-            base.update_modes(initial)
+            base.update_modes(initial, definitions)
             base.keep_ratls_open()
             base.update_states()
         for location in self._locations:
             location.update_modes(initial)
 
+    def _refresh_base(self, base, initial, definitions=None):
+        base.update_modes(initial, definitions)
+        base.keep_ratls_open()
+        base.update_states()
+
+    def _fetch_automations(self):
+        """Fetch the automation list once for all the bases that need it."""
+        if not any(base.uses_automations for base in self._bases):
+            return {}
+        return index_automations(self._be.get(AUTOMATION_PATH))
+
+    def _fetch_definitions(self):
+        """Fetch the mode definitions for all the bases that need them.
+
+        Several bases are asked for in each request.
+        """
+        unique_ids = [base.unique_id for base in self._bases if base.uses_definitions]
+        definitions = {}
+        for i in range(0, len(unique_ids), DEFINITIONS_CHUNK_SIZE):
+            chunk = unique_ids[i:i + DEFINITIONS_CHUNK_SIZE]
+            data = self._be.get(DEFINITIONS_PATH + "?uniqueIds={}".format(",".join(chunk)))
+            if data is None:
+                self.warning("failed to read mode definitions")
+                continue
+            definitions.update(data)
+        return definitions
+
+    def _refresh_base_mode(self, device, automations=None, definitions=None):
+        if automations is None:
+            device.update_modes()
+            device.update_mode()
+        else:
+            device.update_modes(definitions=definitions)
+            device.update_mode(automations)
+
+    def _run_startup(self):
+        """Run the initial refresh.
+
+        Each device is refreshed as its own task so devices are updated
+        concurrently, the phases make sure things happen in a sensible order.
+        """
+        wait = self._cfg.synchronous_mode
+        startup = ArloStartup(self, self._pool)
+        definitions = {}
+        startup.add_phase("definitions", [lambda: definitions.update(self._fetch_definitions())])
+        startup.add_phase("bases",
+                          [partial(self._refresh_base, base, True, definitions) for base in self._bases] +
+                          [partial(location.update_modes, True) for location in self._locations],
+                          depends_on=["definitions"])
+        automations = {}
+        startup.add_phase("automations", [lambda: automations.update(self._fetch_automations())],
+                          depends_on=["bases"])
+        startup.add_phase("modes",
+                          [partial(self._refresh_base_mode, base, automations, definitions) for base in self._bases] +
+                          [partial(self._refresh_base_mode, location) for location in self._locations],
+                          depends_on=["automations"])
+        startup.add_phase("ambient", [camera.update_ambient_sensors for camera in self._cameras])
+        startup.add_phase("doorbells", [doorbell.update_silent_mode for doorbell in self._doorbells])
+        startup.add_phase("library", [self._ml.load])
+        startup.add_phase("thumbnails", [partial(camera.update_last_image, wait) for camera in self._cameras])
+        startup.add_phase("media", [partial(camera.update_media, wait) for camera in self._cameras],
+                          depends_on=["library"])
+        self._startup_timings = startup.run()
+        for name, timing in self._startup_timings.items():
+            self.debug(f"startup: {name} took {timing['duration']:.3f}s")
+        self._refreshed = True
+        self._initial_refresh_done()
+        self._warm.save()
+        self._profiler.finish()
+        self.debug(f"startup: profile={self._profiler.json()}")
+
     def _refresh_modes(self):
         self.vdebug("refresh modes")
+        definitions = self._fetch_definitions()
+        automations = self._fetch_automations()
         for base in self._bases:
-            base.update_modes()
-            base.update_mode()
+            base.update_modes(definitions=definitions)
+            base.update_mode(automations)
         for location in self._locations:
             location.update_modes()
             location.update_mode()
@@ -476,15 +784,14 @@ class PyArlo(object):
         self._bg.run(self._refresh_bases, initial=False)
         self._bg.run(self._refresh_ambient_sensors)
 
-    def _initial_refresh(self):
-        self.debug("initial refresh")
-        self._bg.run(self._refresh_bases, initial=True)
-        self._bg.run(self._refresh_ambient_sensors)
-        self._bg.run(self._initial_refresh_done)
-
     def _initial_refresh_done(self):
-        self.debug("initial refresh done")
+        # A warm start finishes here twice, once from the snapshot and again
+        # after reconciling. Only the first counts.
         with self._lock:
+            if self._started:
+                return
+            self.debug("initial refresh done")
+            self._profiler.ready()
             self._started = True
             self._lock.notify_all()
 
@@ -500,7 +807,15 @@ class PyArlo(object):
         with the new connection. See https://github.com/twrecked/pyaarlo/issues/71
         """
         self._st.save()
+        if self._started:
+            self._warm.save()
+        if self._metrics_server is not None:
+            self._metrics_server.stop()
         self._bg.stop()
+        if self._fast_bg is not None:
+            self._fast_bg.stop()
+        self._timers.stop()
+        self._pool.shutdown(wait=False)
         self._ml.stop()
         if logout:
             self._be.logout()
@@ -522,6 +837,10 @@ class PyArlo(object):
     def devices(self):
         return self._devices
 
+    @property
+    def location_data(self):
+        return self._location_data
+
     @property
     def device_id(self):
         return "ARLO"
@@ -538,10 +857,24 @@ class PyArlo(object):
     def bg(self):
         return self._bg
 
+    @property
+    def fast_bg(self):
+        """The background worker for `fast_lane` packets, `None` if there isn't one."""
+        return self._fast_bg
+
+    @property
+    def timers(self):
+        """The timer wheel used for the motion and activity timeouts."""
+        return self._timers
+
     @property
     def st(self):
         return self._st
 
+    @property
+    def telemetry(self):
+        return self._tm
+
     @property
     def be(self):
         return self._be
@@ -552,8 +885,11 @@ class PyArlo(object):
 
     @property
     def is_connected(self):
-        """Returns `True` if the object is connected to the Arlo servers, `False` otherwise."""
-        return self._be.is_connected
+        """Returns `True` if the object is connected to the Arlo servers, `False` otherwise.
+
+        After a warm start this is also `True` while the login is still in progress.
+        """
+        return self._be.is_connected or self._warm_pending
 
     @property
     def cameras(self):
@@ -608,6 +944,83 @@ class PyArlo(object):
     def sensors(self):
         return self._sensors
 
+    @property
+    def manager(self):
+        """The `ArloManager` this account belongs to, or `None`."""
+        return self._manager
+
+    @property
+    def threads(self):
+        """The threads this account is running on its own.
+
+        Shared threads, from an `ArloManager`, aren't included.
+        """
+        threads = self._bg.threads + self._be.threads + self._ml.threads + self._timers.threads
+        if self._fast_bg is not None:
+            threads += self._fast_bg.threads
+        if self._metrics_server is not None:
+            threads += self._metrics_server.threads
+        for base in self._bases:
+            if base.ml is not None:
+                threads += base.ml.threads
+        return threads
+
+    @property
+    def pool(self):
+        """The worker pool shared by jobs that run in parallel."""
+        return self._pool
+
+    @property
+    def startup_timings(self):
+        """Returns how long each phase of the initial refresh took.
+
+        See `ArloStartup.timings` for the format.
+        """
+        return self._startup_timings
+
+    @property
+    def profiler(self):
+        """The startup profiler, see `ArloProfiler`."""
+        return self._profiler
+
+    @property
+    def startup_profile(self):
+        """Returns where the time went while starting up.
+
+        See `ArloProfiler.report` for the format, use `profiler.json()` to get
+        it as JSON.
+        """
+        return self._profiler.report()
+
+    @property
+    def tracer(self):
+        return self._tracer
+
+    @property
+    def metrics(self):
+        """The metrics registry, see `ArloMetrics`."""
+        return self._metrics
+
+    @property
+    def event_trace(self):
+        """Returns per stage event latency histograms and the server clock skew, see `ArloTracer.stats`."""
+        return self._tracer.stats()
+
+    @property
+    def dispatch_latency(self):
+        """Returns how long event packets waited for their callbacks, see `ArloLatency.stats`."""
+        return self._be.latency.stats()
+
+    @property
+    def ping_stats(self):
+        """Returns how many base station pings were sent and saved, see `ArloPinger.stats`."""
+        return self._pinger.stats()
+
+    @property
+    def topology_version(self):
+        """Changes whenever devices are added or removed."""
+        return self._registry.version
+
     @property
     def blank_image(self):
         """Return a binary representation of a blank image.
@@ -624,10 +1037,7 @@ class PyArlo(object):
         :return: A camera object or 'None' on failure.
         :rtype: ArloCamera
         """
-        camera = list(filter(lambda cam: cam.device_id == device_id, self.cameras))
-        if camera:
-            return camera[0]
-        return None
+        return self._registry.lookup("cameras", "device_id", device_id)
 
     def lookup_camera_by_name(self, name):
         """Return the camera called `name`.
@@ -636,10 +1046,7 @@ class PyArlo(object):
         :return: A camera object or 'None' on failure.
         :rtype: ArloCamera
         """
-        camera = list(filter(lambda cam: cam.name == name, self.cameras))
-        if camera:
-            return camera[0]
-        return None
+        return self._registry.lookup("cameras", "name", name)
 
     def lookup_doorbell_by_id(self, device_id):
         """Return the doorbell referenced by `device_id`.
@@ -648,10 +1055,7 @@ class PyArlo(object):
         :return: A doorbell object or 'None' on failure.
         :rtype: ArloDoorBell
         """
-        doorbell = list(filter(lambda cam: cam.device_id == device_id, self.doorbells))
-        if doorbell:
-            return doorbell[0]
-        return None
+        return self._registry.lookup("doorbells", "device_id", device_id)
 
     def lookup_doorbell_by_name(self, name):
         """Return the doorbell called `name`.
@@ -660,10 +1064,7 @@ class PyArlo(object):
         :return: A doorbell object or 'None' on failure.
         :rtype: ArloDoorBell
         """
-        doorbell = list(filter(lambda cam: cam.name == name, self.doorbells))
-        if doorbell:
-            return doorbell[0]
-        return None
+        return self._registry.lookup("doorbells", "name", name)
 
     def lookup_light_by_id(self, device_id):
         """Return the light referenced by `device_id`.
@@ -672,10 +1073,7 @@ class PyArlo(object):
         :return: A light object or 'None' on failure.
         :rtype: ArloDoorBell
         """
-        light = list(filter(lambda cam: cam.device_id == device_id, self.lights))
-        if light:
-            return light[0]
-        return None
+        return self._registry.lookup("lights", "device_id", device_id)
 
     def lookup_light_by_name(self, name):
         """Return the light called `name`.
@@ -684,10 +1082,7 @@ class PyArlo(object):
         :return: A light object or 'None' on failure.
         :rtype: ArloDoorBell
         """
-        light = list(filter(lambda cam: cam.name == name, self.lights))
-        if light:
-            return light[0]
-        return None
+        return self._registry.lookup("lights", "name", name)
 
     def lookup_base_station_by_id(self, device_id):
         """Return the base_station referenced by `device_id`.
@@ -696,10 +1091,7 @@ class PyArlo(object):
         :return: A base_station object or 'None' on failure.
         :rtype: ArloDoorBell
         """
-        base_station = list(filter(lambda cam: cam.device_id == device_id, self.base_stations))
-        if base_station:
-            return base_station[0]
-        return None
+        return self._registry.lookup("bases", "device_id", device_id)
 
     def lookup_base_station_by_name(self, name):
         """Return the base_station called `name`.
@@ -708,20 +1100,38 @@ class PyArlo(object):
         :return: A base_station object or 'None' on failure.
         :rtype: ArloDoorBell
         """
-        base_station = list(filter(lambda cam: cam.name == name, self.base_stations))
-        if base_station:
-            return base_station[0]
+        return self._registry.lookup("bases", "name", name)
+
+    def _lookup_device(self, field, value):
+        for kind in ("bases", "cameras", "doorbells", "lights"):
+            device = self._registry.lookup(kind, field, value)
+            if device is not None:
+                return device
         return None
 
     def lookup_device_by_id(self, device_id):
-        device = self.lookup_base_station_by_id(device_id)
-        if device is None:
-            device = self.lookup_camera_by_id(device_id)
-        if device is None:
-            device = self.lookup_doorbell_by_id(device_id)
-        if device is None:
-            device = self.lookup_light_by_id(device_id)
-        return device
+        """Return the base station, camera, doorbell or light referenced by `device_id`.
+
+        :param device_id: The device to look for
+        :return: A device object or 'None' on failure.
+        """
+        return self._lookup_device("device_id", device_id)
+
+    def lookup_device_by_unique_id(self, unique_id):
+        """Return the base station, camera, doorbell or light with unique id `unique_id`.
+
+        :param unique_id: The device to look for
+        :return: A device object or 'None' on failure.
+        """
+        return self._lookup_device("unique_id", unique_id)
+
+    def lookup_device_by_entity_id(self, entity_id):
+        """Return the base station, camera, doorbell or light with entity id `entity_id`.
+
+        :param entity_id: The device to look for
+        :return: A device object or 'None' on failure.
+        """
+        return self._lookup_device("entity_id", entity_id)
 
     def inject_response(self, response):
         """Inject a test packet into the event stream.
@@ -748,6 +1158,85 @@ class PyArlo(object):
     def add_attr_callback(self, attr, cb):
         pass
 
+    def add_device_callback(self, event, cb, weak=False):
+        """Add a callback to be triggered when devices are added or removed.
+
+        Devices can appear or go away whenever the device list is refreshed.
+        The callback is passed the device object and the event.
+
+        :param event: `added`, `removed` or `*` for both.
+        :param cb: Callback to run.
+        :param weak: Only hold a weak reference to the callback.
+        :return: An `ArloSubscription`, call its `unsubscribe` method to remove the callback.
+        """
+        return self._device_cbs.add(event, cb, weak)
+
+    def del_device_callback(self, event, cb):
+        """Remove a callback added with `add_device_callback`.
+
+        :return: `True` if the callback was found, `False` otherwise.
+        """
+        return self._device_cbs.remove(event, cb)
+
+    def _set_mode(self, target, mode):
+        start = time.monotonic()
+        error = None
+        try:
+            if isinstance(target, ArloBase):
+                success = target.set_mode(mode, wait_for="response")
+            else:
+                success = target.set_mode(mode)
+        except Exception as e:
+            self.error(f"set-mode-error={type(e).__name__}\n{traceback.format_exc()}")
+            success = False
+            error = type(e).__name__
+        return {
+            "success": success,
+            "mode": target.mode,
+            "duration": time.monotonic() - start,
+            "error": error,
+        }
+
+    def set_modes(self, modes, timeout=None):
+        """Change the mode of several locations and base stations at once.
+
+        Each change runs on a thread of its own so they all wait for their
+        replies at the same time, the requests themselves are still sent one
+        at a time. Location changes rejected because of a stale revision are
+        retried after reading the location's mode again.
+
+        For example::
+
+            arlo.set_modes({home: "armAway", shed: "armAway"})
+
+        :param modes: Dictionary of `ArloLocation` or `ArloBase` to mode.
+        :param timeout: Seconds to wait for all the changes, `None` waits for ever.
+        :return: Dictionary of target to result. Each result has `success`,
+                 the target's `mode` afterwards, how many seconds the change
+                 took (`duration`) and the name of any exception (`error`).
+        """
+        start = time.monotonic()
+        if not modes:
+            return {}
+        pool = ThreadPoolExecutor(max_workers=len(modes), thread_name_prefix="ArloSetModes")
+        futures = {target: pool.submit(self._set_mode, target, mode) for target, mode in modes.items()}
+        wait(futures.values(), timeout=timeout)
+        pool.shutdown(wait=False)
+
+        results = {}
+        for target, future in futures.items():
+            if future.done() and not future.cancelled():
+                results[target] = future.result()
+            else:
+                results[target] = {
+                    "success": False,
+                    "mode": target.mode,
+                    "duration": time.monotonic() - start,
+                    "error": "timeout",
+                }
+        self.debug(f"set-modes: {len(results)} targets in {time.monotonic() - start:.3f}s")
+        return results
+
     # TODO needs thinking about... track new cameras for example.
     def update(self, update_cameras=False, update_base_station=False):
         pass
@@ -19,6 +19,7 @@ import requests.adapters
 from enum import IntEnum
 from http.cookiejar import LWPCookieJar
 
+from .callbacks import ArloCallbacks, ArloSubscription
 from .constant import (
     AUTH_FINISH_PATH,
     AUTH_GET_FACTORID,
@@ -45,6 +46,8 @@ from .constant import (
     TRANSID_PREFIX,
     USER_AGENTS,
 )
+from .latency import ArloLatency
+from .metrics import endpoint_name
 from .sseclient import SSEClient
 from .tfa import Arlo2FAConsole, Arlo2FAImap, Arlo2FARestAPI
 from .util import days_until, now_strftime, time_to_arlotime, to_b64
@@ -71,17 +74,30 @@ class ArloBackEnd(object):
     _expires_in: int | None = None
     _needs_pairing: bool = False
 
-    def __init__(self, arlo):
+    def __init__(self, arlo, login=True):
 
         self._arlo = arlo
         self._lock = threading.Condition()
+        # The session isn't safe to share between threads, requests are
+        # made one at a time.
         self._req_lock = threading.Lock()
 
         self._dump_file = self._arlo.cfg.dump_file
         self._use_mqtt = False
 
         self._requests = {}
-        self._callbacks = {}
+        self._callbacks = ArloCallbacks("all")
+
+        # How long packets wait for their callbacks.
+        self._latency = ArloLatency()
+
+        # Resources and attributes that skip the background queue.
+        self._fast_lane_keys = self._arlo.cfg.fast_lane
+
+        # Devices we have heard from, and when.
+        self._seen_lock = threading.Condition()
+        self._seen = {}
+        self._unique_ids = {}
         self._resource_types = DEFAULT_RESOURCES
 
         self._load_session()
@@ -97,11 +113,21 @@ class ArloBackEnd(object):
 
         # login
         self._session = None
+        self._logged_in = False
         self._load_cookies()
-        self._logged_in = self._login()
+        if login:
+            self.login()
+
+    def login(self):
+        """Log in to Arlo.
+
+        Normally done when the back end is created, a warm start does it later.
+        """
+        with self._arlo.profiler.phase("login"):
+            self._logged_in = self._login()
         if not self._logged_in:
             self.debug("failed to log in")
-            return
+        return self._logged_in
 
     def _load_session(self):
         self._user_id = None
@@ -205,8 +231,10 @@ class ArloBackEnd(object):
             headers = {}
         if timeout is None:
             timeout = self._arlo.cfg.request_timeout
+        start = None
         try:
             with self._req_lock:
+                start = time.monotonic()
                 if host is None:
                     host = self._arlo.cfg.host
                 if authpost:
@@ -230,6 +258,7 @@ class ArloBackEnd(object):
                         cookies=cookies,
                     )
                     if stream is True:
+                        self._count_request(path, 200, start)
                         return 200, r
                 elif method == "PUT":
                     r = self._session.put(
@@ -246,8 +275,12 @@ class ArloBackEnd(object):
                     return 200, None
         except Exception as e:
             self._arlo.warning("request-error={}".format(type(e).__name__))
+            self._arlo.profiler.request()
+            self._count_request(path, "error", start)
             return 500, None
 
+        self._arlo.profiler.request(len(r.content or b""))
+        self._count_request(path, r.status_code, start, len(r.content or b""))
         try:
             if "application/json" in r.headers["Content-Type"]:
                 body = r.json()
@@ -288,6 +321,16 @@ class ArloBackEnd(object):
 
         return 500, None
 
+    def _count_request(self, path, status, start, size=0):
+        metrics = self._arlo.metrics
+        if not metrics.enabled:
+            return
+        endpoint = endpoint_name(path)
+        metrics.inc("requests_total", endpoint=endpoint, status=status)
+        metrics.inc("request_bytes_total", size, endpoint=endpoint)
+        if start is not None:
+            metrics.observe("request_seconds", time.monotonic() - start, endpoint=endpoint)
+
     def _request(
             self,
             path,
@@ -308,11 +351,28 @@ class ArloBackEnd(object):
     def gen_trans_id(self, trans_type=TRANSID_PREFIX):
         return trans_type + "!" + str(uuid.uuid4())
 
-    def _event_dispatcher(self, response):
+    def _fast_lane(self, resource, event):
+        if not self._fast_lane_keys or self._arlo.fast_bg is None:
+            return False
+        if resource in self._fast_lane_keys:
+            return True
+        props = event.get("properties", event)
+        return isinstance(props, dict) and not self._fast_lane_keys.isdisjoint(props.keys())
+
+    def _timed_callback(self, cb, lane, arrived, resource, event, trace=None):
+        self._latency.record(lane, time.monotonic() - arrived)
+        with self._arlo.tracer.attach(trace):
+            cb(resource=resource, event=event)
+
+    def _event_dispatcher(self, response, trace=None):
+        arrived = time.monotonic()
+        self._arlo.tracer.dispatch(trace, response)
 
         # get message type(s) and id(s)
         responses = []
         resource = response.get("resource", "")
+        if self._arlo.metrics.enabled:
+            self._arlo.metrics.inc("events_total", type=resource.split("/", 1)[0])
 
         err = response.get("error", None)
         if err is not None:
@@ -330,6 +390,10 @@ class ArloBackEnd(object):
         # See docs/packets for and idea of what we're parsing.
         #
 
+        # Whoever sent it is talking to us, a base relaying for its cameras
+        # for example.
+        self.device_seen(response.get("from", None))
+
         # Answer for async ping. Note and finish.
         # Packet type #1
         if resource.startswith("subscriptions/"):
@@ -416,17 +480,17 @@ class ArloBackEnd(object):
 
         # Now find something waiting for this/these.
         for device_id, resource, response in responses:
-            cbs = []
+            self.device_seen(device_id)
             self.debug("sending {} to {}".format(resource, device_id))
-            with self._lock:
-                if device_id and device_id in self._callbacks:
-                    cbs.extend(self._callbacks[device_id])
-                if "all" in self._callbacks:
-                    cbs.extend(self._callbacks["all"])
-            for cb in cbs:
-                self._arlo.bg.run(cb, resource=resource, event=response)
+            if self._fast_lane(resource, response):
+                bg, lane = self._arlo.fast_bg, "fast"
+            else:
+                bg, lane = self._arlo.bg, "normal"
+            for cb in self._callbacks.get(device_id):
+                bg.run(self._timed_callback, cb=cb, lane=lane, arrived=arrived, resource=resource, event=response,
+                       trace=trace)
 
-    def _event_handle_response(self, response):
+    def _event_handle_response(self, response, trace=None):
 
         # Debugging.
         if self._dump_file is not None:
@@ -442,7 +506,7 @@ class ArloBackEnd(object):
         )
 
         # Run the dispatcher to set internal state and run callbacks.
-        self._event_dispatcher(response)
+        self._event_dispatcher(response, trace)
 
         # is there a notify/post waiting for this response? If so, signal to waiting entity.
         tid = response.get("transId", None)
@@ -510,6 +574,8 @@ class ArloBackEnd(object):
             else:
                 self._sse_main()
             self.debug("exited the event loop")
+            if not self._stop_thread:
+                self._arlo.metrics.inc("event_stream_reconnects_total")
 
             # clear down and signal out
             with self._lock:
@@ -556,6 +622,7 @@ class ArloBackEnd(object):
         self.vdebug(f"mqtt: log={str(msg)}")
 
     def _mqtt_on_message(self, _client, _userdata, msg):
+        trace = self._arlo.tracer.receive()
         self.debug(f"mqtt: topic={msg.topic}")
         try:
             response = json.loads(msg.payload.decode("utf-8"))
@@ -567,7 +634,7 @@ class ArloBackEnd(object):
                 return
 
             # pass on to general handler
-            self._event_handle_response(response)
+            self._event_handle_response(response, trace)
 
         except json.decoder.JSONDecodeError as e:
             self.debug("reopening: json error " + str(e))
@@ -658,6 +725,7 @@ class ArloBackEnd(object):
                     break
 
                 # dig out response
+                trace = self._arlo.tracer.receive()
                 try:
                     response = json.loads(event.data)
                 except json.decoder.JSONDecodeError as e:
@@ -678,7 +746,7 @@ class ArloBackEnd(object):
                     continue
 
                 # pass on to general handler
-                self._event_handle_response(response)
+                self._event_handle_response(response, trace)
 
         except requests.exceptions.ConnectionError:
             self._arlo.warning("event loop timeout")
@@ -1087,14 +1155,21 @@ class ArloBackEnd(object):
                 debug=False,
             )
             self._session.cookies = self._cookies
+            if self._arlo.manager is not None:
+                self._arlo.manager.share_connections(self._session, curve)
 
             # Try to authenticate. We retry if it was a cloud flare
             # error or we failed to get the 2FA code.
-            success = self._auth()
-            if success == AuthResult.FAILED:
-                return False
+            with self._arlo.profiler.phase("auth"):
+                success = self._auth()
             if success == AuthResult.SUCCESS and self._validate() and self._pair_auth_code():
+                if self._arlo.manager is not None:
+                    self._arlo.manager.keep_connections(self._session, curve)
                 break
+            if self._arlo.manager is not None:
+                self._arlo.manager.drop_connections(self._session, curve)
+            if success == AuthResult.FAILED:
+                return False
             success = AuthResult.FAILED
             self.debug("login failed, trying another ecdh_curve")
 
@@ -1110,8 +1185,9 @@ class ArloBackEnd(object):
 
         # Grab a session. Needed for new session and used to check existing
         # session. (May not really be needed for existing but will fail faster.)
-        if not self._v2_session():
-            return False
+        with self._arlo.profiler.phase("session"):
+            if not self._v2_session():
+                return False
         return True
 
     def _notify(self, base, body, trans_id=None):
@@ -1159,6 +1235,42 @@ class ArloBackEnd(object):
         self.vdebug("finished transaction-->{}".format(tid))
         return response
 
+    def device_seen(self, device_id):
+        """Note that we have heard from a device.
+
+        :param device_id: The device id, or unique id, of the device.
+        """
+        if device_id is None:
+            return
+        with self._seen_lock:
+            device_id = self._unique_ids.get(device_id, device_id)
+            first = device_id not in self._seen
+            self._seen[device_id] = time.monotonic()
+            if first:
+                self._seen_lock.notify_all()
+
+    def last_seen(self, device_id):
+        """Return how many seconds ago we heard from a device, `None` if never."""
+        with self._seen_lock:
+            seen = self._seen.get(device_id, None)
+        return None if seen is None else time.monotonic() - seen
+
+    def wait_for_device(self, device_id, timeout):
+        """Wait until we have heard from a device.
+
+        :param device_id: The device to wait for.
+        :param timeout: How long to wait, in seconds.
+        :return: `True` if the device has been heard from, `False` if we timed out.
+        """
+        mend = time.monotonic() + timeout
+        with self._seen_lock:
+            while device_id not in self._seen:
+                mnow = time.monotonic()
+                if mnow >= mend:
+                    return False
+                self._seen_lock.wait(mend - mnow)
+            return True
+
     @property
     def is_connected(self):
         return self._logged_in
@@ -1190,6 +1302,12 @@ class ArloBackEnd(object):
         self.stop()
         self.put(LOGOUT_PATH)
 
+    def notify_wait_for(self, wait_for):
+        """Return what `notify` waits for when passed `wait_for`."""
+        if wait_for is None:
+            return "event" if self._arlo.cfg.synchronous_mode else "nothing"
+        return wait_for
+
     def notify(self, base, body, timeout=None, wait_for=None):
         """Send in a notification.
 
@@ -1212,9 +1330,7 @@ class ArloBackEnd(object):
         :param wait_for: what to wait for, either `None`, `event`, `response` or `nothing`.
         :return: either a response packet or an event packet
         """
-        if wait_for is None:
-            wait_for = "event" if self._arlo.cfg.synchronous_mode else "nothing"
-
+        wait_for = self.notify_wait_for(wait_for)
         if wait_for == "event":
             self.vdebug("notify+event running")
             tid = self._start_transaction()
@@ -1345,23 +1461,36 @@ class ArloBackEnd(object):
     def multi_location(self):
         return self._multi_location
 
-    def add_listener(self, device, callback):
-        with self._lock:
-            if device.device_id not in self._callbacks:
-                self._callbacks[device.device_id] = []
-            self._callbacks[device.device_id].append(callback)
-            if device.unique_id not in self._callbacks:
-                self._callbacks[device.unique_id] = []
-            self._callbacks[device.unique_id].append(callback)
-
-    def add_any_listener(self, callback):
-        with self._lock:
-            if "all" not in self._callbacks:
-                self._callbacks["all"] = []
-            self._callbacks["all"].append(callback)
+    def add_listener(self, device, callback, weak=False):
+        """Send events for device to callback.
+
+        Returns an `ArloSubscription` that will remove the callback.
+        """
+        with self._seen_lock:
+            self._unique_ids[device.unique_id] = device.device_id
+        return ArloSubscription(
+            self._callbacks.add(device.device_id, callback, weak).unsubscribe,
+            self._callbacks.add(device.unique_id, callback, weak).unsubscribe,
+        )
+
+    def add_any_listener(self, callback, weak=False):
+        return self._callbacks.add("all", callback, weak)
 
     def del_listener(self, device, callback):
-        pass
+        self._callbacks.remove(device.device_id, callback)
+        self._callbacks.remove(device.unique_id, callback)
+
+    def del_any_listener(self, callback):
+        self._callbacks.remove("all", callback)
+
+    @property
+    def latency(self):
+        return self._latency
+
+    @property
+    def threads(self):
+        """The event stream threads that are running."""
+        return [thread for thread in (self._event_thread,) if thread is not None and thread.is_alive()]
 
     def devices(self):
         return self.get(DEVICES_PATH + "?t={}".format(time_to_arlotime()))
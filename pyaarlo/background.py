@@ -3,56 +3,103 @@ import time
 import traceback
 
 
-class ArloBackgroundWorker(threading.Thread):
-    def __init__(self, arlo):
-        super().__init__()
+class ArloBackgroundWorker(object):
+    """Runs queued jobs on one or more threads.
+
+    Jobs belong to an owner, an `ArloBackground`. An owner only ever has one
+    job running at a time so a worker shared between several accounts
+    behaves, for each account, like a worker of its own. When jobs from
+    several owners are due at the same priority the owner that has waited
+    longest goes first, one busy account can't starve the rest.
+    """
+
+    def __init__(self, arlo, workers=1, name="ArloBackgroundWorker"):
         self._arlo = arlo
         self._id = 0
         self._lock = threading.Condition()
         self._queue = {}
+        self._busy = set()
+        self._turn = 0
+        self._last_turn = {}
+        self._stats = {}
         self._stopThread = False
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self.run, name=name if workers == 1 else f"{name}-{i}")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
 
     def _next_id(self):
         self._id += 1
         return str(self._id) + ":" + str(time.monotonic())
 
+    def _pick(self, prio, now):
+        # Of the jobs that are due, and whose owner isn't busy, pick the one
+        # whose owner went longest ago.
+        best = None
+        for key in sorted(self._queue[prio].keys()):
+            run_at, job_id = key
+            if run_at > now:
+                break
+            owner = self._queue[prio][key]["owner"]
+            if owner in self._busy:
+                continue
+            if best is None or self._last_turn.get(owner, 0) < self._last_turn.get(best[1], 0):
+                best = (key, owner)
+        return best
+
     def _run_next(self):
 
         # timeout in the future
-        timeout = int(time.monotonic() + 60)
+        now = int(time.monotonic())
+        timeout = now + 60
 
         # go by priority...
         for prio in sorted(self._queue.keys()):
-
-            # jobs in particular priority
-            for run_at, job_id in sorted(self._queue[prio].keys()):
-                if run_at <= int(time.monotonic()):
-                    job = self._queue[prio].pop((run_at, job_id))
-                    self._lock.release()
-
-                    # run it
-                    try:
-                        job["callback"](**job["args"])
-                    except Exception as e:
-                        self._arlo.error(
-                            "job-error={}\n{}".format(
-                                type(e).__name__, traceback.format_exc()
-                            )
+            best = self._pick(prio, now)
+            if best is not None:
+                (run_at, job_id), owner = best
+                job = self._queue[prio].pop((run_at, job_id))
+                self._busy.add(owner)
+                self._turn += 1
+                self._last_turn[owner] = self._turn
+                self._lock.release()
+
+                # run it
+                start = time.monotonic()
+                if owner is not None:
+                    owner.arlo.metrics.observe("background_lag_seconds", max(0.0, start - job["due"]))
+                try:
+                    job["callback"](**job["args"])
+                except Exception as e:
+                    arlo = owner.arlo if owner is not None else self._arlo
+                    arlo.error(
+                        "job-error={}\n{}".format(
+                            type(e).__name__, traceback.format_exc()
                         )
-
-                    # reschedule?
-                    self._lock.acquire()
-                    run_every = job.get("run_every", None)
-                    if run_every:
-                        run_at += run_every
-                        self._queue[prio][(run_at, job_id)] = job
-
-                    # start going through list again
-                    return None
-                else:
-                    if run_at < timeout:
-                        timeout = run_at
-                    break
+                    )
+
+                # reschedule?
+                self._lock.acquire()
+                stats = self._stats.setdefault(owner, {"jobs": 0, "busy": 0.0})
+                stats["jobs"] += 1
+                stats["busy"] += time.monotonic() - start
+                self._busy.discard(owner)
+                self._lock.notify_all()
+                run_every = job.get("run_every", None)
+                if run_every:
+                    run_at += run_every
+                    job["due"] += run_every
+                    self._queue[prio][(run_at, job_id)] = job
+
+                # start going through list again
+                return None
+
+            # Nothing runnable, when is the next job due?
+            for run_at, _ in self._queue[prio].keys():
+                if now < run_at < timeout:
+                    timeout = run_at
 
         return timeout
 
@@ -63,16 +110,20 @@ class ArloBackgroundWorker(threading.Thread):
 
                 # loop till done
                 timeout = None
-                while timeout is None:
+                while timeout is None and not self._stopThread:
                     timeout = self._run_next()
+                if timeout is None:
+                    break
 
                 # wait or get going?
                 now = time.monotonic()
                 if now < timeout:
                     self._lock.wait(timeout - now)
 
-    def queue_job(self, run_at, prio, job):
+    def queue_job(self, run_at, prio, job, owner=None):
+        job["due"] = run_at
         run_at = int(run_at)
+        job["owner"] = owner
         with self._lock:
             job_id = self._next_id()
             if prio not in self._queue:
@@ -90,25 +141,60 @@ class ArloBackgroundWorker(threading.Thread):
                         del self._queue[prio][(run_at, job_id)]
                         return True
         return False
-    
+
+    def stop_owner(self, owner):
+        """Remove all the jobs queued by owner."""
+        with self._lock:
+            for prio in self._queue.keys():
+                for key, job in list(self._queue[prio].items()):
+                    if job["owner"] is owner:
+                        del self._queue[prio][key]
+            self._last_turn.pop(owner, None)
+
+    def stats(self, owner):
+        """Return the number of jobs run and the seconds spent on them for owner."""
+        with self._lock:
+            stats = dict(self._stats.get(owner, {"jobs": 0, "busy": 0.0}))
+            stats["queued"] = sum(
+                1 for jobs in self._queue.values() for job in jobs.values() if job["owner"] is owner
+            )
+            return stats
+
+    @property
+    def thread_list(self):
+        return [thread for thread in self._threads if thread.is_alive()]
+
     def stop(self):
         with self._lock:
             self._stopThread = True
-            self._lock.notify()
-        self.join(10)
+            self._lock.notify_all()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(10)
 
 
 class ArloBackground:
-    def __init__(self, arlo):
-        self._worker = ArloBackgroundWorker(arlo)
-        self._worker.name = "ArloBackgroundWorker"
-        self._worker.daemon = True
-        self._worker.start()
+    """Queues jobs for one account.
+
+    By default each account has a worker thread of its own, pass `worker`
+    to share one between several accounts.
+    """
+
+    def __init__(self, arlo, worker=None, name="ArloBackgroundWorker"):
+        self._arlo = arlo
+        self._shared = worker is not None
+        if worker is None:
+            worker = ArloBackgroundWorker(arlo, name=name)
+        self._worker = worker
         arlo.debug("background: starting")
 
+    @property
+    def arlo(self):
+        return self._arlo
+
     def _run(self, bg_cb, prio, **kwargs):
         job = {"callback": bg_cb, "args": kwargs}
-        return self._worker.queue_job(time.monotonic(), prio, job)
+        return self._worker.queue_job(time.monotonic(), prio, job, self)
 
     def run_high(self, bg_cb, **kwargs):
         return self._run(bg_cb, 10, **kwargs)
@@ -121,7 +207,7 @@ class ArloBackground:
 
     def _run_in(self, bg_cb, prio, seconds, **kwargs):
         job = {"callback": bg_cb, "args": kwargs}
-        return self._worker.queue_job(time.monotonic() + seconds, prio, job)
+        return self._worker.queue_job(time.monotonic() + seconds, prio, job, self)
 
     def run_high_in(self, bg_cb, seconds, **kwargs):
         return self._run_in(bg_cb, 10, seconds, **kwargs)
@@ -134,7 +220,7 @@ class ArloBackground:
 
     def _run_every(self, bg_cb, prio, seconds, **kwargs):
         job = {"run_every": seconds, "callback": bg_cb, "args": kwargs}
-        return self._worker.queue_job(time.monotonic() + seconds, prio, job)
+        return self._worker.queue_job(time.monotonic() + seconds, prio, job, self)
 
     def run_high_every(self, bg_cb, seconds, **kwargs):
         return self._run_every(bg_cb, 10, seconds, **kwargs)
@@ -149,5 +235,17 @@ class ArloBackground:
         if to_delete is not None:
             self._worker.stop_job(to_delete)
 
+    @property
+    def threads(self):
+        """The threads this account runs, none if the worker is shared."""
+        return [] if self._shared else self._worker.thread_list
+
+    def stats(self):
+        """Return how many jobs this account has run and how long they took."""
+        return self._worker.stats(self)
+
     def stop(self):
-        self._worker.stop()
+        if self._shared:
+            self._worker.stop_owner(self)
+        else:
+            self._worker.stop()
@@ -8,14 +8,13 @@ if TYPE_CHECKING:
 from .constant import (
     AIR_QUALITY_KEY,
     AUTOMATION_PATH,
+    BASE_READY_BUDGET,
+    BASE_READY_TIMEOUT,
     CONNECTION_KEY,
     DEFAULT_MODES,
     DEFINITIONS_PATH,
     HUMIDITY_KEY,
-    MODE_ID_TO_NAME_KEY,
-    MODE_IS_SCHEDULE_KEY,
     MODE_KEY,
-    MODE_NAME_TO_ID_KEY,
     MODE_UPDATE_INTERVAL,
     MODEL_BABY,
     MODEL_ESSENTIAL_OUTDOOR_GEN2_2K,
@@ -48,6 +47,21 @@ from .ratls import ArloRatls
 day_of_week = ["Mo", "Tu", "We", "Th", "Fr", "Sa", "Su", "Mo"]
 
 
+def index_automations(data):
+    """Index the automation list by unique id.
+
+    Every base's current mode is in the one list so it can be fetched once
+    and shared.
+
+    :param data: The list returned from `AUTOMATION_PATH`.
+    :return: A dictionary of unique id to the list's entries for it.
+    """
+    automations = {}
+    for mode in data or []:
+        automations.setdefault(mode.get("uniqueId", ""), []).append(mode)
+    return automations
+
+
 class ArloBase(ArloDevice):
     def __init__(self, name: str, arlo: 'PyArlo', attrs):
         super().__init__(name, arlo, attrs)
@@ -56,17 +70,19 @@ class ArloBase(ArloDevice):
         self._schedules = None
         self._last_update = 0
         self._ratls = None
+        self._modes = self._load_mode_table()
 
     def _id_to_name(self, mode_id):
-        return self._load([MODE_ID_TO_NAME_KEY, mode_id], None)
+        return self._modes.id_to_name(mode_id)
 
     def _id_is_schedule(self, mode_id):
-        return self._load([MODE_IS_SCHEDULE_KEY, mode_id.lower()], False)
+        return self._modes.is_schedule(mode_id)
 
     def _name_to_id(self, mode_name):
-        return self._load([MODE_NAME_TO_ID_KEY, mode_name.lower()], None)
+        return self._modes.name_to_id(mode_name.lower())
 
     def _parse_modes(self, modes):
+        entries = []
         for mode in modes:
             mode_id = mode.get("id", None)
             mode_name = mode.get("name", "")
@@ -76,10 +92,9 @@ class ArloBase(ArloDevice):
                     mode_name = mode_id
             if mode_id and mode_name != "":
                 self.debug(mode_id + "<=M=>" + mode_name)
-                self._save([MODE_ID_TO_NAME_KEY, mode_id], mode_name)
-                self._save([MODE_NAME_TO_ID_KEY, mode_name.lower()], mode_id)
-                self._save([MODE_IS_SCHEDULE_KEY, mode_id.lower()], False)
-                self._save([MODE_IS_SCHEDULE_KEY, mode_name.lower()], False)
+                entries.append((mode_id, mode_name, mode_name.lower(), False))
+        if entries:
+            self._add_modes(entries)
 
     def schedule_to_modes(self):
         if self._schedules is None:
@@ -106,6 +121,7 @@ class ArloBase(ArloDevice):
 
     def _parse_schedules(self, schedules):
         self._schedules = schedules
+        entries = []
         for schedule in schedules:
             schedule_id = schedule.get("id", None)
             schedule_name = schedule.get("name", "")
@@ -113,10 +129,9 @@ class ArloBase(ArloDevice):
                 schedule_name = schedule_id
             if schedule_id and schedule_name != "":
                 self.debug(schedule_id + "<=S=>" + schedule_name)
-                self._save([MODE_ID_TO_NAME_KEY, schedule_id], schedule_name)
-                self._save([MODE_NAME_TO_ID_KEY, schedule_name.lower()], schedule_id)
-                self._save([MODE_IS_SCHEDULE_KEY, schedule_id.lower()], True)
-                self._save([MODE_IS_SCHEDULE_KEY, schedule_name.lower()], True)
+                entries.append((schedule_id, schedule_name, schedule_name.lower(), True))
+        if entries:
+            self._add_modes(entries)
 
     def _set_mode_or_schedule(self, event):
 
@@ -231,6 +246,16 @@ class ArloBase(ArloDevice):
     def _v3_modes(self):
         return self._modes_version == 3
 
+    @property
+    def uses_definitions(self):
+        """Returns `True` if the base reads its modes from the definitions list."""
+        return self._v2_modes
+
+    @property
+    def uses_automations(self):
+        """Returns `True` if the base reads its mode from the shared automation list."""
+        return not self._v3_modes
+
     @property
     def available_modes(self):
         """Returns string list of available modes.
@@ -245,9 +270,7 @@ class ArloBase(ArloDevice):
 
         For example:: ``{'armed': 'mode1','disarmed': 'mode0','home': 'mode2'}``
         """
-        modes = {}
-        for key, mode_id in self._load_matching([MODE_NAME_TO_ID_KEY, "*"]):
-            modes[key.split("/")[-1]] = mode_id
+        modes = self._modes.modes
         if not modes:
             modes = DEFAULT_MODES
         return modes
@@ -266,6 +289,19 @@ class ArloBase(ArloDevice):
 
         :param mode_name: mode to use, as returned by available_modes:
         """
+        self.set_mode(mode_name)
+
+    def set_mode(self, mode_name, wait_for=None):
+        """Set the base station mode.
+
+        :param mode_name: mode to use, as returned by available_modes:
+        :param wait_for: how long to wait on a v1 base, as for `notify`; pass
+                         `response` to find out if the base accepted the change,
+                         a v2 base then retries a failed change before returning
+        :return: `True` if the change was made, or sent when not waiting for
+                 the response. `None` if the first try failed and it's being
+                 retried in the background.
+        """
         if self._v3_modes:
             # In V3, modes are managed at the location level — delegate to the
             # corresponding location. gatewayDeviceIds may include a userId prefix
@@ -274,10 +310,9 @@ class ArloBase(ArloDevice):
                 for gid in location.device_ids:
                     if gid == self.device_id or gid.endswith("_" + self.device_id):
                         self.debug(f"V3: delegating mode={mode_name} to location {location.name}")
-                        location.mode = mode_name
-                        return
+                        return location.set_mode(mode_name)
             self._arlo.debug(f"V3: no location found for base {self.device_id}, ignoring mode change")
-            return
+            return False
 
         # Actually passed a mode?
         mode_id = None
@@ -290,7 +325,7 @@ class ArloBase(ArloDevice):
         # Need to change?
         if self.mode == mode_name:
             self.debug("no mode change needed")
-            return
+            return True
 
         if mode_id is None:
             mode_id = self._name_to_id(mode_name)
@@ -299,7 +334,7 @@ class ArloBase(ArloDevice):
             # Need to change?
             if self.mode == mode_id:
                 self.debug("no mode change needed (id)")
-                return
+                return True
 
             if not self._v3_modes:
                 # Schedule or mode? Manually set schedule key.
@@ -315,7 +350,8 @@ class ArloBase(ArloDevice):
             # Post change.
             self.debug(self.name + ":new-mode=" + mode_name + ",id=" + mode_id)
             if self._v1_modes:
-                self._arlo.be.notify(
+                wait_for = self._arlo.be.notify_wait_for(wait_for)
+                reply = self._arlo.be.notify(
                     base=self,
                     body={
                         "action": "set",
@@ -323,7 +359,9 @@ class ArloBase(ArloDevice):
                         "publishResponse": True,
                         "properties": {"active": mode_id},
                     },
+                    wait_for=wait_for,
                 )
+                return wait_for == "nothing" or reply is not None
             elif self._v2_modes:
                 # This is complicated... Setting a mode can fail and setting a mode can be sync or async.
                 # This code tried 3 times to set the mode with attempts to reload the devices between
@@ -356,7 +394,7 @@ class ArloBase(ArloDevice):
                                 or body.get("resource", "") == "modes"
                                 or body.get("resource", "") == "activeAutomations"
                             ):
-                                return
+                                return True
                         self._arlo.warning(
                             "attempt {0}: error in response when setting mode=\n{1}".format(
                                 attempt, pprint.pformat(body)
@@ -366,12 +404,11 @@ class ArloBase(ArloDevice):
                             "Fetching device list (hoping this will fix arming/disarming)"
                         )
                         self._arlo.be.devices()
-                        if self._arlo.cfg.synchronous_mode:
+                        if self._arlo.cfg.synchronous_mode or wait_for is not None:
                             self.debug("trying again, but synchronous")
-                            _set_mode_v2_cb(attempt=attempt + 1)
-                        else:
-                            self._arlo.bg.run(_set_mode_v2_cb, attempt=attempt + 1)
-                        return
+                            return _set_mode_v2_cb(attempt=attempt + 1)
+                        self._arlo.bg.run(_set_mode_v2_cb, attempt=attempt + 1)
+                        return None
 
                     self._arlo.error("Failed to set mode.")
                     self.debug(
@@ -384,8 +421,9 @@ class ArloBase(ArloDevice):
                             pprint.pprint(self._arlo.be.session.cookies)
                         )
                     )
+                    return False
 
-                _set_mode_v2_cb(1)
+                return _set_mode_v2_cb(1)
             else:
                 self._arlo.be.put(
                     base=self,
@@ -395,14 +433,20 @@ class ArloBase(ArloDevice):
                         "publishResponse": True,
                         "properties": {"active": mode_id},
                     })
+                return True
 
         else:
             self._arlo.warning(
                 "{0}: mode {1} is unrecognised".format(self.name, mode_name)
             )
+            return False
+
+    def update_mode(self, automations=None):
+        """Check and update the base's current mode.
 
-    def update_mode(self):
-        """Check and update the base's current mode."""
+        :param automations: The automation list indexed by unique id, see
+                            `index_automations`. Fetched if not given.
+        """
         now = time.monotonic()
         with self._lock:
             #  if now < self._last_update + MODE_UPDATE_INTERVAL:
@@ -411,17 +455,25 @@ class ArloBase(ArloDevice):
             self._last_update = now
 
         if not self._v3_modes:
-            data = self._arlo.be.get(AUTOMATION_PATH)
-            for mode in data:
-                if mode.get("uniqueId", "") == self.unique_id:
-                    self._set_mode_or_schedule(mode)
-
-    def update_modes(self, initial=False):
-        """Get and update the available modes for the base."""
+            if automations is None:
+                automations = index_automations(self._arlo.be.get(AUTOMATION_PATH))
+            for mode in automations.get(self.unique_id, ()):
+                self._set_mode_or_schedule(mode)
+
+    def update_modes(self, initial=False, definitions=None):
+        """Get and update the available modes for the base.
+
+        :param initial: `True` if this is the initial refresh.
+        :param definitions: Mode definitions fetched for several bases at
+                            once, a dictionary keyed by unique id. Fetched if
+                            not given or if this base isn't in them.
+        """
         if self._v1_modes:
-            # Work around slow arlo connections.
+            # Work around slow arlo connections, wait for the base to talk
+            # to us before asking it for its modes.
             if initial and self._arlo.cfg.synchronous_mode:
-                time.sleep(5)
+                if not self.wait_until_ready():
+                    self.debug("not ready, trying anyway")
             resp = self._arlo.be.notify(
                 base=self,
                 body={"action": "get", "resource": "modes", "publishResponse": False},
@@ -433,9 +485,11 @@ class ArloBase(ArloDevice):
             else:
                 self._arlo.error("unable to read mode, try forcing v2")
         elif self._v2_modes:
-            modes = self._arlo.be.get(
-                DEFINITIONS_PATH + "?uniqueIds={}".format(self.unique_id)
-            )
+            if definitions is None or self.unique_id not in definitions:
+                definitions = self._arlo.be.get(
+                    DEFINITIONS_PATH + "?uniqueIds={}".format(self.unique_id)
+                )
+            modes = definitions
             if modes is not None:
                 modes = modes.get(self.unique_id, {})
                 self._parse_modes(modes.get("modes", []))
@@ -543,22 +597,59 @@ class ArloBase(ArloDevice):
         ):
             self.debug("RESTART didnt send")
 
-    def _ping_and_check_reply(self):
+    def send_ping(self, device_ids=None):
+        """Ping the base, and optionally other devices, through this base.
+
+        :param device_ids: devices to list in the ping, default is just this base
+        :return: `True` if the ping was accepted.
+        """
+        if device_ids is None:
+            device_ids = [self.device_id]
         body = {
             "action": "set",
             "resource": self._arlo.be.sub_id,
             "publishResponse": False,
-            "properties": {"devices": [self.device_id]},
+            "properties": {"devices": list(device_ids)},
         }
         self.debug("pinging {}".format(self.name))
         if self._arlo.be.notify(base=self, body=body, wait_for="response") is None:
-            self._save_and_do_callbacks(CONNECTION_KEY, "unavailable")
-        else:
+            return False
+        for device_id in device_ids:
+            self._arlo.be.device_seen(device_id)
+        return True
+
+    def update_connection(self, available):
+        """Record whether the base is talking to us."""
+        if available:
             self._save_and_do_callbacks(CONNECTION_KEY, "available")
+        else:
+            self._save_and_do_callbacks(CONNECTION_KEY, "unavailable")
+
+    def _ping_and_check_reply(self):
+        self.update_connection(self.send_ping())
 
     def ping(self):
         self._arlo.bg.run(self._ping_and_check_reply)
 
+    def wait_until_ready(self, timeout=BASE_READY_TIMEOUT, budget=BASE_READY_BUDGET):
+        """Wait for the base to show it is talking to us.
+
+        Any event from the base or a successful ping counts. If nothing turns
+        up within `timeout` seconds the base is pinged, in the background, and
+        we keep waiting. We give up after `budget` seconds.
+
+        :return: `True` if the base is ready, `False` if we gave up.
+        """
+        give_up_at = time.monotonic() + budget
+        while True:
+            remaining = give_up_at - time.monotonic()
+            if self._arlo.be.wait_for_device(self.device_id, max(0, min(timeout, remaining))):
+                return True
+            if remaining <= timeout:
+                return False
+            self.debug("not ready, pinging")
+            self.ping()
+
     @property
     def state(self):
         if self.is_unavailable:
@@ -631,7 +722,8 @@ class ArloBase(ArloDevice):
     def keep_ratls_open(self):
         if self._ratls:
             self.debug("refreshing ratls for {}".format(self.name))
-            self._ratls.open_port()
+            with self._arlo.profiler.phase("ratls"):
+                self._ratls.open_port()
 
     def build_media_library(self):
         self._ml = ArloBaseStationMediaLibrary(self._arlo, self)
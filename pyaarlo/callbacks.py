@@ -0,0 +1,112 @@
+import threading
+import weakref
+
+
+def _strong_ref(cb):
+    return lambda: cb
+
+
+def _weak_ref(cb):
+    if hasattr(cb, "__self__") and hasattr(cb, "__func__"):
+        return weakref.WeakMethod(cb)
+    return weakref.ref(cb)
+
+
+class ArloSubscription(object):
+    """Returned when a callback is added, call `unsubscribe` to remove it."""
+
+    def __init__(self, *removers):
+        self._removers = removers
+
+    def unsubscribe(self):
+        removers, self._removers = self._removers, ()
+        for remove in removers:
+            remove()
+
+
+class ArloCallbacks(object):
+    """Callbacks indexed by key.
+
+    Callbacks registered against `any_key` are kept separately and returned
+    for every key. The lists are tuples that are replaced, never changed, so
+    looking up callbacks doesn't wait for registrations.
+
+    Callbacks can be held weakly, they are dropped once their owner goes
+    away.
+    """
+
+    def __init__(self, any_key):
+        self._any_key = any_key
+        self._lock = threading.Lock()
+        self._cbs = {}
+        self._any = ()
+
+    def _add_ref(self, key, ref):
+        with self._lock:
+            if key == self._any_key:
+                self._any = self._any + (ref,)
+            else:
+                self._cbs[key] = self._cbs.get(key, ()) + (ref,)
+
+    def _remove_ref(self, key, match):
+        with self._lock:
+            if key == self._any_key:
+                refs = self._any
+            else:
+                refs = self._cbs.get(key, ())
+            kept = tuple(ref for ref in refs if not match(ref))
+            if len(kept) == len(refs):
+                return False
+            if key == self._any_key:
+                self._any = kept
+            elif kept:
+                self._cbs[key] = kept
+            else:
+                del self._cbs[key]
+            return True
+
+    def _prune(self):
+        with self._lock:
+            self._any = tuple(ref for ref in self._any if ref() is not None)
+            for key, refs in list(self._cbs.items()):
+                kept = tuple(ref for ref in refs if ref() is not None)
+                if kept:
+                    self._cbs[key] = kept
+                else:
+                    del self._cbs[key]
+
+    def add(self, key, cb, weak=False):
+        """Add callback cb for key.
+
+        :param key: What to watch, `any_key` to watch everything.
+        :param cb: Callback to add.
+        :param weak: Only keep a weak reference to the callback.
+        :return: An `ArloSubscription`.
+        """
+        ref = _weak_ref(cb) if weak else _strong_ref(cb)
+        self._add_ref(key, ref)
+        return ArloSubscription(lambda: self._remove_ref(key, lambda r: r is ref))
+
+    def remove(self, key, cb):
+        """Remove callback cb from key.
+
+        :return: `True` if the callback was found, `False` otherwise.
+        """
+        return self._remove_ref(key, lambda ref: ref() == cb)
+
+    def get(self, key):
+        """Return a list of the live callbacks for key, including any `any_key` callbacks."""
+        cbs = []
+        dead = False
+        for ref in self._cbs.get(key, ()) + self._any:
+            cb = ref()
+            if cb is None:
+                dead = True
+            else:
+                cbs.append(cb)
+        if dead:
+            self._prune()
+        return cbs
+
+    def __len__(self):
+        return len(self._any) + sum(len(refs) for refs in self._cbs.values())
@@ -89,7 +89,7 @@ class ArloCamera(ArloChildDevice):
     def __init__(self, name, arlo, attrs):
         super().__init__(name, arlo, attrs)
         self._recent = False
-        self._recent_job = None
+        self._recent_timer = self._arlo.timers.timer(self._clear_recent)
         self._cache_count = None
         self._cached_videos = None
         self._min_days_vdo_cache = self._arlo.cfg.library_days
@@ -143,7 +143,7 @@ class ArloCamera(ArloChildDevice):
             )
             i += 22
 
-        return points[-1]
+        return points
 
     def _dump_activities(self, msg):
         self.debug(
@@ -249,15 +249,13 @@ class ArloCamera(ArloChildDevice):
     def _set_recent(self, timeo):
         with self._lock:
             self._recent = True
-            self._arlo.bg.cancel(self._recent_job)
-            self._recent_job = self._arlo.bg.run_in(self._clear_recent, timeo)
+            self._recent_timer.arm(timeo)
         self.debug("turning recent ON for " + self._name)
         self._do_callbacks(RECENT_ACTIVITY_KEY, True)
 
     def _clear_recent(self):
         with self._lock:
             self._recent = False
-            self._recent_job = None
         self.debug("turning recent OFF for " + self._name)
         self._do_callbacks(RECENT_ACTIVITY_KEY, False)
 
@@ -502,11 +500,18 @@ class ArloCamera(ArloChildDevice):
 
         # Ambient sensors update, decode and push changes.
         if resource.endswith("/ambientSensors/history"):
-            data = self._decode_sensor_data(event.get("properties", {}))
-            if data is not None:
-                self._save_and_do_callbacks("temperature", data.get("temperature"))
-                self._save_and_do_callbacks("humidity", data.get("humidity"))
-                self._save_and_do_callbacks("airQuality", data.get("airQuality"))
+            points = self._decode_sensor_data(event.get("properties", {}))
+            if points:
+                # Every point goes into the telemetry with the time Arlo took
+                # it, only the latest is saved.
+                if self._arlo.telemetry is not None:
+                    for point in points:
+                        for key in (TEMPERATURE_KEY, HUMIDITY_KEY, AIR_QUALITY_KEY):
+                            self._arlo.telemetry.record(self, key, point.get(key), point["timestamp"] / 1e3)
+                data = points[-1]
+                self._save_and_do_callbacks("temperature", data.get("temperature"), telemetry=False)
+                self._save_and_do_callbacks("humidity", data.get("humidity"), telemetry=False)
+                self._save_and_do_callbacks("airQuality", data.get("airQuality"), telemetry=False)
 
         # Properties settings.
         properties = event.get("properties", {})
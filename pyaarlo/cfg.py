@@ -4,9 +4,11 @@ import os
 from urllib.parse import urlparse
 
 from .constant import (
+    BUTTON_PRESSED_KEY,
     DEFAULT_AUTH_HOST,
     DEFAULT_HOST,
     DEFAULT_MQTT_PORT,
+    MOTION_DETECTED_KEY,
     MQTT_HOST,
     PRELOAD_DAYS,
     TFA_CONSOLE_SOURCE,
@@ -124,6 +126,22 @@ class ArloCfg(object):
     def db_ding_time(self):
         return self._kw.get("db_ding_time", 10)
 
+    @property
+    def max_parallel(self):
+        return max(1, self._kw.get("max_parallel", 4))
+
+    @property
+    def group_pings(self):
+        return self._kw.get("group_pings", False)
+
+    @property
+    def ping_quiet_time(self):
+        return self._kw.get("ping_quiet_time", 0)
+
+    @property
+    def fast_lane(self):
+        return frozenset(self._kw.get("fast_lane", (BUTTON_PRESSED_KEY, MOTION_DETECTED_KEY)))
+
     @property
     def request_timeout(self):
         return self._kw.get("request_timeout", 60)
@@ -250,12 +268,60 @@ class ArloCfg(object):
     def save_state(self):
         return self._kw.get("save_state", True)
 
+    @property
+    def snapshot_storage(self):
+        return self._kw.get("snapshot_storage", False)
+
     @property
     def state_file(self):
         if self.save_state:
             return self.storage_dir + "/" + self.name + ".pickle"
         return None
 
+    @property
+    def state_db(self):
+        return self._kw.get("state_db", False)
+
+    @property
+    def state_db_file(self):
+        if self.save_state:
+            return self._kw.get("state_db_file", self.storage_dir + "/" + self.name + ".sqlite")
+        return ":memory:"
+
+    @property
+    def history_days(self):
+        return self._kw.get("history_days", 7)
+
+    @property
+    def history_max_rows(self):
+        return self._kw.get("history_max_rows", 100000)
+
+    @property
+    def telemetry_size(self):
+        return self._kw.get("telemetry_size", 0)
+
+    @property
+    def trace_events(self):
+        return self._kw.get("trace_events", False)
+
+    @property
+    def metrics_port(self):
+        return self._kw.get("metrics_port", 0)
+
+    @property
+    def metrics_host(self):
+        return self._kw.get("metrics_host", "127.0.0.1")
+
+    @property
+    def warm_start(self):
+        return self._kw.get("warm_start", False)
+
+    @property
+    def warm_start_file(self):
+        if self.save_state:
+            return self.storage_dir + "/" + self.name + ".warm"
+        return None
+
     @property
     def session_file(self):
         return self.storage_dir + "/session.pickle"
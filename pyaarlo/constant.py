@@ -71,6 +71,17 @@ SLOW_REFRESH_INTERVAL = 10 * 60
 EVENT_STREAM_TIMEOUT = (FAST_REFRESH_INTERVAL * 2) + 5
 MODE_UPDATE_INTERVAL = 2
 
+# How long to wait for a base to show signs of life before pinging it, and
+# how long to wait in all. The budget is the sleep the wait replaced.
+BASE_READY_TIMEOUT = 2
+BASE_READY_BUDGET = 5
+
+# How many times to retry a location mode change the server rejected.
+LOCATION_MODE_RETRIES = 2
+
+# How many bases to ask for mode definitions in one request.
+DEFINITIONS_CHUNK_SIZE = 20
+
 # Device capabilities
 PING_CAPABILITY = "pingCapability"
 RESOURCE_CAPABILITY = "resourceCapability"
@@ -193,6 +204,15 @@ RESOURCE_UPDATE_KEYS = [
 
 RECENT_ACTIVITY_KEYS = [AUDIO_DETECTED_KEY, MOTION_DETECTED_KEY]
 
+# numeric values we keep a short history of
+TELEMETRY_KEYS = [
+    AIR_QUALITY_KEY,
+    BATTERY_KEY,
+    HUMIDITY_KEY,
+    SIGNAL_STR_KEY,
+    TEMPERATURE_KEY,
+]
+
 # device keys
 CONNECTIVITY_KEY = "connectivity"
 DEVICE_ID_KEY = "deviceId"
@@ -242,6 +262,9 @@ MEDIA_UPLOAD_KEY = "mediaUploadNotification"
 MODE_NAME_TO_ID_KEY = "modeNameToId"
 MODE_ID_TO_NAME_KEY = "modeIdToName"
 MODE_IS_SCHEDULE_KEY = "modeIsSchedule"
+MODE_TABLE_KEY = "modeTable"
+# Key used to store the device_id → custom_modes UUID map
+CUSTOM_MODE_UUID_KEY = "customModeUuid"
 RECENT_ACTIVITY_KEY = "recentActivity"
 SCHEDULE_KEY = "activeSchedule"
 TOTAL_BELLS_KEY = "totalDoorBells"
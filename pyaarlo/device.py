@@ -152,21 +152,6 @@ class ArloDevice(ArloSuper):
             value = default
         return value
 
-    def add_attr_callback(self, attr, cb):
-        """Add an callback to be triggered when an attribute changes.
-
-        Used to register callbacks to track device activity. For example, get a notification whenever
-        motion stop and starts.
-
-        See PyArlo for a non-exhaustive list of attributes.
-
-        :param attr: Attribute - eg `motionStarted` - to monitor.
-        :type attr: str
-        :param cb: Callback to run.
-        """
-        with self._lock:
-            self._attr_cbs_.append((attr, cb))
-
     def has_capability(self, cap):
         """Is the device capable of performing activity cap:.
 
@@ -280,6 +265,10 @@ class ArloChildDevice(ArloDevice):
     def __init__(self, name, arlo, attrs):
         super().__init__(name, arlo, attrs)
 
+        # Parent base station, looked up again if the device list changes.
+        self._base_station = None
+        self._base_station_version = None
+
         self.debug("parent is {}".format(self._parent_id))
         self.vdebug("resource is {}".format(self.resource_id))
 
@@ -331,22 +320,16 @@ class ArloChildDevice(ArloDevice):
             return self.base_station.timezone
         return time_zone
 
-    @property
-    def base_station(self):
-        """Returns the base station controlling this device.
-
-        Some devices - ArloBaby for example - are their own parents. If we
-        can't find a basestation, this returns the first one (if any exist).
-        """
+    def _find_base_station(self):
         # look for real parents
-        for base in self._arlo.base_stations:
-            if base.device_id == self.parent_id:
-                return base
+        base = self._arlo.lookup_base_station_by_id(self.parent_id)
+        if base is not None:
+            return base
 
         # some cameras don't have base stations... it's its own base station...
-        for base in self._arlo.base_stations:
-            if base.device_id == self.device_id:
-                return base
+        base = self._arlo.lookup_base_station_by_id(self.device_id)
+        if base is not None:
+            return base
 
         # no idea!
         if len(self._arlo.base_stations) > 0:
@@ -355,6 +338,19 @@ class ArloChildDevice(ArloDevice):
         self._arlo.error("Could not find any base stations for device " + self._name)
         return None
 
+    @property
+    def base_station(self):
+        """Returns the base station controlling this device.
+
+        Some devices - ArloBaby for example - are their own parents. If we
+        can't find a basestation, this returns the first one (if any exist).
+        """
+        version = self._arlo.topology_version
+        if self._base_station_version != version:
+            self._base_station = self._find_base_station()
+            self._base_station_version = version
+        return self._base_station
+
     @property
     def is_unavailable(self):
         if not self.base_station:
@@ -0,0 +1,48 @@
+import threading
+from collections import deque
+
+
+class ArloLatency(object):
+    """Records how long event packets wait before their callbacks run.
+
+    Samples are kept per lane, `fast` or `normal`. Counts and the maximum
+    cover every sample, the mean and percentiles the last `size`.
+    """
+
+    def __init__(self, size=1000):
+        self._size = size
+        self._lock = threading.Lock()
+        self._lanes = {}
+
+    def record(self, lane, seconds):
+        with self._lock:
+            stats = self._lanes.get(lane, None)
+            if stats is None:
+                stats = self._lanes[lane] = {"count": 0, "max": 0.0, "samples": deque(maxlen=self._size)}
+            stats["count"] += 1
+            if seconds > stats["max"]:
+                stats["max"] = seconds
+            stats["samples"].append(seconds)
+
+    @staticmethod
+    def _percentile(ordered, pct):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def stats(self):
+        """Return, for each lane, the `count` of callbacks run and the `mean`,
+        `max`, `p50`, `p95` and `p99` wait in seconds.
+        """
+        with self._lock:
+            lanes = {lane: (stats["count"], stats["max"], sorted(stats["samples"]))
+                     for lane, stats in self._lanes.items()}
+        report = {}
+        for lane, (count, maximum, ordered) in lanes.items():
+            report[lane] = {
+                "count": count,
+                "mean": sum(ordered) / len(ordered),
+                "max": maximum,
+                "p50": self._percentile(ordered, 50),
+                "p95": self._percentile(ordered, 95),
+                "p99": self._percentile(ordered, 99),
+            }
+        return report
@@ -1,10 +1,10 @@
 from .constant import (
-    MODE_ID_TO_NAME_KEY,
+    CUSTOM_MODE_UUID_KEY,
     MODE_KEY,
-    MODE_NAME_TO_ID_KEY,
     LOCATION_MODES_PATH_FORMAT,
     LOCATION_AUTOMATION_PATH_FORMAT,
     LOCATION_ACTIVEMODE_PATH_FORMAT,
+    LOCATION_MODE_RETRIES,
     MODE_REVISION_KEY
 )
 from .super import ArloSuper
@@ -18,8 +18,6 @@ DEFAULT_MODES = {
     "armHome": "Armed Home"
 }
 
-# Key used to store the device_id → custom_modes UUID map
-CUSTOM_MODE_UUID_KEY = "customModeUuid"
 # Sentinel stored as mode_id when the active mode is a V3 custom mode
 CUSTOM_MODE_SENTINEL = "custom"
 
@@ -42,45 +40,29 @@ class ArloLocation(ArloSuper):
                          type="location")
 
         self._device_ids = attrs.get("gatewayDeviceIds", [])
+        self._modes = self._load_mode_table()
 
     def _id_to_name(self, mode_id):
-        return self._load([MODE_ID_TO_NAME_KEY, mode_id], None)
+        return self._modes.id_to_name(mode_id)
 
     def _name_to_id(self, mode_name):
-        # Try exact match first
-        result = self._load([MODE_NAME_TO_ID_KEY, mode_name], None)
-        if result is not None:
-            return result
-        # Try case-insensitive match
-        for key, value in self._load_matching([MODE_NAME_TO_ID_KEY, "*"]):
-            if key.split("/")[-1].lower() == mode_name.lower():
-                return value
-        return None
+        # Exact match first, then case-insensitive.
+        return self._modes.name_to_id(mode_name, ignore_case=True)
 
     def _custom_uuid_for_device(self, device_id, mode_name_or_uuid):
         """Resolve a custom mode name or UUID to a UUID for a given device_id.
 
         Returns the UUID string, or None if not found.
         """
-        # Try name → uuid lookup first
-        uuid = self._load([CUSTOM_MODE_UUID_KEY, device_id, mode_name_or_uuid], None)
-        if uuid is not None:
-            return uuid
-        # Already a UUID? Check it exists in the map
-        for key, stored_uuid in self._load_matching([CUSTOM_MODE_UUID_KEY, device_id, "*"]):
-            if stored_uuid == mode_name_or_uuid:
-                return mode_name_or_uuid
-        return None
+        return self._modes.custom_uuid(device_id, mode_name_or_uuid)
 
     def _uuid_to_custom_name(self, device_id, uuid):
         """Resolve a UUID to the custom mode name for a given device_id."""
-        for key, stored_uuid in self._load_matching([CUSTOM_MODE_UUID_KEY, device_id, "*"]):
-            if stored_uuid == uuid:
-                return key.split("/")[-1]
-        return uuid
+        return self._modes.custom_name(device_id, uuid)
 
     def _parse_custom_modes(self, custom_modes_properties):
         """Parse the customModes.properties.<deviceId> structure and store name→UUID map."""
+        entries = []
         for device_id, modes in custom_modes_properties.items():
             if not isinstance(modes, dict):
                 continue
@@ -95,7 +77,9 @@ class ArloLocation(ArloSuper):
                 if not name:
                     continue
                 self.debug(f"custom mode: {device_id} {uuid}<=CM=>{name}")
-                self._save([CUSTOM_MODE_UUID_KEY, device_id, name], uuid)
+                entries.append((device_id, name, uuid))
+        if entries:
+            self._add_modes(custom=entries)
 
     def _resolve_active_mode(self, properties):
         """Resolve the active mode from a V3 activeMode response properties dict.
@@ -122,13 +106,15 @@ class ArloLocation(ArloSuper):
         }
 
     def _parse_modes(self, modes):
+        entries = []
         for mode in modes.items():
             mode_id = mode[0]
             mode_name = mode[1].get("name", "")
             if mode_id and mode_name != "":
                 self.debug(mode_id + "<=M=>" + mode_name)
-                self._save([MODE_ID_TO_NAME_KEY, mode_id], mode_name)
-                self._save([MODE_NAME_TO_ID_KEY, mode_name], mode_id)
+                entries.append((mode_id, mode_name, mode_name, None))
+        if entries:
+            self._add_modes(entries)
 
     def _event_handler(self, resource, event):
         self.debug(self.name + " LOCATION got " + resource)
@@ -168,9 +154,7 @@ class ArloLocation(ArloSuper):
 
         For example:: ``{'armed': 'mode1','disarmed': 'mode0','home': 'mode2'}``
         """
-        modes = {}
-        for key, mode_id in self._load_matching([MODE_NAME_TO_ID_KEY, "*"]):
-            modes[key.split("/")[-1]] = mode_id
+        modes = self._modes.modes
         if not modes:
             modes = DEFAULT_MODES
         return modes
@@ -190,22 +174,34 @@ class ArloLocation(ArloSuper):
 
         :param id_or_name: mode to use, as returned by available_modes:
         """
+        self.set_mode(id_or_name)
+
+    def set_mode(self, id_or_name, retries=LOCATION_MODE_RETRIES):
+        """Set the location mode.
+
+        The change is made against the revision we last saw. If it's
+        rejected, usually because someone else changed the mode in the
+        meantime, the active mode and revision are read again and the
+        change retried.
+
+        :param id_or_name: mode to use, as returned by available_modes:
+        :param retries: how many times to retry a rejected change
+        :return: `True` if the location is now in the mode.
+        """
         # Convert to an ID.
         mode_id = self._name_to_id(id_or_name)
         if mode_id is None:
             mode_id = id_or_name
         if mode_id is None:
             self._arlo.error("passed invalid id or name {id_or_name}")
-            return
+            return False
 
         # Need to change?
         if self.mode.lower() == mode_id.lower():
             self.debug("no mode change needed")
-            return
+            return True
 
         self.debug(f"new-mode={mode_id}({id_or_name})")
-        mode_revision = self._load(MODE_REVISION_KEY, 1)
-        self.vdebug(f"old-revision={mode_revision}")
 
         # Build the PUT body — standard modes vs V3 custom modes
         custom_uuid = None
@@ -217,16 +213,13 @@ class ArloLocation(ArloSuper):
                 break
         # If not found, search all device_ids in the custom mode cache (case-insensitive)
         if custom_uuid is None:
-            for key, uuid in self._load_matching([CUSTOM_MODE_UUID_KEY, "*", "*"]):
-                # key format: customModeUuid/<device_id>/<mode_name>
-                parts = key.split("/")
-                if len(parts) >= 2 and parts[-1].lower() == mode_id.lower():
-                    device_id = parts[-2]
-                    # strip userId prefix if present (e.g. "userId_deviceId" -> "deviceId")
-                    if "_" in device_id:
-                        device_id = device_id.split("_", 1)[-1]
-                    custom_uuid = (device_id, uuid)
-                    break
+            found = self._modes.find_custom(mode_id)
+            if found is not None:
+                device_id, uuid = found
+                # strip userId prefix if present (e.g. "userId_deviceId" -> "deviceId")
+                if "_" in device_id:
+                    device_id = device_id.split("_", 1)[-1]
+                custom_uuid = (device_id, uuid)
 
         if custom_uuid is not None:
             device_id, uuid = custom_uuid
@@ -237,20 +230,28 @@ class ArloLocation(ArloSuper):
         else:
             params = {"mode": mode_id}
 
-        data = self._arlo.be.put(
-            LOCATION_ACTIVEMODE_PATH_FORMAT.format(self._id) + f"&revision={mode_revision}",
-            params=params,
-            headers=self._extra_headers())
-
-        if data is None:
-            self._arlo.error("failed to set mode.")
-            return
+        for attempt in range(retries + 1):
+            mode_revision = self._load(MODE_REVISION_KEY, 1)
+            self.vdebug(f"old-revision={mode_revision}")
+            data = self._arlo.be.put(
+                LOCATION_ACTIVEMODE_PATH_FORMAT.format(self._id) + f"&revision={mode_revision}",
+                params=params,
+                headers=self._extra_headers())
+            if data is not None:
+                mode_revision = data.get("revision")
+                self.vdebug(f"new-revision={mode_revision}")
+                self._save_and_do_callbacks(MODE_KEY, mode_id)
+                self._save(MODE_REVISION_KEY, mode_revision)
+                return True
 
-        mode_revision = data.get("revision")
-        self.vdebug(f"new-revision={mode_revision}")
+            # Probably a stale revision, find out where the location is now.
+            self.debug(f"attempt {attempt + 1}: mode change rejected, refetching")
+            self.update_mode()
+            if self.mode.lower() == mode_id.lower():
+                return True
 
-        self._save_and_do_callbacks(MODE_KEY, mode_id)
-        self._save(MODE_REVISION_KEY, mode_revision)
+        self._arlo.error("failed to set mode.")
+        return False
 
     @property
     def mode_name(self):
@@ -8,6 +8,7 @@ import os
 import pickle
 import pprint
 import sys
+import time
 
 import click
 
@@ -404,6 +405,32 @@ def camera(name, device_id, start_ffmpeg, action):
             print(' error getting thumbnail')
 
 
+@cli.command()
+@click.option('-j', '--json/--no-json', 'as_json', default=False,
+              help='print the profile as JSON')
+@click.option('-t', '--timeout', default=600, show_default=True,
+              help='seconds to wait for start up to finish')
+def profile(as_json, timeout):
+    ar = login()
+    give_up_at = time.monotonic() + timeout
+    while not ar.profiler.finished:
+        if time.monotonic() > give_up_at:
+            _print("start up didn't finish, the profile is incomplete")
+            break
+        time.sleep(0.1)
+    if as_json:
+        _print(ar.profiler.json(indent=1))
+        return
+
+    report = ar.startup_profile
+    _print("{:<12} {:>8} {:>8} {:>6} {:>8} {:>10}".format("phase", "start", "duration", "calls", "requests", "bytes"))
+    for name, phase in report["phases"].items():
+        _print("{:<12} {:>8.3f} {:>8.3f} {:>6} {:>8} {:>10}".format(name, phase["start"], phase["duration"] or 0,
+                                                                    phase["calls"], phase["requests"], phase["bytes"]))
+    _print("ready={:.3f}s;total={:.3f}s;requests={};bytes={}".format(report["ready"] or 0, report["total"] or 0,
+                                                                    report["requests"], report["bytes"]))
+
+
 def main_func():
     cli()
 
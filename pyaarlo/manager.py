@@ -0,0 +1,223 @@
+import logging
+import threading
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .background import ArloBackgroundWorker
+from .timers import ArloTimerShare, ArloTimerWheel
+
+_LOGGER = logging.getLogger("pyaarlo")
+
+
+class ArloPoolShare(object):
+    """One account's share of a worker pool.
+
+    Looks enough like a `ThreadPoolExecutor` for `PyArlo` to use. At most
+    `limit` of the account's tasks are handed to the pool at once, the rest
+    wait here, so one busy account can't fill the pool and hold up the
+    others.
+    """
+
+    def __init__(self, pool, limit):
+        self._pool = pool
+        self._limit = limit
+        self._lock = threading.Lock()
+        self._queue = []
+        self._running = 0
+        self._stopped = False
+
+    def _run(self, future, fn, args, kwargs):
+        if future.set_running_or_notify_cancel():
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+        with self._lock:
+            self._running -= 1
+            task = self._queue.pop(0) if self._queue and not self._stopped else None
+            if task is not None:
+                self._running += 1
+        if task is not None:
+            self._pool.submit(self._run, *task)
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        task = (future, fn, args, kwargs)
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            if self._running >= self._limit:
+                self._queue.append(task)
+                return future
+            self._running += 1
+        self._pool.submit(self._run, *task)
+        return future
+
+    def shutdown(self, wait=False):
+        """Drop any waiting tasks, the shared pool keeps running."""
+        with self._lock:
+            self._stopped = True
+            queue, self._queue = self._queue, []
+        for future, _, _, _ in queue:
+            future.cancel()
+
+    def stats(self):
+        with self._lock:
+            return {"running": self._running, "waiting": len(self._queue)}
+
+
+class ArloManager(object):
+    """Runs several Arlo accounts in one process.
+
+    Without a manager each `PyArlo` has its own background thread, worker
+    pool and HTTP connections. Accounts added through a manager share them
+    instead:
+
+    - a background worker with `workers` threads, each account still only
+      runs one background job at a time and due jobs are handed out fairly
+      between accounts
+    - a fast lane thread, for the packets named by each account's
+      `fast_lane`, so they don't wait behind any account's slow jobs
+    - a worker pool of `pool_size` threads, each account can have at most
+      its `max_parallel` tasks in it
+    - the HTTPS connection pools, accounts logging in with the same curve
+      use the same connections
+    - a timer wheel, each account's timers still go off on its own
+      background worker
+
+    Each account still has its own event stream.
+
+    Keyword arguments given here are used as defaults for every account.
+    """
+
+    def __init__(self, workers=2, pool_size=16, **kwargs):
+        self._defaults = kwargs
+        self._lock = threading.Lock()
+        self._accounts = []
+        self._adapters = {}
+        self._worker = ArloBackgroundWorker(self, workers, name="ArloManagerWorker")
+        self._fast_worker = ArloBackgroundWorker(self, name="ArloManagerFastLane")
+        self._pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="ArloManagerPool")
+        self._timers = ArloTimerWheel(self)
+
+    def add(self, **kwargs):
+        """Add an account.
+
+        Takes the same arguments as `PyArlo`. The account name defaults to
+        the username so each account keeps its own state files.
+
+        :return: The `PyArlo` object for the account.
+        """
+        from . import PyArlo
+
+        args = dict(self._defaults, **kwargs)
+        args.setdefault("name", args.get("username", None))
+        arlo = PyArlo(manager=self, **args)
+        with self._lock:
+            self._accounts.append(arlo)
+        return arlo
+
+    def remove(self, arlo, logout=False):
+        """Stop an account and remove it from the manager."""
+        with self._lock:
+            if arlo not in self._accounts:
+                return False
+            self._accounts.remove(arlo)
+        arlo.stop(logout=logout)
+        return True
+
+    @property
+    def accounts(self):
+        with self._lock:
+            return list(self._accounts)
+
+    @property
+    def threads(self):
+        """The shared threads that are running."""
+        pool = [thread for thread in self._pool._threads if thread.is_alive()]
+        return self._worker.thread_list + self._fast_worker.thread_list + pool + self._timers.threads
+
+    @property
+    def worker(self):
+        """The shared background worker."""
+        return self._worker
+
+    @property
+    def fast_worker(self):
+        """The shared background worker for `fast_lane` packets."""
+        return self._fast_worker
+
+    def share_pool(self, limit):
+        """Return a share of the worker pool allowing `limit` tasks at once."""
+        return ArloPoolShare(self._pool, limit)
+
+    def share_timers(self, dispatch):
+        """Return a share of the timer wheel whose timers go off through `dispatch`."""
+        return ArloTimerShare(self._timers, dispatch)
+
+    def share_connections(self, session, curve):
+        """Have session use the connection pool of an earlier login with the same curve, if there is one."""
+        with self._lock:
+            adapter = self._adapters.get(curve, None)
+        if adapter is not None:
+            session.mount("https://", adapter)
+
+    def keep_connections(self, session, curve):
+        """Offer session's connection pool to later logins, call once it has logged in."""
+        with self._lock:
+            self._adapters.setdefault(curve, session.get_adapter("https://"))
+
+    def drop_connections(self, session, curve):
+        """Stop sharing session's connection pool, call if it failed to log in."""
+        with self._lock:
+            if self._adapters.get(curve, None) is session.get_adapter("https://"):
+                del self._adapters[curve]
+
+    def stats(self):
+        """Return resource usage for each account and for the shared threads.
+
+        Per account there are the `threads` it runs on its own, the
+        background `jobs` it has run, how many seconds they took (`busy`)
+        and how many are `queued`, its tasks `running` and `waiting` in the
+        worker pool and roughly how many bytes of `memory` its state and
+        telemetry take.
+        """
+        stats = {
+            "shared": {
+                "accounts": len(self.accounts),
+                "threads": len(self.threads),
+            }
+        }
+        for arlo in self.accounts:
+            account = arlo.bg.stats()
+            account.update(arlo.pool.stats())
+            account["threads"] = len(arlo.threads)
+            account["memory"] = arlo.st.memory_usage()
+            if arlo.telemetry is not None:
+                account["memory"] += arlo.telemetry.memory_usage()
+            stats[arlo.cfg.name] = account
+        return stats
+
+    def stop(self, logout=False):
+        """Stop every account and the shared threads."""
+        for arlo in self.accounts:
+            try:
+                self.remove(arlo, logout=logout)
+            except Exception as e:
+                self.error(f"stop-error={type(e).__name__}\n{traceback.format_exc()}")
+        self._worker.stop()
+        self._fast_worker.stop()
+        self._pool.shutdown(wait=False)
+        self._timers.stop()
+
+    def error(self, msg):
+        _LOGGER.error(msg)
+
+    def warning(self, msg):
+        _LOGGER.warning(msg)
+
+    def info(self, msg):
+        _LOGGER.info(msg)
+
+    def debug(self, msg):
+        _LOGGER.debug(msg)
@@ -75,6 +75,7 @@ class ArloMediaDownloader(threading.Thread):
         # Calculate name.
         save_file = self._output_name(media)
         if save_file is None:
+            self._arlo.metrics.inc("media_download_failures_total")
             return -1
         try:
             # See if it exists.
@@ -85,6 +86,7 @@ class ArloMediaDownloader(threading.Thread):
                 save_file_tmp = f"{save_file}.tmp"
                 media.download_video(save_file_tmp)
                 os.rename(save_file_tmp, save_file)
+                self._arlo.metrics.inc("media_download_bytes_total", os.path.getsize(save_file))
                 return 1
             else:
                 self.vdebug(
@@ -93,6 +95,7 @@ class ArloMediaDownloader(threading.Thread):
                 return 0
         except OSError as _e:
             self._arlo.error(f"failed to download: {save_file}")
+            self._arlo.metrics.inc("media_download_failures_total")
             return -1
 
     def run(self):
@@ -125,6 +128,8 @@ class ArloMediaDownloader(threading.Thread):
         if self._save_format == "":
             return
         with self._lock:
+            if not self._stopThread and self.ident is None:
+                self.start()
             self._queue.append(media)
             if len(self._queue) == 1:
                 self._lock.notify()
@@ -135,13 +140,19 @@ class ArloMediaDownloader(threading.Thread):
         with self._lock:
             self._stopThread = True
             self._lock.notify()
-        self.join(10)
+        if self.ident is not None:
+            self.join(10)
 
     @property
     def processing(self):
         with self._lock:
             return len(self._queue) > 0 or self._downloading
 
+    @property
+    def queued(self):
+        with self._lock:
+            return len(self._queue)
+
     def debug(self, msg):
         self._arlo.debug(f"media-downloader: {msg}")
 
@@ -162,10 +173,10 @@ class ArloMediaLibrary(object):
         self._snapshots = {}
         self._base = None
 
+        # The downloader thread is started when there is something to download.
         self._downloader = ArloMediaDownloader(arlo, self._arlo.cfg.save_media_to)
         self._downloader.name = "ArloMediaDownloader"
         self._downloader.daemon = True
-        self._downloader.start()
 
     def __repr__(self):
         return "<{0}:{1}>".format(self.__class__.__name__, self._arlo.cfg.name)
@@ -186,6 +197,7 @@ class ArloMediaLibrary(object):
         # get current videos
         with self._lock:
             keys = self._video_keys
+        known = set(keys)
 
         # add in new images
         videos = []
@@ -213,7 +225,7 @@ class ArloMediaLibrary(object):
                 key = "{0}:{1}".format(
                     camera.device_id, arlotime_strftime(video.get("utcCreatedDate"))
                 )
-                if key in keys:
+                if key in known:
                     self.vdebug(f"skipping {key} for {camera.name}")
                     continue
                 self.debug(f"adding {key} for {camera.name}")
@@ -221,6 +233,7 @@ class ArloMediaLibrary(object):
                 videos.append(video)
                 self._downloader.queue_download(video)
                 keys.append(key)
+                known.add(key)
 
         # note changes and run callbacks
         with self._lock:
@@ -236,17 +249,22 @@ class ArloMediaLibrary(object):
         for cb in cbs:
             cb()
 
-    def load(self):
+    def load(self, data=None):
+        """Load the library.
 
-        # set beginning and end
-        days = self._arlo.cfg.library_days
-        now = datetime.today()
-        date_from = (now - timedelta(days=days)).strftime("%Y%m%d")
-        date_to = now.strftime("%Y%m%d")
-        self.debug("loading image library ({} days)".format(days))
+        :param data: Use this library, as returned by `raw`, instead of
+                     fetching it from Arlo.
+        """
+        if data is None:
+            # set beginning and end
+            days = self._arlo.cfg.library_days
+            now = datetime.today()
+            date_from = (now - timedelta(days=days)).strftime("%Y%m%d")
+            date_to = now.strftime("%Y%m%d")
+            self.debug("loading image library ({} days)".format(days))
 
-        # save videos for cameras we know about
-        data = self._fetch_library(date_from, date_to)
+            # save videos for cameras we know about
+            data = self._fetch_library(date_from, date_to)
 
         if data is None:
             self._arlo.warning("error loading the image library")
@@ -298,6 +316,11 @@ class ArloMediaLibrary(object):
             self._snapshots = snapshots
             self.debug("load-count=" + str(self._count))
 
+    def raw(self):
+        """Return the library as the list Arlo sent us."""
+        with self._lock:
+            return [media._attrs for media in self._videos + list(self._snapshots.values())]
+
     def snapshot_for(self, camera):
         with self._lock:
             return self._snapshots.get(camera.device_id, None)
@@ -330,6 +353,16 @@ class ArloMediaLibrary(object):
     def stop(self):
         self._downloader.stop()
 
+    @property
+    def downloads_queued(self):
+        """Number of recordings waiting to be downloaded."""
+        return self._downloader.queued
+
+    @property
+    def threads(self):
+        """The threads the library is running."""
+        return [self._downloader] if self._downloader.is_alive() else []
+
     def debug(self, msg):
         self._arlo.debug(f"media-library: {msg}")
 
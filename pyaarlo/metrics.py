@@ -0,0 +1,170 @@
+import bisect
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds, in seconds.
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float("inf"))
+
+# name -> (type, help)
+METRICS = {
+    "requests_total": ("counter", "HTTP requests made to Arlo, by endpoint and status."),
+    "request_seconds": ("histogram", "How long HTTP requests to Arlo took, by endpoint."),
+    "request_bytes_total": ("counter", "Bytes returned by HTTP requests to Arlo, by endpoint."),
+    "event_stream_reconnects_total": ("counter", "Times the event stream was reopened."),
+    "events_total": ("counter", "Event packets received, by resource type."),
+    "background_queue_depth": ("gauge", "Jobs waiting on the background worker."),
+    "background_lag_seconds": ("histogram", "How long after they were due background jobs started."),
+    "media_download_queue": ("gauge", "Recordings waiting to be downloaded."),
+    "media_download_bytes_total": ("counter", "Bytes of recordings downloaded."),
+    "media_download_failures_total": ("counter", "Recordings that failed to download."),
+    "storage_save_seconds": ("histogram", "How long saving the device state took."),
+    "storage_size_bytes": ("gauge", "Size of the saved device state."),
+}
+
+_ID_SEGMENT = re.compile(r"^(?=.*\d)[\w\-!]{10,}$")
+
+
+def endpoint_name(path):
+    """Return path without its query and with device, location and user ids
+    replaced by `{id}`, to keep the number of endpoints down.
+    """
+    path = path.split("?", 1)[0]
+    return "/".join("{id}" if _ID_SEGMENT.match(part) else part for part in path.split("/"))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in items) + "}"
+
+
+class ArloMetrics(object):
+    """Counters, gauges and histograms served in the Prometheus text format.
+
+    The metrics are listed in `METRICS`. When disabled every method returns
+    straight away, callers with labels to work out should check `enabled`
+    first.
+
+    Gauges that are cheaper to read when scraped than to keep up to date
+    come from collectors, functions returning `(name, value, labels)`
+    tuples.
+    """
+
+    def __init__(self, enabled=False, prefix="pyaarlo"):
+        self._enabled = enabled
+        self._prefix = prefix
+        self._lock = threading.Lock()
+        self._values = {name: {} for name in METRICS}
+        self._collectors = []
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    def inc(self, name, value=1, **labels):
+        if not self._enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            values = self._values[name]
+            values[key] = values.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        if not self._enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[name][key] = value
+
+    def observe(self, name, value, **labels):
+        if not self._enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            hist = self._values[name].get(key, None)
+            if hist is None:
+                hist = self._values[name][key] = {"count": 0, "sum": 0.0, "buckets": [0] * len(METRICS_BUCKETS)}
+            hist["count"] += 1
+            hist["sum"] += value
+            hist["buckets"][bisect.bisect_left(METRICS_BUCKETS, value)] += 1
+
+    def add_collector(self, collector):
+        """Add a function returning `(name, value, labels)` tuples, called on each scrape."""
+        self._collectors.append(collector)
+
+    def get(self, name, **labels):
+        """Return the value of a counter or gauge, `None` if it hasn't been set."""
+        with self._lock:
+            return self._values[name].get(tuple(sorted(labels.items())), None)
+
+    def text(self):
+        """Return every metric in the Prometheus text format."""
+        for collector in self._collectors:
+            for name, value, labels in collector():
+                self.set(name, value, **labels)
+
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in METRICS.items():
+                full = f"{self._prefix}_{name}"
+                lines.append(f"# HELP {full} {help_text}")
+                lines.append(f"# TYPE {full} {kind}")
+                for key, value in sorted(self._values[name].items()):
+                    if kind != "histogram":
+                        lines.append(f"{full}{_labels(key)} {value}")
+                        continue
+                    total = 0
+                    for bound, count in zip(METRICS_BUCKETS, value["buckets"]):
+                        total += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{full}_bucket{_labels(key, [('le', le)])} {total}")
+                    lines.append(f"{full}_sum{_labels(key)} {value['sum']}")
+                    lines.append(f"{full}_count{_labels(key)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+
+class ArloMetricsServer(object):
+    """Serves `ArloMetrics` on `http://host:port/metrics`."""
+
+    def __init__(self, arlo, metrics, host, port):
+        self._arlo = arlo
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                arlo.vdebug("metrics: " + fmt % args)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="ArloMetricsServer")
+        self._thread.daemon = True
+        self._thread.start()
+        arlo.debug(f"metrics: serving on {host}:{self.port}")
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    @property
+    def threads(self):
+        return [self._thread] if self._thread.is_alive() else []
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
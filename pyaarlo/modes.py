@@ -0,0 +1,120 @@
+from .constant import (
+    CUSTOM_MODE_UUID_KEY,
+    MODE_ID_TO_NAME_KEY,
+    MODE_IS_SCHEDULE_KEY,
+    MODE_NAME_TO_ID_KEY,
+)
+
+
+class ArloModeTable(object):
+    """The modes, schedules and custom modes known to a base or location.
+
+    Lookups in either direction are dictionary reads. The table is never
+    changed once built; adding modes returns a new table so readers don't
+    need a lock.
+
+    Custom modes are kept per device as name to uuid, with the reverse map
+    built alongside.
+    """
+
+    def __init__(self, ids=None, names=None, schedules=None, custom=None):
+        # mode id -> name, name -> mode id, lower case id or name -> is schedule
+        self._ids = dict(ids or {})
+        self._names = dict(names or {})
+        self._schedules = dict(schedules or {})
+        # device id -> name -> uuid
+        self._custom = {device_id: dict(modes) for device_id, modes in (custom or {}).items()}
+        self._index()
+
+    def _index(self):
+        self._lower = {}
+        for name, mode_id in self._names.items():
+            self._lower.setdefault(name.lower(), mode_id)
+        self._uuids = {}
+        self._custom_lower = {}
+        for device_id, modes in self._custom.items():
+            uuids = self._uuids.setdefault(device_id, {})
+            for name, uuid in modes.items():
+                uuids.setdefault(uuid, name)
+                self._custom_lower.setdefault(name.lower(), (device_id, uuid))
+
+    def with_modes(self, modes=(), custom=()):
+        """Return a new table with extra entries.
+
+        :param modes: `(mode_id, name, key, schedule)` tuples, `key` is the
+                      name to look the mode up by.
+        :param custom: `(device_id, name, uuid)` tuples.
+        """
+        table = ArloModeTable(self._ids, self._names, self._schedules, self._custom)
+        for mode_id, name, key, schedule in modes:
+            table._ids[mode_id] = name
+            table._names[key] = mode_id
+            if schedule is not None:
+                table._schedules[mode_id.lower()] = schedule
+                table._schedules[name.lower()] = schedule
+        for device_id, name, uuid in custom:
+            table._custom.setdefault(device_id, {})[name] = uuid
+        table._index()
+        return table
+
+    def id_to_name(self, mode_id):
+        return self._ids.get(mode_id, None)
+
+    def name_to_id(self, name, ignore_case=False):
+        mode_id = self._names.get(name, None)
+        if mode_id is None and ignore_case:
+            mode_id = self._lower.get(name.lower(), None)
+        return mode_id
+
+    def is_schedule(self, mode_id):
+        return self._schedules.get(mode_id.lower(), False)
+
+    def custom_uuid(self, device_id, name_or_uuid):
+        """Return the uuid for a custom mode name or uuid, `None` if unknown."""
+        uuid = self._custom.get(device_id, {}).get(name_or_uuid, None)
+        if uuid is None and name_or_uuid in self._uuids.get(device_id, {}):
+            uuid = name_or_uuid
+        return uuid
+
+    def custom_name(self, device_id, uuid):
+        """Return the name of a custom mode, or the uuid if unknown."""
+        return self._uuids.get(device_id, {}).get(uuid, uuid)
+
+    def find_custom(self, name):
+        """Return `(device_id, uuid)` for a custom mode name on any device, ignoring case."""
+        return self._custom_lower.get(name.lower(), None)
+
+    @property
+    def modes(self):
+        """Returns a dictionary of mode name to id."""
+        return dict(self._names)
+
+    def to_dict(self):
+        return {
+            "ids": dict(self._ids),
+            "names": dict(self._names),
+            "schedules": dict(self._schedules),
+            "custom": {device_id: dict(modes) for device_id, modes in self._custom.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("ids"), data.get("names"), data.get("schedules"), data.get("custom"))
+
+    @classmethod
+    def from_items(cls, items):
+        """Build a table from the per mode storage entries older versions wrote.
+
+        :param items: `(key, value)` pairs as returned by `_load_matching`.
+        """
+        ids, names, schedules, custom = {}, {}, {}, {}
+        for key, value in items:
+            if key[-2] == MODE_ID_TO_NAME_KEY:
+                ids[key[-1]] = value
+            elif key[-2] == MODE_NAME_TO_ID_KEY:
+                names[key[-1]] = value
+            elif key[-2] == MODE_IS_SCHEDULE_KEY:
+                schedules[key[-1]] = value
+            elif key[-3] == CUSTOM_MODE_UUID_KEY:
+                custom.setdefault(key[-2], {})[key[-1]] = value
+        return cls(ids, names, schedules, custom)
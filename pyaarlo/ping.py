@@ -0,0 +1,122 @@
+import threading
+import traceback
+
+
+class ArloPinger(object):
+    """Pings the base stations to keep their subscriptions alive.
+
+    Normally every base gets a notify of its own. With `group_pings` set the
+    bases sharing an xcloud id are pinged with a single notify, sent to the
+    first of them and listing them all. If a grouped ping fails its bases are
+    pinged one at a time so one dead base doesn't take the others with it.
+
+    Pings run in parallel on the worker pool instead of one after another on
+    the background worker. A new round isn't started while the last one is
+    still running.
+
+    With `ping_quiet_time` set a base we've had a packet from recently isn't
+    pinged at all, the packet already shows it's connected.
+    """
+
+    def __init__(self, arlo, pool):
+        self._arlo = arlo
+        self._pool = pool
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {"sent": 0, "saved": 0, "stale": 0, "failed": 0}
+
+    def _count(self, name, count=1):
+        with self._lock:
+            self._stats[name] += count
+
+    def quiet(self, bases):
+        """Return the bases that have been quiet long enough to need a ping.
+
+        The others are marked as available.
+        """
+        quiet_time = self._arlo.cfg.ping_quiet_time
+        if not quiet_time:
+            return list(bases)
+        quiet = []
+        for base in bases:
+            seen = self._arlo.be.last_seen(base.device_id)
+            if seen is None:
+                quiet.append(base)
+            elif seen >= quiet_time:
+                self._count("stale")
+                quiet.append(base)
+            else:
+                self._count("saved")
+                base.update_connection(True)
+        return quiet
+
+    def groups(self, bases):
+        """Split bases into the groups that get a ping each."""
+        if not self._arlo.cfg.group_pings:
+            return [[base] for base in bases]
+        groups = {}
+        for base in bases:
+            groups.setdefault(base.xcloud_id or base.device_id, []).append(base)
+        return list(groups.values())
+
+    def ping(self, bases):
+        """Ping bases.
+
+        :return: `False` if the last round hadn't finished so nothing was sent.
+        """
+        with self._lock:
+            if self._pending:
+                self._arlo.vdebug(f"ping: {self._pending} groups still running")
+                return False
+            # Hold the round while we work out who needs a ping.
+            self._pending = 1
+        groups = []
+        try:
+            groups = self.groups(self.quiet(bases))
+        finally:
+            with self._lock:
+                self._pending = len(groups)
+        if not groups:
+            return True
+        for group in groups:
+            try:
+                self._pool.submit(self._ping_group, group)
+            except RuntimeError:
+                # Shutting down.
+                with self._lock:
+                    self._pending -= 1
+        return True
+
+    def _ping_group(self, group):
+        try:
+            leader = group[0]
+            self._count("sent")
+            if leader.send_ping([base.device_id for base in group]):
+                for base in group:
+                    base.update_connection(True)
+            elif len(group) == 1:
+                self._count("failed")
+                leader.update_connection(False)
+            else:
+                self._arlo.debug(f"ping: group ping to {leader.name} failed, trying one at a time")
+                for base in group:
+                    self._count("sent")
+                    available = base.send_ping()
+                    if not available:
+                        self._count("failed")
+                    base.update_connection(available)
+        except Exception as e:
+            self._arlo.error(f"ping-error={type(e).__name__}\n{traceback.format_exc()}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def stats(self):
+        """Return ping counts.
+
+        `sent` pings, pings `saved` because the base had been heard from
+        recently, `stale` bases that had been heard from but too long ago and
+        `failed` pings.
+        """
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+
+class ArloProfiler(object):
+    """Records how long each phase of starting up takes.
+
+    A phase is a named stretch of work; login, fetching the device list,
+    refreshing the bases and so on. Phases can nest and the same phase can
+    run on several threads at once, its time then runs from when the first
+    one started to when the last one finished.
+
+    Requests made while a phase is active on the current thread are counted
+    against it, along with the number of bytes they returned. Worker threads
+    pick up a phase with `attribute`.
+
+    Recording stops when `finish` is called.
+    """
+
+    def __init__(self):
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._phases = {}
+        self._order = []
+        self._requests = 0
+        self._bytes = 0
+        self._ready = None
+        self._total = None
+
+    def _now(self):
+        return time.monotonic() - self._start
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def begin(self, name):
+        """Mark the start of a phase."""
+        if self._total is not None:
+            return
+        with self._lock:
+            phase = self._phases.get(name, None)
+            if phase is None:
+                phase = self._phases[name] = {
+                    "start": self._now(),
+                    "duration": None,
+                    "calls": 0,
+                    "requests": 0,
+                    "bytes": 0,
+                }
+                self._order.append(name)
+            phase["calls"] += 1
+
+    def end(self, name):
+        """Mark the end of a phase."""
+        if self._total is not None:
+            return
+        with self._lock:
+            phase = self._phases.get(name, None)
+            if phase is not None:
+                phase["duration"] = self._now() - phase["start"]
+
+    @contextmanager
+    def attribute(self, name):
+        """Count requests made by this thread against phase `name`."""
+        stack = self._stack()
+        stack.append(name)
+        try:
+            yield
+        finally:
+            stack.pop()
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as phase `name`."""
+        self.begin(name)
+        try:
+            with self.attribute(name):
+                yield
+        finally:
+            self.end(name)
+
+    def request(self, size=0):
+        """Record a request.
+
+        It is counted against every phase active on the current thread.
+
+        :param size: Number of bytes returned.
+        """
+        if self._total is not None:
+            return
+        stack = self._stack()
+        with self._lock:
+            self._requests += 1
+            self._bytes += size
+            for name in set(stack):
+                phase = self._phases.get(name, None)
+                if phase is not None:
+                    phase["requests"] += 1
+                    phase["bytes"] += size
+
+    def ready(self):
+        """Mark when the devices became usable."""
+        with self._lock:
+            if self._ready is None:
+                self._ready = self._now()
+
+    def finish(self):
+        """Stop recording."""
+        with self._lock:
+            if self._total is None:
+                self._total = self._now()
+
+    @property
+    def finished(self):
+        return self._total is not None
+
+    def report(self):
+        """Returns the profile as a dictionary.
+
+        `ready` is the number of seconds until the devices could be used and
+        `total` how long until startup finished, both are `None` until they
+        have happened. `phases` maps phase names, in the order they started,
+        to their `start` and `duration` in seconds, the number of `calls` and
+        the number of `requests` and `bytes` made while they ran.
+        """
+        with self._lock:
+            return {
+                "ready": self._ready,
+                "total": self._total,
+                "requests": self._requests,
+                "bytes": self._bytes,
+                "phases": {name: dict(self._phases[name]) for name in self._order},
+            }
+
+    def json(self, **kwargs):
+        """Returns the profile as a JSON string.
+
+        :param kwargs: Passed to `json.dumps`.
+        """
+        return json.dumps(self.report(), **kwargs)
@@ -65,7 +65,9 @@ class ArloRatls(object):
             response = self._base_client.open(request)
             if raw:
                 return response
-            return json.loads(response.read())
+            data = response.read()
+            self._arlo.profiler.request(len(data))
+            return json.loads(data)
         except Exception as e:
             self._arlo.warning("request-error={}".format(type(e).__name__))
             return None
@@ -0,0 +1,66 @@
+import threading
+
+
+class ArloDeviceRegistry(object):
+    """Keeps the lists of devices and indexes them.
+
+    Devices are grouped by kind - `bases`, `cameras` and so on - and each
+    kind is indexed by device id, unique id, name and entity id so lookups
+    don't have to walk the lists.
+
+    If more than one device shares a value the first one added is returned,
+    the same as searching the list would.
+
+    `version` changes every time a device is added or removed, objects that
+    cache links to other devices can use it to know when to look again.
+    """
+
+    FIELDS = ("device_id", "unique_id", "name", "entity_id")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._devices = {}
+        self._index = {}
+        self.version = 0
+
+    def devices(self, kind):
+        """Return the list of devices of this kind.
+
+        The list is kept up to date as devices are added and removed.
+        """
+        with self._lock:
+            return self._devices.setdefault(kind, [])
+
+    def add(self, kind, device):
+        with self._lock:
+            self._devices.setdefault(kind, []).append(device)
+            for field in self.FIELDS:
+                index = self._index.setdefault((kind, field), {})
+                value = getattr(device, field)
+                index[value] = index.get(value, ()) + (device,)
+            self.version += 1
+        return device
+
+    def remove(self, kind, device):
+        with self._lock:
+            devices = self._devices.get(kind, [])
+            if device not in devices:
+                return False
+            devices.remove(device)
+            for field in self.FIELDS:
+                index = self._index[(kind, field)]
+                value = getattr(device, field)
+                kept = tuple(d for d in index.get(value, ()) if d is not device)
+                if kept:
+                    index[value] = kept
+                else:
+                    index.pop(value, None)
+            self.version += 1
+            return True
+
+    def lookup(self, kind, field, value):
+        """Return the device of kind whose field matches value, or `None`."""
+        devices = self._index.get((kind, field), {}).get(value, None)
+        if devices:
+            return devices[0]
+        return None
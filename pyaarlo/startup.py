@@ -0,0 +1,111 @@
+import threading
+import time
+import traceback
+
+
+class ArloStartup(object):
+    """Runs the initial refresh as a set of dependent phases.
+
+    Each phase has a list of independent tasks, usually one per device, and
+    a list of phases it has to wait for. A phase starts as soon as the phases
+    it depends on have finished and its tasks are run on the shared worker
+    pool, so the pool size bounds how much runs at once.
+
+    Timings are kept for each phase and the phases are also recorded by the
+    profiler.
+    """
+
+    def __init__(self, arlo, pool):
+        self._arlo = arlo
+        self._pool = pool
+        self._lock = threading.Condition()
+        self._phases = {}
+        self._order = []
+        self._started = set()
+        self._finished = set()
+        self._start = None
+        self._timings = {}
+
+    def add_phase(self, name, tasks, depends_on=()):
+        """Add a phase.
+
+        :param name: Name of the phase.
+        :param tasks: List of functions to call, they are run concurrently.
+        :param depends_on: Names of phases that have to finish first, they
+                           must already have been added.
+        """
+        for dep in depends_on:
+            if dep not in self._phases:
+                raise ValueError(f"startup phase {name} depends on unknown phase {dep}")
+        self._phases[name] = {"tasks": list(tasks), "depends_on": tuple(depends_on), "pending": 0}
+        self._order.append(name)
+
+    def _maybe_start(self, name):
+        phase = self._phases[name]
+        if name in self._started or any(dep not in self._finished for dep in phase["depends_on"]):
+            return
+        self._started.add(name)
+        self._timings[name] = {
+            "start": time.monotonic() - self._start,
+            "tasks": len(phase["tasks"]),
+            "errors": 0,
+        }
+        self._arlo.debug(f"startup: {name} starting")
+        self._arlo.profiler.begin(name)
+        if not phase["tasks"]:
+            self._finish(name)
+            return
+        phase["pending"] = len(phase["tasks"])
+        for task in phase["tasks"]:
+            self._pool.submit(self._run_task, name, task)
+
+    def _finish(self, name):
+        timing = self._timings[name]
+        timing["duration"] = time.monotonic() - self._start - timing["start"]
+        self._finished.add(name)
+        self._arlo.profiler.end(name)
+        self._arlo.debug(f"startup: {name} finished in {timing['duration']:.3f}s")
+        for other in self._order:
+            self._maybe_start(other)
+        self._lock.notify_all()
+
+    def _run_task(self, name, task):
+        error = False
+        try:
+            with self._arlo.profiler.attribute(name):
+                task()
+        except Exception as e:
+            error = True
+            self._arlo.error(f"startup-error={type(e).__name__}\n{traceback.format_exc()}")
+        with self._lock:
+            phase = self._phases[name]
+            phase["pending"] -= 1
+            if error:
+                self._timings[name]["errors"] += 1
+            if phase["pending"] == 0:
+                self._finish(name)
+
+    def run(self):
+        """Run all the phases and wait for them to finish.
+
+        :return: The timings, see `timings`.
+        """
+        self._start = time.monotonic()
+        with self._lock:
+            for name in self._order:
+                self._maybe_start(name)
+            while len(self._finished) < len(self._order):
+                self._lock.wait(1)
+        self._timings["total"] = {"start": 0, "duration": time.monotonic() - self._start}
+        return self.timings
+
+    @property
+    def timings(self):
+        """Returns a dictionary of phase name to timings.
+
+        Each entry has `start`, seconds from when the pipeline started,
+        `duration` in seconds, and the number of `tasks` and `errors`.
+        `total` covers the whole run.
+        """
+        with self._lock:
+            return {name: dict(timing) for name, timing in self._timings.items()}
@@ -1,81 +1,465 @@
 import fnmatch
+import os
 import pickle
 import pprint
+import sqlite3
+import sys
 import threading
+import time
+
+# Bump this if the layout of the saved state changes.
+STORAGE_VERSION = 2
+
+
+def _is_pattern(part):
+    return isinstance(part, str) and ("*" in part or "?" in part or "[" in part)
 
 
 class ArloStorage(object):
+    """Holds the state of all the Arlo objects.
+
+    Keys are tuples of interned strings; the object class, the object id
+    and then the attribute. They are stored in a tree, `db[class][id][attr]`,
+    so lookups are a few dictionary accesses and wildcard queries only walk
+    the part of the tree they need to.
+
+    Keys can still be passed as lists or `/` separated strings.
+
+    If `snapshot_storage` is set the tree is copy-on-write. Writers copy the
+    path down to the attribute they change and publish a new root, readers
+    take whatever root is current and never need the lock.
+    """
+
     def __init__(self, arlo):
         self._arlo = arlo
         self._state_file = self._arlo.cfg.state_file
+        self._snapshot = self._arlo.cfg.snapshot_storage
         self.db = {}
         self.lock = threading.Lock()
         self.load()
 
     def _ekey(self, key):
-        return key if not isinstance(key, list) else "/".join(key)
+        if isinstance(key, tuple):
+            return key
+        if isinstance(key, str):
+            key = key.split("/")
+        return self.key(*key)
+
+    @staticmethod
+    def _select(tree, part):
+        if not _is_pattern(part):
+            branch = tree.get(part, None)
+            if branch is not None:
+                yield part, branch
+            return
+        for name, branch in tree.items():
+            if fnmatch.fnmatch(name, part):
+                yield name, branch
+
+    @staticmethod
+    def _get(db, ekey, default):
+        try:
+            return db[ekey[0]][ekey[1]][ekey[2:]]
+        except (KeyError, IndexError):
+            return default
 
-    def _keys_matching(self, key):
-        mkeys = []
+    def _items_matching(self, db, key):
         ekey = self._ekey(key)
-        for mkey in self.db:
-            if fnmatch.fnmatch(mkey, ekey):
-                mkeys.append(mkey)
-        return mkeys
+        rest = ekey[2:]
+        has_pattern = any(_is_pattern(part) for part in rest)
+        items = []
+        for cls, devices in self._select(db, ekey[0]):
+            for dev, attrs in self._select(devices, ekey[1]):
+                if not has_pattern:
+                    if rest in attrs:
+                        items.append(((cls, dev) + rest, attrs[rest]))
+                    continue
+                for akey, value in attrs.items():
+                    if len(akey) != len(rest):
+                        continue
+                    matched = True
+                    for i, part in enumerate(akey):
+                        if rest[i] != part and not fnmatch.fnmatch(part, rest[i]):
+                            matched = False
+                            break
+                    if matched:
+                        items.append(((cls, dev) + akey, value))
+        return items
+
+    def _set(self, ekey, value):
+        devices = self.db.get(ekey[0], None)
+        if devices is None:
+            devices = self.db[ekey[0]] = {}
+        attrs = devices.get(ekey[1], None)
+        if attrs is None:
+            attrs = devices[ekey[1]] = {}
+        attrs[ekey[2:]] = value
+
+    def _cow_set(self, items):
+        # Copy the paths from the root to the attributes, each dictionary
+        # only once, then publish them with a single assignment.
+        db = dict(self.db)
+        copied = set()
+        for ekey, value in items:
+            if ekey[0] not in copied:
+                db[ekey[0]] = dict(db.get(ekey[0], {}))
+                copied.add(ekey[0])
+            devices = db[ekey[0]]
+            if ekey[:2] not in copied:
+                devices[ekey[1]] = dict(devices.get(ekey[1], {}))
+                copied.add(ekey[:2])
+            devices[ekey[1]][ekey[2:]] = value
+        self.db = db
+
+    def _cow_unset(self, ekey):
+        db = dict(self.db)
+        devices = db[ekey[0]] = dict(db[ekey[0]])
+        attrs = devices[ekey[1]] = dict(devices[ekey[1]])
+        del attrs[ekey[2:]]
+        if not attrs:
+            del devices[ekey[1]]
+            if not devices:
+                del db[ekey[0]]
+        self.db = db
+
+    def _rebuild(self, items):
+        self.db = {}
+        for key, value in items:
+            self._set(self._ekey(key), value)
+
+    def _flatten(self):
+        for cls, devices in self.db.items():
+            for dev, attrs in devices.items():
+                for rest, value in attrs.items():
+                    yield (cls, dev) + rest, value
 
     def load(self):
         if self._state_file is not None:
             try:
                 with self.lock:
                     with open(self._state_file, "rb") as dump:
-                        self.db = pickle.load(dump)
+                        db = pickle.load(dump)
+                    if db.get("version", None) == STORAGE_VERSION:
+                        # Re-insert to intern the keys.
+                        self.db = db["db"]
+                        self._rebuild(list(self._flatten()))
+                    else:
+                        # Old flat dictionary with "/" separated keys.
+                        self._rebuild(db.items())
             except Exception:
                 self._arlo.debug("storage: file not read")
 
+    def _dump(self, db):
+        with open(self._state_file, "wb") as dump:
+            pickle.dump({"version": STORAGE_VERSION, "db": db}, dump)
+
     def save(self):
         if self._state_file is not None:
             try:
-                with self.lock:
-                    with open(self._state_file, "wb") as dump:
-                        pickle.dump(self.db, dump)
+                start = time.monotonic()
+                if self._snapshot:
+                    # Published trees never change so there is no need to
+                    # hold up writers while we pickle.
+                    self._dump(self.db)
+                else:
+                    with self.lock:
+                        self._dump(self.db)
+                self._saved(start, self._state_file)
             except Exception:
                 self._arlo.warning("storage: file not written")
 
+    def _saved(self, start, file_name):
+        metrics = self._arlo.metrics
+        if metrics.enabled:
+            metrics.observe("storage_save_seconds", time.monotonic() - start)
+            if os.path.exists(file_name):
+                metrics.set("storage_size_bytes", os.path.getsize(file_name))
+
     def file_name(self):
         return self._state_file
 
+    def record(self, key, value):
+        """Note an attribute change. Only the SQLite store keeps history."""
+        pass
+
+    def history(self, device_id=None, attr=None, start=None, end=None, limit=None, cls=None):
+        """Return attribute history. Only the SQLite store keeps history."""
+        return []
+
+    @staticmethod
+    def key(*parts):
+        """Build a storage key from its parts.
+
+        Callers that use the same key repeatedly should build it once and
+        reuse it.
+        """
+        return tuple(sys.intern(part) if isinstance(part, str) else part for part in parts)
+
     def get(self, key, default=None):
+        ekey = self._ekey(key)
+        if self._snapshot:
+            return self._get(self.db, ekey, default)
         with self.lock:
-            ekey = self._ekey(key)
-            return self.db.get(ekey, default)
+            return self._get(self.db, ekey, default)
 
     def get_matching(self, key, default=None):
+        """Return a list of `(key, value)` tuples matching key.
+
+        Each part of the key can be a shell style wildcard. Returned keys are
+        tuples.
+        """
+        if self._snapshot:
+            return self._items_matching(self.db, key)
         with self.lock:
-            gets = []
-            for mkey in self._keys_matching(key):
-                gets.append((mkey, self.db.get(mkey, default)))
-            return gets
+            return self._items_matching(self.db, key)
 
     def keys_matching(self, key):
+        return [mkey for mkey, _ in self.get_matching(key)]
+
+    def snapshot(self):
+        """Return a consistent, read only, view of the current state.
+
+        With `snapshot_storage` this is free, otherwise the tree is copied.
+        """
+        if self._snapshot:
+            return ArloStorageSnapshot(self, self.db)
         with self.lock:
-            return self._keys_matching(key)
+            db = {cls: {dev: dict(attrs) for dev, attrs in devices.items()}
+                  for cls, devices in self.db.items()}
+        return ArloStorageSnapshot(self, db)
 
     def set(self, key, value, prefix=""):
         ekey = self._ekey(key)
-        output = "set:" + ekey + "=" + str(value)
+        output = "set:" + "/".join(map(str, ekey)) + "=" + str(value)
         self._arlo.debug(f"{prefix}: {output[:80]}")
         with self.lock:
-            self.db[ekey] = value
+            if self._snapshot:
+                self._cow_set([(ekey, value)])
+            else:
+                self._set(ekey, value)
             return value
 
+    def update(self, items, prefix=""):
+        """Set several keys in one go.
+
+        Values are compared and written while holding the lock once.
+
+        :param items: A list of `(key, value)` tuples.
+        :return: A list of `(key, old_value, value)` tuples for the keys that changed.
+        """
+        items = [(self._ekey(key), value) for key, value in items]
+        changed = []
+        with self.lock:
+            db = self.db
+            for ekey, value in items:
+                old = self._get(db, ekey, None)
+                if value != old:
+                    changed.append((ekey, old, value))
+            if self._snapshot:
+                self._cow_set([(ekey, value) for ekey, _, value in changed])
+            else:
+                for ekey, _, value in changed:
+                    self._set(ekey, value)
+        if changed:
+            self._arlo.debug(f"{prefix}: update:{len(changed)}/{len(items)} changed")
+        return changed
+
     def unset(self, key):
+        ekey = self._ekey(key)
         with self.lock:
-            del self.db[self._ekey(key)]
+            if self._snapshot:
+                self._cow_unset(ekey)
+                return
+            devices = self.db[ekey[0]]
+            attrs = devices[ekey[1]]
+            del attrs[ekey[2:]]
+            if not attrs:
+                del devices[ekey[1]]
+                if not devices:
+                    del self.db[ekey[0]]
 
     def clear(self):
         with self.lock:
             self.db = {}
 
+    def memory_usage(self):
+        """Return roughly how many bytes the state takes, its pickled size."""
+        with self.lock:
+            return len(pickle.dumps(self.db))
+
     def dump(self):
         with self.lock:
             pprint.pprint(self.db)
+
+
+class ArloStorageSnapshot(object):
+    """An unchanging copy of the state, see `ArloStorage.snapshot`."""
+
+    def __init__(self, storage, db):
+        self._storage = storage
+        self._db = db
+
+    def get(self, key, default=None):
+        return self._storage._get(self._db, self._storage._ekey(key), default)
+
+    def get_matching(self, key, default=None):
+        return self._storage._items_matching(self._db, key)
+
+
+class ArloSqliteStorage(ArloStorage):
+    """Keeps the state in a SQLite database.
+
+    Current values are still served from the in memory tree, the database
+    holds a copy of them plus an append only history of attribute changes.
+    Changes are queued and written in a single transaction when `save` is
+    called or when enough of them build up.
+    """
+
+    BATCH_SIZE = 500
+
+    def __init__(self, arlo):
+        self._db_file = arlo.cfg.state_db_file
+        self._db_lock = threading.Lock()
+        self._dirty = set()
+        self._history = []
+        self._flush_queued = False
+        self._conn = sqlite3.connect(self._db_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS state "
+                           "(cls TEXT, id TEXT, attr TEXT, value BLOB, PRIMARY KEY (cls, id, attr))")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS history "
+                           "(ts REAL, cls TEXT, id TEXT, attr TEXT, value BLOB)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS history_device ON history (id, attr, ts)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS history_attr ON history (attr, ts)")
+        super().__init__(arlo)
+
+    @staticmethod
+    def _split(ekey):
+        return ekey[0], ekey[1], "/".join(map(str, ekey[2:]))
+
+    def load(self):
+        with self._db_lock:
+            rows = self._conn.execute("SELECT cls, id, attr, value FROM state").fetchall()
+        if not rows:
+            # First run with the database, bring across any pickled state.
+            super().load()
+            self._dirty = set(key for key, _ in self._flatten())
+            return
+        with self.lock:
+            items = []
+            for cls, dev, attr, value in rows:
+                try:
+                    items.append(([cls, dev] + attr.split("/"), pickle.loads(value)))
+                except Exception:
+                    self._arlo.debug(f"storage: bad value for {cls}/{dev}/{attr}")
+            self._rebuild(items)
+
+    def set(self, key, value, prefix=""):
+        ekey = self._ekey(key)
+        super().set(ekey, value, prefix)
+        with self._db_lock:
+            self._dirty.add(ekey)
+        return value
+
+    def update(self, items, prefix=""):
+        changed = super().update(items, prefix)
+        with self._db_lock:
+            self._dirty.update(ekey for ekey, _, _ in changed)
+        return changed
+
+    def unset(self, key):
+        ekey = self._ekey(key)
+        super().unset(ekey)
+        with self._db_lock:
+            self._dirty.add(ekey)
+
+    def clear(self):
+        super().clear()
+        with self._db_lock:
+            self._dirty = set()
+            self._conn.execute("DELETE FROM state")
+
+    def record(self, key, value):
+        # Images and the like have no place in the history.
+        if isinstance(value, (bytes, bytearray)):
+            return
+        ekey = self._ekey(key)
+        with self._db_lock:
+            self._history.append((time.time(),) + self._split(ekey) + (pickle.dumps(value),))
+            if len(self._history) < self.BATCH_SIZE or self._flush_queued:
+                return
+            self._flush_queued = True
+        self._arlo.bg.run(self.save)
+
+    def _write(self):
+        with self._db_lock:
+            dirty, self._dirty = self._dirty, set()
+            history, self._history = self._history, []
+            self._flush_queued = False
+            if not dirty and not history:
+                return
+            updates = []
+            deletes = []
+            for ekey in dirty:
+                value = self.get(ekey, self)
+                if value is self:
+                    deletes.append(self._split(ekey))
+                else:
+                    updates.append(self._split(ekey) + (pickle.dumps(value),))
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany("INSERT OR REPLACE INTO state VALUES (?, ?, ?, ?)", updates)
+                self._conn.executemany("DELETE FROM state WHERE cls=? AND id=? AND attr=?", deletes)
+                self._conn.executemany("INSERT INTO history VALUES (?, ?, ?, ?, ?)", history)
+                self._prune()
+
+    def _prune(self):
+        if self._arlo.cfg.history_days:
+            self._conn.execute("DELETE FROM history WHERE ts < ?",
+                               (time.time() - self._arlo.cfg.history_days * 86400,))
+        if self._arlo.cfg.history_max_rows:
+            self._conn.execute("DELETE FROM history WHERE rowid <= "
+                               "(SELECT MAX(rowid) FROM history) - ?",
+                               (self._arlo.cfg.history_max_rows,))
+
+    def save(self):
+        try:
+            start = time.monotonic()
+            self._write()
+            self._saved(start, self._db_file)
+        except Exception as e:
+            self._arlo.warning(f"storage: database not written {e}")
+
+    def file_name(self):
+        return self._db_file
+
+    def history(self, device_id=None, attr=None, start=None, end=None, limit=None, cls=None):
+        """Return attribute changes, oldest first.
+
+        :param device_id: Only return changes for this device.
+        :param attr: Only return changes to this attribute.
+        :param start: Only return changes at or after this time, seconds since the epoch.
+        :param end: Only return changes before this time, seconds since the epoch.
+        :param limit: Return, at most, the last `limit` changes.
+        :param cls: Only return changes for this type of object, eg, `ArloCamera`.
+        :return: A list of `(time, device_id, attr, value)` tuples.
+        """
+        self.save()
+        where = []
+        args = []
+        for column, op, value in (("cls", "=", cls), ("id", "=", device_id), ("attr", "=", attr),
+                                  ("ts", ">=", start), ("ts", "<", end)):
+            if value is not None:
+                where.append(f"{column} {op} ?")
+                args.append(value)
+        sql = "SELECT ts, id, attr, value FROM history"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC, rowid DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(limit)
+        with self._db_lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [(ts, dev, attr, pickle.loads(value)) for ts, dev, attr, value in reversed(rows)]
@@ -5,10 +5,20 @@ from unidecode import unidecode
 if TYPE_CHECKING:
     from . import PyArlo
 
+from .callbacks import ArloCallbacks
 from .constant import (
+    CUSTOM_MODE_UUID_KEY,
+    MODE_ID_TO_NAME_KEY,
+    MODE_IS_SCHEDULE_KEY,
+    MODE_NAME_TO_ID_KEY,
+    MODE_TABLE_KEY,
     RESOURCE_KEYS,
     RESOURCE_UPDATE_KEYS,
 )
+from .modes import ArloModeTable
+
+# All the keys update_resources looks for, built once.
+_RESOURCE_KEYS = frozenset(RESOURCE_KEYS + RESOURCE_UPDATE_KEYS)
 
 
 class ArloSuper(object):
@@ -37,7 +47,9 @@ class ArloSuper(object):
         self._uid = uid
 
         self._lock = threading.Lock()
-        self._attr_cbs_ = []
+        self._attr_cbs_ = ArloCallbacks("*")
+        self._batch_cbs_ = ArloCallbacks("*")
+        self._storage_keys = {}
 
         # add a listener
         self._arlo.be.add_listener(self, self._event_handler)
@@ -47,11 +59,15 @@ class ArloSuper(object):
         return f"<{self.__class__.__name__}:{self.device_type}:{self.name}>"
 
     def _to_storage_key(self, attr):
-        # Build a key incorporating the type!
+        # Build a key incorporating the type! Simple attributes are looked up
+        # all the time so we build their keys once.
         if isinstance(attr, list):
-            return [self.__class__.__name__, self._id] + attr
-        else:
-            return [self.__class__.__name__, self._id, attr]
+            return self._arlo.st.key(self.__class__.__name__, self._id, *attr)
+        key = self._storage_keys.get(attr, None)
+        if key is None:
+            key = self._arlo.st.key(self.__class__.__name__, self._id, attr)
+            self._storage_keys[attr] = key
+        return key
 
     def _event_handler(self, resource, event):
         self.vdebug(f"{self._name}: object got {resource} event")
@@ -61,28 +77,89 @@ class ArloSuper(object):
         self.update_resources(event.get("properties", event))
 
     def _do_callbacks(self, attr, value):
-        cbs = []
-        with self._lock:
-            for watch, cb in self._attr_cbs_:
-                if watch == attr or watch == "*":
-                    cbs.append(cb)
-        for cb in cbs:
+        for cb in self._attr_cbs_.get(attr):
+            self._arlo.tracer.mark("callback")
             cb(self, attr, value)
 
     def _save(self, attr, value):
         self._arlo.st.set(self._to_storage_key(attr), value, prefix=self._id)
 
-    def _save_and_do_callbacks(self, attr, value):
+    def _changed(self, attr, value, telemetry=True):
+        self._arlo.tracer.mark("storage")
+        self._arlo.st.record(self._to_storage_key(attr), value)
+        if telemetry and self._arlo.telemetry is not None:
+            self._arlo.telemetry.record(self, attr, value)
+        self._do_callbacks(attr, value)
+
+    def _save_and_do_callbacks(self, attr, value, telemetry=True):
+        """Save the value and run the callbacks if it changed.
+
+        :param telemetry: `False` if the caller has already recorded the value,
+                          with its own time stamp, in the device's telemetry.
+        """
         if value != self._load(attr):
             self._save(attr, value)
-            self._do_callbacks(attr, value)
+            self._changed(attr, value, telemetry)
             self.debug(f"{attr}: NEW {str(value)[:80]}")
         else:
             self.vdebug(f"{attr}: OLD {str(value)[:80]}")
 
+    def _save_all_and_do_callbacks(self, values):
+        """Save several attributes and run callbacks for those that changed.
+
+        :param values: A dictionary of attribute to value.
+        :return: A dictionary of attribute to `(old_value, value)` for the
+                 attributes that changed.
+        """
+        attrs = {}
+        items = []
+        for attr, value in values.items():
+            key = self._to_storage_key(attr)
+            attrs[key] = attr
+            items.append((key, value))
+        diff = {}
+        for key, old, value in self._arlo.st.update(items, prefix=self._id):
+            diff[attrs[key]] = (old, value)
+        if not diff:
+            return diff
+        self.debug(f"NEW {', '.join(diff)}")
+        for attr, (_, value) in diff.items():
+            self._changed(attr, value)
+        for cb in self._batch_cbs_.get("*"):
+            cb(self, diff)
+        return diff
+
     def _load(self, attr, default=None):
         return self._arlo.st.get(self._to_storage_key(attr), default)
 
+    def _load_mode_table(self):
+        data = self._load(MODE_TABLE_KEY, None)
+        if data is not None:
+            return ArloModeTable.from_dict(data)
+
+        # Older versions kept an entry per mode, move them into the table.
+        items = []
+        for attr in ([MODE_ID_TO_NAME_KEY, "*"], [MODE_NAME_TO_ID_KEY, "*"],
+                     [MODE_IS_SCHEDULE_KEY, "*"], [CUSTOM_MODE_UUID_KEY, "*", "*"]):
+            items += self._load_matching(attr)
+        table = ArloModeTable.from_items(items)
+        if items:
+            self.debug(f"moving {len(items)} mode entries into the mode table")
+            self._save(MODE_TABLE_KEY, table.to_dict())
+            for key, _ in items:
+                self._arlo.st.unset(key)
+        return table
+
+    def _add_modes(self, modes=(), custom=()):
+        """Add entries to the mode table and save it.
+
+        Modes and schedules can be parsed on different threads, the lock
+        stops one update losing the other.
+        """
+        with self._lock:
+            self._modes = self._modes.with_modes(modes, custom)
+            self._save(MODE_TABLE_KEY, self._modes.to_dict())
+
     def _load_matching(self, attr, default=None):
         return self._arlo.st.get_matching(self._to_storage_key(attr), default)
 
@@ -118,10 +195,10 @@ class ArloSuper(object):
         return self._uid
 
     def update_resources(self, props):
-        for key in RESOURCE_KEYS + RESOURCE_UPDATE_KEYS:
-            value = props.get(key, None)
-            if value is not None:
-                self._save_and_do_callbacks(key, value)
+        self._save_all_and_do_callbacks({
+            key: value for key, value in props.items()
+            if key in _RESOURCE_KEYS and value is not None
+        })
 
     def attribute(self, attr, default=None):
         """Return the value of attribute attr.
@@ -144,7 +221,33 @@ class ArloSuper(object):
             value = default
         return value
 
-    def add_attr_callback(self, attr, cb):
+    def attribute_history(self, attr, start=None, end=None, limit=None):
+        """Return the recorded changes to attribute attr.
+
+        History is only kept when the `state_db` option is enabled.
+
+        :param attr: Attribute to look up.
+        :param start: Only return changes at or after this time, seconds since the epoch.
+        :param end: Only return changes before this time, seconds since the epoch.
+        :param limit: Return, at most, the last `limit` changes.
+        :return: A list of `(time, value)` tuples, oldest first.
+        """
+        return [(ts, value) for ts, _, _, value in
+                self._arlo.st.history(self._id, attr, start, end, limit, cls=self.__class__.__name__)]
+
+    def attribute_series(self, attr):
+        """Return the recent samples of numeric attribute attr.
+
+        Samples are only kept when the `telemetry_size` option is set.
+
+        :param attr: Attribute - eg `batteryLevel` - to look up.
+        :return: An `ArloSeries` or `None` if nothing has been recorded.
+        """
+        if self._arlo.telemetry is None:
+            return None
+        return self._arlo.telemetry.series(self, attr)
+
+    def add_attr_callback(self, attr, cb, weak=False):
         """Add an callback to be triggered when an attribute changes.
 
         Used to register callbacks to track device activity. For example, get a notification whenever
@@ -155,9 +258,39 @@ class ArloSuper(object):
         :param attr: Attribute - eg `motionStarted` - to monitor.
         :type attr: str
         :param cb: Callback to run.
+        :param weak: Only hold a weak reference to the callback, it is removed once its owner goes away.
+        :return: An `ArloSubscription`, call its `unsubscribe` method to remove the callback.
         """
-        with self._lock:
-            self._attr_cbs_.append((attr, cb))
+        return self._attr_cbs_.add(attr, cb, weak)
+
+    def add_batch_callback(self, cb, weak=False):
+        """Add a callback to be triggered once for each group of attribute changes.
+
+        The callback is passed the device and a dictionary of attribute to
+        `(old_value, new_value)`. It runs after the individual attribute
+        callbacks.
+
+        :param cb: Callback to run.
+        :param weak: Only hold a weak reference to the callback.
+        :return: An `ArloSubscription`, call its `unsubscribe` method to remove the callback.
+        """
+        return self._batch_cbs_.add("*", cb, weak)
+
+    def del_attr_callback(self, attr, cb):
+        """Remove a callback added with `add_attr_callback`.
+
+        :param attr: Attribute the callback was registered against.
+        :param cb: Callback to remove.
+        :return: `True` if the callback was found, `False` otherwise.
+        """
+        return self._attr_cbs_.remove(attr, cb)
+
+    def detach(self):
+        """Stop listening for events.
+
+        Called when the device has been removed from the account.
+        """
+        self._arlo.be.del_listener(self, self._event_handler)
 
     @property
     def state(self):
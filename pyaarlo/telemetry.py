@@ -0,0 +1,158 @@
+import bisect
+import sys
+import threading
+import time
+from array import array
+
+from .constant import TELEMETRY_KEYS
+
+
+class ArloSeries(object):
+    """A fixed size ring buffer of `(time, value)` samples.
+
+    Times and values live in two `array` objects allocated up front, so the
+    memory used never grows. Queries find their window with a binary search
+    on the times and then walk the values in it.
+    """
+
+    def __init__(self, size):
+        self._size = size
+        self._times = array("d", bytes(8 * size))
+        self._values = array("d", bytes(8 * size))
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, ts, value):
+        """Add a sample. Samples that are older than the newest or don't change
+        the value are dropped.
+        """
+        with self._lock:
+            if self._count:
+                last = (self._next - 1) % self._size
+                if ts < self._times[last] or value == self._values[last]:
+                    return False
+            self._times[self._next] = ts
+            self._values[self._next] = value
+            self._next = (self._next + 1) % self._size
+            if self._count < self._size:
+                self._count += 1
+            return True
+
+    def _ordered(self):
+        if self._count < self._size:
+            return self._times[:self._count], self._values[:self._count]
+        return (self._times[self._next:] + self._times[:self._next],
+                self._values[self._next:] + self._values[:self._next])
+
+    def _window(self, start, end):
+        with self._lock:
+            times, values = self._ordered()
+        lo = 0 if start is None else bisect.bisect_left(times, start)
+        hi = len(times) if end is None else bisect.bisect_left(times, end)
+        return times[lo:hi], values[lo:hi]
+
+    def samples(self, start=None, end=None):
+        """Return the samples as a list of `(time, value)` tuples, oldest first."""
+        return list(zip(*self._window(start, end)))
+
+    def last(self):
+        with self._lock:
+            if not self._count:
+                return None
+            last = (self._next - 1) % self._size
+            return self._times[last], self._values[last]
+
+    def min(self, start=None, end=None):
+        _, values = self._window(start, end)
+        return min(values) if values else None
+
+    def max(self, start=None, end=None):
+        _, values = self._window(start, end)
+        return max(values) if values else None
+
+    def mean(self, start=None, end=None):
+        _, values = self._window(start, end)
+        return sum(values) / len(values) if values else None
+
+    def rate(self, start=None, end=None):
+        """Return the change in value per second across the window."""
+        times, values = self._window(start, end)
+        if len(times) < 2 or times[-1] == times[0]:
+            return None
+        return (values[-1] - values[0]) / (times[-1] - times[0])
+
+    def downsample(self, points, start=None, end=None):
+        """Export the samples squeezed into, at most, `points` buckets.
+
+        :return: A list of `(time, min, mean, max)` tuples, one for each bucket
+                 holding samples. `time` is the start of the bucket.
+        """
+        times, values = self._window(start, end)
+        if not times or points <= 0:
+            return []
+        first = times[0]
+        width = (times[-1] - first) / points or 1
+        buckets = []
+        lo = 0
+        for i in range(points):
+            edge = first + width * (i + 1)
+            hi = len(times) if i == points - 1 else bisect.bisect_left(times, edge, lo)
+            if hi > lo:
+                bucket = values[lo:hi]
+                buckets.append((first + width * i, min(bucket), sum(bucket) / len(bucket), max(bucket)))
+            lo = hi
+        return buckets
+
+    def memory_usage(self):
+        return sys.getsizeof(self._times) + sys.getsizeof(self._values)
+
+
+class ArloTelemetry(object):
+    """Keeps an `ArloSeries` for each numeric attribute of each device.
+
+    Enabled by setting `telemetry_size` to the number of samples to keep.
+    """
+
+    def __init__(self, arlo):
+        self._arlo = arlo
+        self._size = arlo.cfg.telemetry_size
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def record(self, device, attr, value, ts=None):
+        if attr not in TELEMETRY_KEYS:
+            return
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return
+        key = (device.__class__.__name__, device.device_id, attr)
+        series = self._series.get(key, None)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(key, ArloSeries(self._size))
+        series.append(time.time() if ts is None else ts, value)
+
+    def series(self, device, attr):
+        """Return the `ArloSeries` for this device and attribute or `None`."""
+        return self._series.get((device.__class__.__name__, device.device_id, attr), None)
+
+    def memory_usage(self):
+        """Return the number of bytes used by the sample buffers."""
+        with self._lock:
+            series = list(self._series.values())
+        return sum(s.memory_usage() for s in series)
+
+    def stats(self):
+        with self._lock:
+            series = list(self._series.values())
+        return {
+            "series": len(series),
+            "samples": sum(len(s) for s in series),
+            "size": self._size,
+            "bytes": sum(s.memory_usage() for s in series),
+        }
@@ -0,0 +1,252 @@
+import math
+import threading
+import time
+import traceback
+import weakref
+
+
+class ArloTimer(object):
+    """A resettable one shot timer, made by `ArloTimerWheel.timer`."""
+
+    __slots__ = ("_wheel", "_callback", "_kwargs", "_dispatch", "_expires", "_slot", "__weakref__")
+
+    def __init__(self, wheel, callback, kwargs, dispatch=None):
+        self._wheel = wheel
+        self._callback = callback
+        self._kwargs = kwargs
+        self._dispatch = dispatch
+        self._expires = None
+        self._slot = None
+
+    def arm(self, seconds):
+        """Start the timer, if it's already running start it again."""
+        self._wheel._arm(self, seconds)
+
+    def cancel(self):
+        self._wheel._cancel(self)
+
+    @property
+    def armed(self):
+        return self._slot is not None
+
+
+class ArloTimerWheel(object):
+    """Runs timers that are restarted far more often than they go off.
+
+    Timers live in a hierarchical timing wheel; `levels` wheels of
+    `2 ** bits` slots, each slot of a wheel covering a whole turn of the one
+    below. Starting, restarting and cancelling a timer only adds it to, or
+    removes it from, a slot. Timers are moved down a level as their time
+    gets closer.
+
+    One thread, started when the first timer is, turns the wheel. Callbacks
+    are handed to `dispatch`, `ArloBackground.run` for example, so a slow
+    one doesn't hold up the rest.
+    """
+
+    def __init__(self, arlo, dispatch=None, resolution=0.001, bits=8, levels=4):
+        self._arlo = arlo
+        self._dispatch = dispatch
+        self._resolution = resolution
+        self._bits = bits
+        self._mask = (1 << bits) - 1
+        self._wheels = [[set() for _ in range(1 << bits)] for _ in range(levels)]
+        self._overflow = set()
+        self._lock = threading.Condition()
+        self._start = time.monotonic()
+        self._tick = 0
+        self._count = 0
+        self._wake_at = None
+        self._stopped = False
+        self._thread = None
+
+    def timer(self, callback, **kwargs):
+        """Return a new, stopped, timer that runs `callback(**kwargs)`."""
+        return ArloTimer(self, callback, kwargs)
+
+    def _now(self):
+        return int((time.monotonic() - self._start) / self._resolution)
+
+    def _place(self, timer):
+        delta = timer._expires - self._tick
+        for level, wheel in enumerate(self._wheels):
+            if delta < 1 << (self._bits * (level + 1)):
+                slot = wheel[(max(timer._expires, self._tick) >> (self._bits * level)) & self._mask]
+                break
+        else:
+            slot = self._overflow
+        slot.add(timer)
+        timer._slot = slot
+
+    def _remove(self, timer):
+        if timer._slot is not None:
+            timer._slot.discard(timer)
+            timer._slot = None
+            self._count -= 1
+
+    def _arm(self, timer, seconds):
+        with self._lock:
+            if self._stopped:
+                return
+            self._remove(timer)
+            if self._count == 0:
+                # Nothing to catch up on, skip straight to now.
+                self._tick = self._now()
+            timer._expires = self._now() + max(1, math.ceil(seconds / self._resolution))
+            self._place(timer)
+            self._count += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ArloTimerWheel")
+                self._thread.daemon = True
+                self._thread.start()
+            elif self._wake_at is None or timer._expires < self._wake_at:
+                self._lock.notify()
+
+    def _cancel(self, timer):
+        with self._lock:
+            self._remove(timer)
+
+    def _cascade(self):
+        # At the start of each turn of a wheel move the next slot of the
+        # wheel above down, biggest wheel first.
+        tick = self._tick
+        levels = len(self._wheels)
+        if tick & ((1 << (self._bits * levels)) - 1) == 0:
+            timers, self._overflow = self._overflow, set()
+            for timer in timers:
+                self._place(timer)
+        for level in range(levels - 1, 0, -1):
+            if tick & ((1 << (self._bits * level)) - 1) == 0:
+                wheel = self._wheels[level]
+                index = (tick >> (self._bits * level)) & self._mask
+                timers, wheel[index] = wheel[index], set()
+                for timer in timers:
+                    self._place(timer)
+
+    def _expire(self, now):
+        fired = []
+        while self._tick <= now and self._count:
+            self._cascade()
+            wheel = self._wheels[0]
+            index = self._tick & self._mask
+            if wheel[index]:
+                timers, wheel[index] = wheel[index], set()
+                for timer in timers:
+                    timer._slot = None
+                self._count -= len(timers)
+                fired.extend(timers)
+            self._tick += 1
+        return fired
+
+    def _next_wake(self):
+        # The next busy slot on the bottom wheel, or the end of its turn when
+        # the next slot of a wheel above comes down.
+        if not self._count:
+            return None
+        wheel = self._wheels[0]
+        end = (self._tick | self._mask) + 1
+        for tick in range(self._tick, end):
+            if wheel[tick & self._mask]:
+                return tick
+        return end
+
+    def _run(self):
+        with self._lock:
+            while not self._stopped:
+                fired = self._expire(self._now())
+                if fired:
+                    self._lock.release()
+                    try:
+                        self._fire(fired)
+                    finally:
+                        self._lock.acquire()
+                    continue
+
+                self._wake_at = self._next_wake()
+                if self._wake_at is None:
+                    self._lock.wait()
+                else:
+                    timeout = self._start + self._wake_at * self._resolution - time.monotonic()
+                    if timeout > 0:
+                        self._lock.wait(timeout)
+                self._wake_at = None
+
+    def _fire(self, timers):
+        for timer in timers:
+            # Restarted since it went off?
+            if timer._slot is not None:
+                continue
+            dispatch = timer._dispatch or self._dispatch
+            try:
+                if dispatch is not None:
+                    dispatch(timer._callback, **timer._kwargs)
+                else:
+                    timer._callback(**timer._kwargs)
+            except Exception as e:
+                self._arlo.error(f"timer-error={type(e).__name__}\n{traceback.format_exc()}")
+
+    @property
+    def armed(self):
+        """Number of timers running."""
+        return self._count
+
+    @property
+    def threads(self):
+        if self._thread is not None and self._thread.is_alive():
+            return [self._thread]
+        return []
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            self._lock.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(10)
+
+
+class ArloTimerShare(object):
+    """One account's timers on a wheel shared with other accounts.
+
+    Looks enough like an `ArloTimerWheel` for `PyArlo` to use. Its timers go
+    off through the account's own `dispatch` and stopping the share cancels
+    them, the wheel keeps turning for the other accounts.
+    """
+
+    def __init__(self, wheel, dispatch):
+        self._wheel = wheel
+        self._dispatch = dispatch
+        self._lock = threading.Lock()
+        self._timers = weakref.WeakSet()
+        self._stopped = False
+
+    def timer(self, callback, **kwargs):
+        """Return a new, stopped, timer that runs `callback(**kwargs)`."""
+        timer = ArloTimer(self, callback, kwargs, self._dispatch)
+        with self._lock:
+            self._timers.add(timer)
+        return timer
+
+    def _arm(self, timer, seconds):
+        with self._lock:
+            if not self._stopped:
+                self._wheel._arm(timer, seconds)
+
+    def _cancel(self, timer):
+        self._wheel._cancel(timer)
+
+    @property
+    def armed(self):
+        """Number of timers running."""
+        with self._lock:
+            return sum(1 for timer in self._timers if timer.armed)
+
+    @property
+    def threads(self):
+        return []
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            for timer in list(self._timers):
+                self._wheel._cancel(timer)
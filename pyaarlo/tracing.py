@@ -0,0 +1,151 @@
+import bisect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds, in seconds.
+TRACE_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, float("inf"))
+
+
+def server_time(response):
+    """Return the time, in seconds since the epoch, the server stamped a packet with.
+
+    Mode changes carry a `timestamp` per base, device updates end their
+    `transId` with the time in milliseconds. `None` if there isn't one.
+    """
+    stamps = [response.get("timestamp", None)]
+    for value in response.values():
+        if isinstance(value, dict):
+            stamps.append(value.get("timestamp", None))
+    tid = response.get("transId", None)
+    if isinstance(tid, str) and "!" in tid:
+        stamps.append(tid.rsplit("!", 1)[-1])
+    for stamp in stamps:
+        try:
+            stamp = int(stamp)
+        except (TypeError, ValueError):
+            continue
+        # Milliseconds after 2001 or so.
+        if 1000000000000 <= stamp < 10000000000000:
+            return stamp / 1000
+    return None
+
+
+class ArloTrace(object):
+    """The timing of one packet, from when it arrived."""
+
+    __slots__ = ("_tracer", "_received", "_wall")
+
+    def __init__(self, tracer):
+        self._tracer = tracer
+        self._received = time.monotonic()
+        self._wall = time.time()
+
+    def mark(self, stage):
+        """Record that the packet reached `stage`."""
+        self._tracer.record(stage, time.monotonic() - self._received)
+
+
+class ArloTracer(object):
+    """Traces event packets from arrival to their callbacks.
+
+    When enabled, each packet is stamped as it arrives and again at each
+    stage after that:
+
+    - `dispatch`, the dispatcher has it
+    - `queue`, a background job starts handling it
+    - `storage`, it has changed an attribute
+    - `callback`, an attribute callback is about to run
+
+    Each stage has a histogram of seconds since arrival.
+
+    Packets stamped by the server also give the difference between its clock
+    and ours plus the network delay. The smallest difference seen recently
+    is taken as the clock skew. What's left over on each packet is
+    counted as the `network` stage.
+
+    Background jobs pick up the packet's trace with `attach`. When tracing is
+    off no traces are made and marks are a thread local lookup.
+    """
+
+    def __init__(self, enabled=False, skew_samples=100):
+        self._enabled = enabled
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stages = {}
+        self._offsets = deque(maxlen=skew_samples)
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    def receive(self):
+        """Start a trace for a packet that has just arrived, `None` if tracing is off."""
+        return ArloTrace(self) if self._enabled else None
+
+    def dispatch(self, trace, response):
+        """Note the packet has reached the dispatcher and check its server time."""
+        if trace is None:
+            return
+        trace.mark("dispatch")
+        sent = server_time(response)
+        if sent is None:
+            return
+        offset = trace._wall - sent
+        with self._lock:
+            self._offsets.append(offset)
+            skew = min(self._offsets)
+        self.record("network", offset - skew)
+
+    @contextmanager
+    def attach(self, trace, stage="queue"):
+        """Mark `stage` and make `trace` the current trace for this thread."""
+        if trace is None:
+            yield
+            return
+        trace.mark(stage)
+        previous = getattr(self._local, "trace", None)
+        self._local.trace = trace
+        try:
+            yield
+        finally:
+            self._local.trace = previous
+
+    def mark(self, stage):
+        """Record `stage` against this thread's current trace, if it has one."""
+        trace = getattr(self._local, "trace", None)
+        if trace is not None:
+            trace.mark(stage)
+
+    def record(self, stage, seconds):
+        with self._lock:
+            hist = self._stages.get(stage, None)
+            if hist is None:
+                hist = self._stages[stage] = {"count": 0, "sum": 0.0, "buckets": [0] * len(TRACE_BUCKETS)}
+            hist["count"] += 1
+            hist["sum"] += seconds
+            hist["buckets"][bisect.bisect_left(TRACE_BUCKETS, seconds)] += 1
+
+    @property
+    def skew(self):
+        """Seconds our clock is ahead of the server's, `None` until a stamped packet arrives."""
+        with self._lock:
+            return min(self._offsets) if self._offsets else None
+
+    def stats(self):
+        """Return the clock `skew` and, for each stage, the `count`, `sum`
+        and `mean` seconds and `buckets`, a list of `(upper bound, count)`
+        pairs. Bucket counts aren't cumulative.
+        """
+        with self._lock:
+            stages = {}
+            for stage, hist in self._stages.items():
+                stages[stage] = {
+                    "count": hist["count"],
+                    "sum": hist["sum"],
+                    "mean": hist["sum"] / hist["count"],
+                    "buckets": list(zip(TRACE_BUCKETS, hist["buckets"])),
+                }
+            skew = min(self._offsets) if self._offsets else None
+        return {"skew": skew, "stages": stages}
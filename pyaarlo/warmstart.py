@@ -0,0 +1,56 @@
+import os
+import pickle
+import time
+
+# Bump this if the layout of the snapshot changes.
+WARM_START_VERSION = 1
+
+
+class ArloWarmStart(object):
+    """Saves what PyArlo needs to rebuild its devices without asking Arlo.
+
+    That is the raw device and location lists and the media library index.
+    Device state - modes, last images and so on - is already kept by
+    `ArloStorage`.
+    """
+
+    def __init__(self, arlo):
+        self._arlo = arlo
+        self._file = arlo.cfg.warm_start_file
+
+    def load(self):
+        """Return the saved snapshot or `None` if there isn't a usable one."""
+        if self._file is None:
+            return None
+        try:
+            with open(self._file, "rb") as dump:
+                snapshot = pickle.load(dump)
+        except Exception:
+            self._arlo.debug("warm start: file not read")
+            return None
+        if snapshot.get("version", None) != WARM_START_VERSION:
+            self._arlo.debug("warm start: wrong version")
+            return None
+        if snapshot.get("username", None) != self._arlo.cfg.username:
+            self._arlo.debug("warm start: different user")
+            return None
+        self._arlo.debug(f"warm start: snapshot from {time.ctime(snapshot['saved'])}")
+        return snapshot
+
+    def save(self):
+        if self._file is None or not self._arlo.cfg.warm_start:
+            return
+        snapshot = {
+            "version": WARM_START_VERSION,
+            "username": self._arlo.cfg.username,
+            "saved": time.time(),
+            "locations": self._arlo.location_data,
+            "devices": self._arlo.devices,
+            "library": self._arlo.ml.raw(),
+        }
+        try:
+            with open(self._file + ".tmp", "wb") as dump:
+                pickle.dump(snapshot, dump)
+            os.replace(self._file + ".tmp", self._file)
+        except Exception:
+            self._arlo.warning("warm start: file not written")
@@ -1,21 +1,83 @@
 import logging
 from pyaarlo.cfg import ArloCfg
+from pyaarlo.metrics import ArloMetrics
+from pyaarlo.profiler import ArloProfiler
+from pyaarlo.registry import ArloDeviceRegistry
+from pyaarlo.storage import ArloStorage
+from pyaarlo.tracing import ArloTracer
 
 
 _LOGGER = logging.getLogger("pyaarlo")
 
 
+class ArloBackEnd(object):
+
+    def __init__(self):
+        self.listeners = []
+        self.seen = {}
+
+    def add_listener(self, device, callback):
+        self.listeners.append((device, callback))
+
+    def del_listener(self, device, callback):
+        self.listeners.remove((device, callback))
+
+    def last_seen(self, device_id):
+        return self.seen.get(device_id, None)
+
+
 class PyArlo(object):
 
     def __init__(self, **kwargs):
         """Constructor for the PyArlo object."""
         self._last_error = None
         self._cfg = ArloCfg(self, **kwargs)
+        self._metrics = ArloMetrics(self._cfg.metrics_port != 0)
+        self._st = ArloStorage(self)
+        self._be = ArloBackEnd()
+        self._registry = ArloDeviceRegistry()
+        self._profiler = ArloProfiler()
+        self._tracer = ArloTracer(self._cfg.trace_events)
 
     @property
     def cfg(self):
         return self._cfg
 
+    @property
+    def st(self):
+        return self._st
+
+    @property
+    def be(self):
+        return self._be
+
+    @property
+    def profiler(self):
+        return self._profiler
+
+    @property
+    def tracer(self):
+        return self._tracer
+
+    @property
+    def metrics(self):
+        return self._metrics
+
+    @property
+    def telemetry(self):
+        return None
+
+    @property
+    def base_stations(self):
+        return self._registry.devices("bases")
+
+    @property
+    def topology_version(self):
+        return self._registry.version
+
+    def lookup_base_station_by_id(self, device_id):
+        return self._registry.lookup("bases", "device_id", device_id)
+
     def error(self, msg):
         self._last_error = msg
         _LOGGER.error(msg)
@@ -0,0 +1,119 @@
+import threading
+from types import SimpleNamespace
+from unittest import TestCase
+
+import tests.arlo
+from pyaarlo.backend import ArloBackEnd
+
+
+class Background(object):
+    """Runs jobs straight away, noting which worker ran them."""
+
+    def __init__(self, name, ran):
+        self.name = name
+        self.ran = ran
+
+    def run(self, bg_cb, **kwargs):
+        self.ran.append(self.name)
+        bg_cb(**kwargs)
+
+
+class TestArloBackEnd(TestCase):
+    def setUp(self):
+        self.arlo = tests.arlo.PyArlo(save_state=False, save_session=False)
+        self.be = ArloBackEnd(self.arlo, login=False)
+        self.arlo.bg = self.arlo.fast_bg = Background("bg", [])
+
+    def test_wait_for_device(self):
+        self.assertFalse(self.be.wait_for_device("1234", 0.01))
+        timer = threading.Timer(0.02, self.be.device_seen, ["1234"])
+        timer.start()
+        self.assertTrue(self.be.wait_for_device("1234", 5))
+        timer.join()
+
+    def test_seen_from_events(self):
+        self.be._event_dispatcher({"resource": "subscriptions/abcd", "from": "1234"})
+        self.assertTrue(self.be.wait_for_device("1234", 0))
+        self.assertFalse(self.be.wait_for_device("5678", 0))
+
+    def test_seen_through_base(self):
+        self.be._event_dispatcher({"resource": "cameras/5678", "from": "1234", "properties": {"batteryLevel": 50}})
+        self.assertIsNotNone(self.be.last_seen("1234"))
+        self.assertIsNotNone(self.be.last_seen("5678"))
+
+    def test_seen_by_unique_id(self):
+        base = SimpleNamespace(device_id="1234", unique_id="1234_ABCD")
+        self.be.add_listener(base, lambda resource, event: None)
+        self.be._event_dispatcher({"resource": "activeAutomations", "1234_ABCD": {"activeModes": ["mode1"]}})
+        self.assertIsNotNone(self.be.last_seen("1234"))
+        self.assertIsNone(self.be.last_seen("1234_ABCD"))
+
+    def test_last_seen(self):
+        self.assertIsNone(self.be.last_seen("1234"))
+        self.be.device_seen("1234")
+        self.assertLess(self.be.last_seen("1234"), 1)
+
+    def test_fast_lane(self):
+        ran, events = [], []
+        self.arlo.bg = Background("normal", ran)
+        self.arlo.fast_bg = Background("fast", ran)
+        device = SimpleNamespace(device_id="1234", unique_id="1234_ABCD")
+        self.be.add_listener(device, lambda resource, event: events.append(resource))
+        self.be._event_dispatcher({"resource": "doorbells/1234", "from": "1234",
+                                   "properties": {"buttonPressed": True}})
+        self.be._event_dispatcher({"resource": "doorbells/1234", "from": "1234",
+                                   "properties": {"batteryLevel": 50}})
+        self.be._event_dispatcher({"resource": "devices", "from": "5678",
+                                   "devices": {"1234": {"motionDetected": True}}})
+        self.assertEqual(ran, ["fast", "normal", "fast"])
+        self.assertEqual(events, ["doorbells/1234", "doorbells/1234", "devices"])
+        latency = self.be.latency.stats()
+        self.assertEqual(latency["fast"]["count"], 2)
+        self.assertEqual(latency["normal"]["count"], 1)
+
+
+class Response(object):
+    status_code = 200
+    headers = {"Content-Type": "application/json"}
+    content = b"{}"
+
+    def json(self):
+        return {}
+
+
+class Session(object):
+    """Counts how many requests are in progress at once."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most = 0
+
+    def get(self, url, **kwargs):
+        with self.lock:
+            self.running += 1
+            self.most = max(self.most, self.running)
+        threading.Event().wait(0.02)
+        with self.lock:
+            self.running -= 1
+        return Response()
+
+
+class TestArloBackEndRequests(TestCase):
+    def _requests(self, **kwargs):
+        arlo = tests.arlo.PyArlo(save_state=False, save_session=False, **kwargs)
+        be = ArloBackEnd(arlo, login=False)
+        be._session = Session()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(be._request_tuple("/path", raw=True)))
+                   for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [(200, {})] * 6)
+        return be._session.most
+
+    def test_one_at_a_time(self):
+        self.assertEqual(self._requests(), 1)
+        self.assertEqual(self._requests(max_parallel=3), 1)
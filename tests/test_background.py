@@ -0,0 +1,104 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+import tests.arlo
+from pyaarlo.background import ArloBackground, ArloBackgroundWorker
+from pyaarlo.manager import ArloPoolShare
+
+
+class TestArloBackground(TestCase):
+    def setUp(self):
+        self.arlo = tests.arlo.PyArlo(save_state=False)
+        self.lock = threading.Lock()
+        self.events = []
+
+    def _job(self, name, delay=0.0):
+        def job():
+            time.sleep(delay)
+            with self.lock:
+                self.events.append(name)
+        return job
+
+    def _wait_for(self, count):
+        for _ in range(200):
+            with self.lock:
+                if len(self.events) >= count:
+                    return
+            time.sleep(0.01)
+        self.fail("jobs didn't run")
+
+    def test_own_worker(self):
+        bg = ArloBackground(self.arlo)
+        bg.run(self._job("a"))
+        bg.run_high(self._job("b"))
+        self._wait_for(2)
+        self.assertEqual(sorted(self.events), ["a", "b"])
+        self.assertEqual(len(bg.threads), 1)
+        self.assertEqual(bg.stats()["jobs"], 2)
+        bg.stop()
+
+    def test_shared_fair(self):
+        worker = ArloBackgroundWorker(self.arlo, workers=1)
+        busy = ArloBackground(self.arlo, worker)
+        quiet = ArloBackground(self.arlo, worker)
+
+        # Hold the worker while jobs queue up.
+        gate = threading.Event()
+        busy.run(gate.wait)
+        time.sleep(0.05)
+        for i in range(5):
+            busy.run(self._job(f"busy{i}"))
+        quiet.run(self._job("quiet"))
+        gate.set()
+
+        self._wait_for(6)
+        self.assertLess(self.events.index("quiet"), 2)
+        self.assertEqual(busy.threads, [])
+        worker.stop()
+
+    def test_shared_serial(self):
+        worker = ArloBackgroundWorker(self.arlo, workers=4)
+        bg = ArloBackground(self.arlo, worker)
+        running = []
+        most = []
+
+        def job():
+            with self.lock:
+                running.append(1)
+                most.append(len(running))
+            time.sleep(0.02)
+            with self.lock:
+                running.pop()
+                self.events.append("job")
+
+        for _ in range(4):
+            bg.run(job)
+        self._wait_for(4)
+        self.assertEqual(max(most), 1)
+        worker.stop()
+
+
+class TestArloPoolShare(TestCase):
+    def test_limit(self):
+        pool = ThreadPoolExecutor(max_workers=8)
+        share = ArloPoolShare(pool, 2)
+        lock = threading.Lock()
+        running = [0]
+        most = [0]
+
+        def task(i):
+            with lock:
+                running[0] += 1
+                most[0] = max(most[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return i
+
+        futures = [share.submit(task, i) for i in range(6)]
+        self.assertEqual([f.result(5) for f in futures], list(range(6)))
+        self.assertEqual(most[0], 2)
+        self.assertEqual(share.stats(), {"running": 0, "waiting": 0})
+        pool.shutdown()
@@ -0,0 +1,87 @@
+import threading
+import time
+from unittest import TestCase
+
+import tests.arlo
+from pyaarlo.base import ArloBase, index_automations
+
+
+class TestIndexAutomations(TestCase):
+    def test_index(self):
+        data = [
+            {"uniqueId": "1234_A", "activeModes": ["mode0"]},
+            {"uniqueId": "5678_B", "activeModes": ["mode1"]},
+            {"uniqueId": "1234_A", "activeSchedules": ["schedule.1"]},
+        ]
+        automations = index_automations(data)
+        self.assertEqual(len(automations["1234_A"]), 2)
+        self.assertEqual(automations["5678_B"], [data[1]])
+        self.assertEqual(automations.get("9999_C", ()), ())
+
+    def test_no_data(self):
+        self.assertEqual(index_automations(None), {})
+
+
+class ArloBackEnd(tests.arlo.ArloBackEnd):
+    """Hears from a device once it has been pinged."""
+
+    def __init__(self, answer=True):
+        super().__init__()
+        self.answer = answer
+        self.pinged = threading.Event()
+
+    def wait_for_device(self, device_id, timeout):
+        if self.answer and self.pinged.wait(timeout):
+            return True
+        time.sleep(timeout)
+        return False
+
+
+class TestWaitUntilReady(TestCase):
+    def setUp(self):
+        self.arlo = tests.arlo.PyArlo(save_state=False)
+        self.base = ArloBase("base", self.arlo, {"deviceId": "1234", "deviceType": "basestation"})
+        self.pings = 0
+
+    def _ping(self):
+        self.pings += 1
+        self.arlo.be.pinged.set()
+
+    def test_ready_after_ping(self):
+        self.arlo._be = ArloBackEnd()
+        self.base.ping = self._ping
+        self.assertTrue(self.base.wait_until_ready(timeout=0.02, budget=1))
+        self.assertEqual(self.pings, 1)
+
+    def test_budget(self):
+        self.arlo._be = ArloBackEnd(answer=False)
+        self.base.ping = self._ping
+        start = time.monotonic()
+        self.assertFalse(self.base.wait_until_ready(timeout=0.05, budget=0.12))
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(self.pings, 2)
+
+
+class AutomationBackEnd(tests.arlo.ArloBackEnd):
+    """Rejects the first mode change."""
+
+    def __init__(self):
+        super().__init__()
+        self.posts = 0
+
+    def post(self, path, params=None, **kwargs):
+        self.posts += 1
+        return {"success": True} if self.posts > 1 else None
+
+    def devices(self):
+        return []
+
+
+class TestSetModeV2(TestCase):
+    def test_retry_waited_for(self):
+        arlo = tests.arlo.PyArlo(save_state=False, mode_api="v2")
+        arlo._be = AutomationBackEnd()
+        base = ArloBase("base", arlo, {"deviceId": "1234", "deviceType": "basestation"})
+        base._add_modes([("mode1", "armed", "armed", False)])
+        self.assertTrue(base.set_mode("armed", wait_for="response"))
+        self.assertEqual(arlo.be.posts, 2)
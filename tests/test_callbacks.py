@@ -0,0 +1,52 @@
+import gc
+from unittest import TestCase
+
+from pyaarlo.callbacks import ArloCallbacks
+
+
+class Consumer(object):
+    def __init__(self):
+        self.seen = 0
+
+    def event(self):
+        self.seen += 1
+
+
+class TestArloCallbacks(TestCase):
+    def test_any(self):
+        cbs = ArloCallbacks("*")
+        cbs.add("motion", print)
+        cbs.add("*", repr)
+        self.assertEqual(cbs.get("motion"), [print, repr])
+        self.assertEqual(cbs.get("battery"), [repr])
+        self.assertEqual(cbs.get(None), [repr])
+
+    def test_remove(self):
+        cbs = ArloCallbacks("*")
+        handle = cbs.add("motion", print)
+        cbs.add("motion", repr)
+        self.assertTrue(cbs.remove("motion", repr))
+        self.assertFalse(cbs.remove("motion", repr))
+        handle.unsubscribe()
+        self.assertEqual(cbs.get("motion"), [])
+        self.assertEqual(len(cbs), 0)
+
+    def test_weak(self):
+        cbs = ArloCallbacks("*")
+        consumer = Consumer()
+        cbs.add("motion", consumer.event, weak=True)
+        cbs.add("*", consumer.event, weak=True)
+        for cb in cbs.get("motion"):
+            cb()
+        self.assertEqual(consumer.seen, 2)
+        del consumer, cb
+        gc.collect()
+        self.assertEqual(cbs.get("motion"), [])
+        self.assertEqual(len(cbs), 0)
+
+    def test_weak_remove(self):
+        cbs = ArloCallbacks("*")
+        consumer = Consumer()
+        cbs.add("motion", consumer.event, weak=True)
+        self.assertTrue(cbs.remove("motion", consumer.event))
+        self.assertEqual(len(cbs), 0)
@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+import tests.arlo
+from pyaarlo.device import ArloChildDevice, ArloDevice
+
+
+class TestArloChildDevice(TestCase):
+    def setUp(self):
+        self.arlo = tests.arlo.PyArlo(save_state=False)
+
+    def _base(self, device_id):
+        base = ArloDevice("base " + device_id, self.arlo, {"deviceId": device_id})
+        return self.arlo._registry.add("bases", base)
+
+    def test_base_station(self):
+        other = self._base("0000")
+        camera = ArloChildDevice("camera", self.arlo, {"deviceId": "1234", "parentId": "5678"})
+        self.assertIs(camera.base_station, other)
+
+        # New topology, look again.
+        parent = self._base("5678")
+        self.assertIs(camera.base_station, parent)
+        self.arlo._registry.remove("bases", parent)
+        self.assertIs(camera.base_station, other)
+
+    def test_own_parent(self):
+        self._base("0000")
+        camera = ArloChildDevice("camera", self.arlo, {"deviceId": "1234"})
+        base = self._base("1234")
+        self.assertIs(camera.base_station, base)
+
+    def test_cached(self):
+        parent = self._base("5678")
+        camera = ArloChildDevice("camera", self.arlo, {"deviceId": "1234", "parentId": "5678"})
+        self.assertIs(camera.base_station, parent)
+        self.arlo._registry._index.clear()
+        self.assertIs(camera.base_station, parent)
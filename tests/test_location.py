@@ -0,0 +1,105 @@
+import threading
+from unittest import TestCase
+
+import pyaarlo
+import tests.arlo
+from pyaarlo.location import ArloLocation
+
+
+class ArloBackEnd(tests.arlo.ArloBackEnd):
+    """Rejects a mode change until the caller has seen the current revision."""
+
+    def __init__(self, revision, mode="standby", accept=True):
+        super().__init__()
+        self.user_id = "user"
+        self.revision = revision
+        self.mode = mode
+        self.accept = accept
+        self.puts = []
+
+    def put(self, path, params=None, headers=None):
+        self.puts.append(path)
+        if not self.accept or not path.endswith(f"&revision={self.revision}"):
+            return None
+        self.revision += 1
+        self.mode = params["mode"]
+        return {"revision": self.revision}
+
+    def get(self, path, headers=None):
+        return {"properties": {"mode": self.mode}, "revision": self.revision}
+
+
+class PyArlo(tests.arlo.PyArlo):
+    _create_locations = pyaarlo.PyArlo._create_locations
+    _set_mode = pyaarlo.PyArlo._set_mode
+    set_modes = pyaarlo.PyArlo.set_modes
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._locations = self._registry.devices("locations")
+
+
+class TestLocationMode(TestCase):
+    def setUp(self):
+        self.arlo = tests.arlo.PyArlo(save_state=False)
+        self.location = ArloLocation(self.arlo, {"locationId": "1234", "locationName": "home"})
+
+    def test_set_mode(self):
+        self.arlo._be = ArloBackEnd(1)
+        self.assertTrue(self.location.set_mode("armAway"))
+        self.assertEqual(self.location.mode, "armAway")
+        self.assertEqual(len(self.arlo.be.puts), 1)
+
+    def test_stale_revision(self):
+        self.arlo._be = ArloBackEnd(7)
+        self.assertTrue(self.location.set_mode("armAway"))
+        self.assertEqual(self.location.mode, "armAway")
+        self.assertEqual(len(self.arlo.be.puts), 2)
+        self.assertTrue(self.arlo.be.puts[1].endswith("&revision=7"))
+
+    def test_changed_elsewhere(self):
+        self.arlo._be = ArloBackEnd(7, mode="armAway", accept=False)
+        self.assertTrue(self.location.set_mode("armAway"))
+        self.assertEqual(len(self.arlo.be.puts), 1)
+
+    def test_give_up(self):
+        self.arlo._be = ArloBackEnd(1, accept=False)
+        self.assertFalse(self.location.set_mode("armAway", retries=2))
+        self.assertEqual(len(self.arlo.be.puts), 3)
+        self.assertEqual(self.location.mode, "standby")
+
+
+class TestCreateLocations(TestCase):
+    def test_removed(self):
+        arlo = PyArlo(save_state=False)
+        arlo._create_locations({"userLocations": [{"locationId": "1234"}, {"locationId": "5678"}]})
+        kept, gone = list(arlo._locations)
+        self.assertEqual(len(arlo.be.listeners), 2)
+
+        arlo._create_locations({"userLocations": [{"locationId": "1234"}]})
+        self.assertEqual(list(arlo._locations), [kept])
+        self.assertEqual([device for device, _ in arlo.be.listeners], [kept])
+
+
+class Target(object):
+    """Only changes mode once every target is changing at the same time."""
+
+    def __init__(self, barrier):
+        self.barrier = barrier
+        self.mode = "standby"
+
+    def set_mode(self, mode):
+        self.barrier.wait()
+        self.mode = mode
+        return True
+
+
+class TestSetModes(TestCase):
+    def test_together(self):
+        arlo = PyArlo(save_state=False)
+        barrier = threading.Barrier(5, timeout=5)
+        targets = [Target(barrier) for _ in range(5)]
+        results = arlo.set_modes({target: "armAway" for target in targets}, timeout=10)
+        self.assertEqual([results[target]["success"] for target in targets], [True] * 5)
+        self.assertEqual([target.mode for target in targets], ["armAway"] * 5)
+        self.assertEqual(arlo.set_modes({}), {})
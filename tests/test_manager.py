@@ -0,0 +1,74 @@
+import threading
+from unittest import TestCase
+
+import tests.arlo
+from pyaarlo.background import ArloBackground
+from pyaarlo.manager import ArloManager
+
+
+class Session(object):
+    def __init__(self):
+        self.adapter = object()
+
+    def get_adapter(self, url):
+        return self.adapter
+
+    def mount(self, prefix, adapter):
+        self.adapter = adapter
+
+
+class TestArloManager(TestCase):
+    def setUp(self):
+        self.manager = ArloManager(workers=1, pool_size=4)
+
+    def tearDown(self):
+        self.manager.stop()
+
+    def test_share_connections(self):
+        first = Session()
+        self.manager.share_connections(first, "curve")
+        self.manager.keep_connections(first, "curve")
+
+        second = Session()
+        self.manager.share_connections(second, "curve")
+        self.assertIs(second.adapter, first.adapter)
+
+        other = Session()
+        self.manager.share_connections(other, "other")
+        self.assertIsNot(other.adapter, first.adapter)
+
+    def test_failed_login(self):
+        failed = Session()
+        self.manager.share_connections(failed, "curve")
+        self.manager.drop_connections(failed, "curve")
+
+        second = Session()
+        self.manager.share_connections(second, "curve")
+        self.assertIsNot(second.adapter, failed.adapter)
+        self.manager.keep_connections(second, "curve")
+
+        # A failure using the shared pool stops it being shared.
+        third = Session()
+        self.manager.share_connections(third, "curve")
+        self.manager.drop_connections(third, "curve")
+        fourth = Session()
+        self.manager.share_connections(fourth, "curve")
+        self.assertIsNot(fourth.adapter, second.adapter)
+
+    def test_threads(self):
+        self.assertEqual(self.manager.stats()["shared"]["threads"], 2)
+        self.manager.share_pool(1).submit(lambda: None).result(5)
+        self.assertEqual(self.manager.stats()["shared"]["threads"], 3)
+
+    def test_fast_lane(self):
+        one, two = tests.arlo.PyArlo(save_state=False), tests.arlo.PyArlo(save_state=False)
+        slow = ArloBackground(one, self.manager.worker)
+        fast = ArloBackground(two, self.manager.fast_worker)
+
+        # Slow jobs from one account don't hold up another's fast lane.
+        gate = threading.Event()
+        slow.run(gate.wait)
+        ran = threading.Event()
+        fast.run(ran.set)
+        self.assertTrue(ran.wait(5))
+        gate.set()
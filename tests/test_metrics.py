@@ -0,0 +1,45 @@
+import urllib.request
+from unittest import TestCase
+
+import tests.arlo
+from pyaarlo.metrics import ArloMetrics, ArloMetricsServer, endpoint_name
+
+
+class TestArloMetrics(TestCase):
+    def test_endpoint_name(self):
+        self.assertEqual(endpoint_name("/hmsweb/users/devices/notify/4R068BXXXXXXX?eventId=1"),
+                         "/hmsweb/users/devices/notify/{id}")
+        self.assertEqual(endpoint_name("/hmsweb/v2/users/devices"), "/hmsweb/v2/users/devices")
+
+    def test_disabled(self):
+        metrics = ArloMetrics()
+        metrics.inc("events_total", type="cameras")
+        metrics.observe("request_seconds", 0.1, endpoint="/x")
+        self.assertIsNone(metrics.get("events_total", type="cameras"))
+
+    def test_text(self):
+        metrics = ArloMetrics(enabled=True)
+        metrics.inc("events_total", type="cameras")
+        metrics.inc("events_total", type="cameras")
+        metrics.observe("storage_save_seconds", 0.02)
+        metrics.add_collector(lambda: [("background_queue_depth", 3, {})])
+        text = metrics.text()
+        self.assertIn('pyaarlo_events_total{type="cameras"} 2', text)
+        self.assertIn("# TYPE pyaarlo_storage_save_seconds histogram", text)
+        self.assertIn('pyaarlo_storage_save_seconds_bucket{le="0.01"} 0', text)
+        self.assertIn('pyaarlo_storage_save_seconds_bucket{le="0.025"} 1', text)
+        self.assertIn('pyaarlo_storage_save_seconds_bucket{le="+Inf"} 1', text)
+        self.assertIn("pyaarlo_storage_save_seconds_count 1", text)
+        self.assertIn("pyaarlo_background_queue_depth 3", text)
+
+    def test_server(self):
+        arlo = tests.arlo.PyArlo(save_state=False)
+        metrics = ArloMetrics(enabled=True)
+        metrics.inc("event_stream_reconnects_total")
+        server = ArloMetricsServer(arlo, metrics, "127.0.0.1", 0)
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=5) as r:
+                body = r.read().decode("utf-8")
+            self.assertIn("pyaarlo_event_stream_reconnects_total 1", body)
+        finally:
+            server.stop()
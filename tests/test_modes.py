@@ -0,0 +1,141 @@
+import threading
+from unittest import TestCase
+
+import pyaarlo
+import tests.arlo
+from pyaarlo.base import ArloBase
+from pyaarlo.constant import (
+    CUSTOM_MODE_UUID_KEY,
+    DEFINITIONS_CHUNK_SIZE,
+    MODE_ID_TO_NAME_KEY,
+    MODE_NAME_TO_ID_KEY,
+    MODE_TABLE_KEY,
+)
+from pyaarlo.location import ArloLocation
+from pyaarlo.modes import ArloModeTable
+
+
+class TestArloModeTable(TestCase):
+    def test_lookups(self):
+        table = ArloModeTable().with_modes(
+            [("mode0", "Disarmed", "disarmed", False), ("schedule.1", "Weekdays", "weekdays", True)],
+            [("base1", "Night", "uuid-1")],
+        )
+        self.assertEqual(table.id_to_name("mode0"), "Disarmed")
+        self.assertEqual(table.name_to_id("disarmed"), "mode0")
+        self.assertIsNone(table.name_to_id("DISARMED"))
+        self.assertEqual(table.name_to_id("DISARMED", ignore_case=True), "mode0")
+        self.assertTrue(table.is_schedule("Schedule.1"))
+        self.assertFalse(table.is_schedule("mode0"))
+        self.assertEqual(table.custom_uuid("base1", "Night"), "uuid-1")
+        self.assertEqual(table.custom_uuid("base1", "uuid-1"), "uuid-1")
+        self.assertIsNone(table.custom_uuid("base1", "Day"))
+        self.assertEqual(table.custom_name("base1", "uuid-1"), "Night")
+        self.assertEqual(table.find_custom("night"), ("base1", "uuid-1"))
+        self.assertEqual(table.modes, {"disarmed": "mode0", "weekdays": "schedule.1"})
+
+    def test_unchanged(self):
+        table = ArloModeTable()
+        bigger = table.with_modes([("mode1", "Armed", "armed", False)])
+        self.assertEqual(table.modes, {})
+        self.assertEqual(bigger.modes, {"armed": "mode1"})
+
+    def test_round_trip(self):
+        table = ArloModeTable().with_modes([("mode1", "Armed", "armed", False)], [("base1", "Night", "uuid-1")])
+        copy = ArloModeTable.from_dict(table.to_dict())
+        self.assertEqual(copy.to_dict(), table.to_dict())
+
+
+class TestArloLocationModes(TestCase):
+    def setUp(self):
+        self.arlo = tests.arlo.PyArlo(save_state=False)
+
+    def _location(self):
+        return ArloLocation(self.arlo, {"locationId": "loc1", "locationName": "home"})
+
+    def test_migrate(self):
+        st = self.arlo.st
+        st.set(["ArloLocation", "loc1", MODE_ID_TO_NAME_KEY, "armAway"], "Armed Away")
+        st.set(["ArloLocation", "loc1", MODE_NAME_TO_ID_KEY, "Armed Away"], "armAway")
+        st.set(["ArloLocation", "loc1", CUSTOM_MODE_UUID_KEY, "base1", "Night"], "uuid-1")
+
+        location = self._location()
+        self.assertEqual(location.available_modes_with_ids, {"Armed Away": "armAway"})
+        self.assertEqual(location._name_to_id("armed away"), "armAway")
+        self.assertEqual(location._uuid_to_custom_name("base1", "uuid-1"), "Night")
+        self.assertEqual(st.get_matching(["ArloLocation", "loc1", MODE_NAME_TO_ID_KEY, "*"]), [])
+        self.assertIsNotNone(st.get(["ArloLocation", "loc1", MODE_TABLE_KEY]))
+
+        # And it's picked up from the table next time.
+        self.assertEqual(self._location().available_modes_with_ids, {"Armed Away": "armAway"})
+
+    def test_parse(self):
+        location = self._location()
+        location._parse_modes({"standby": {"name": "Stand By"}, "armHome": {"name": "Armed Home"}})
+        location._parse_custom_modes({"base1": {"uuid-2": {"name": "Holiday"}}})
+        self.assertEqual(location.available_modes, ["Stand By", "Armed Home"])
+        self.assertEqual(location._custom_uuid_for_device("base1", "Holiday"), "uuid-2")
+        self.assertEqual(self._location()._id_to_name("armHome"), "Armed Home")
+
+    def test_parse_together(self):
+        location = self._location()
+
+        def modes(prefix):
+            for i in range(200):
+                location._parse_modes({f"{prefix}{i}": {"name": f"{prefix} {i}"}})
+        threads = [threading.Thread(target=modes, args=(prefix,)) for prefix in ("mode", "custom")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(location.available_modes), 400)
+        self.assertEqual(len(self._location().available_modes), 400)
+
+
+class DefinitionsBackEnd(tests.arlo.ArloBackEnd):
+    """Returns mode definitions, except for the second chunk of bases."""
+
+    multi_location = False
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    def get(self, path, headers=None):
+        unique_ids = path.split("?uniqueIds=")[1].split(",")
+        self.requests.append(unique_ids)
+        if len(self.requests) == 2:
+            return None
+        return {
+            unique_id: {"modes": [{"id": "mode0", "name": "disarmed"}, {"id": "mode1", "name": unique_id}]}
+            for unique_id in unique_ids
+        }
+
+
+class DefinitionsArlo(tests.arlo.PyArlo):
+    _fetch_definitions = pyaarlo.PyArlo._fetch_definitions
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._be = DefinitionsBackEnd()
+        self._bases = self._registry.devices("bases")
+
+
+class TestArloBaseDefinitions(TestCase):
+    def test_chunk_failed(self):
+        arlo = DefinitionsArlo(save_state=False, mode_api="v2")
+        count = DEFINITIONS_CHUNK_SIZE * 2 + 5
+        for i in range(count):
+            arlo._registry.add("bases", ArloBase(f"base {i}", arlo, {
+                "deviceId": f"{i:04}", "uniqueId": f"{i:04}_UID", "deviceType": "basestation", "modelId": "VMB4000",
+            }))
+
+        definitions = arlo._fetch_definitions()
+        self.assertEqual([len(ids) for ids in arlo.be.requests], [DEFINITIONS_CHUNK_SIZE, DEFINITIONS_CHUNK_SIZE, 5])
+        self.assertEqual(len(definitions), DEFINITIONS_CHUNK_SIZE + 5)
+
+        for base in arlo.base_stations:
+            base.update_modes(definitions=definitions)
+        self.assertEqual(len(arlo.be.requests), 3 + DEFINITIONS_CHUNK_SIZE)
+        for base in arlo.base_stations:
+            self.assertEqual(base.available_modes_with_ids, {"disarmed": "mode0", base.unique_id.lower(): "mode1"})
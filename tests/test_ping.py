@@ -0,0 +1,110 @@
+from unittest import TestCase
+
+import tests.arlo
+from pyaarlo.ping import ArloPinger
+
+
+class Pool(object):
+    """Runs tasks as they're submitted, or holds them until `run`."""
+
+    def __init__(self, hold=False):
+        self.hold = hold
+        self.tasks = []
+
+    def submit(self, fn, *args):
+        self.tasks.append((fn, args))
+        if not self.hold:
+            self.run()
+
+    def run(self):
+        tasks, self.tasks = self.tasks, []
+        for fn, args in tasks:
+            fn(*args)
+
+
+class Base(object):
+    def __init__(self, device_id, xcloud_id, alive=True):
+        self.device_id = device_id
+        self.xcloud_id = xcloud_id
+        self.name = device_id
+        self.alive = alive
+        self.pings = []
+        self.connection = None
+
+    def send_ping(self, device_ids=None):
+        self.pings.append(device_ids)
+        return self.alive
+
+    def update_connection(self, available):
+        self.connection = available
+
+
+class TestArloPinger(TestCase):
+    def test_one_each(self):
+        arlo = tests.arlo.PyArlo(save_state=False)
+        bases = [Base("A", "X"), Base("B", "X", alive=False)]
+        ArloPinger(arlo, Pool()).ping(bases)
+        self.assertEqual([len(base.pings) for base in bases], [1, 1])
+        self.assertEqual([base.connection for base in bases], [True, False])
+
+    def test_grouped(self):
+        arlo = tests.arlo.PyArlo(save_state=False, group_pings=True)
+        bases = [Base("A", "X"), Base("B", "X"), Base("C", "Y")]
+        ArloPinger(arlo, Pool()).ping(bases)
+        self.assertEqual(bases[0].pings, [["A", "B"]])
+        self.assertEqual(bases[1].pings, [])
+        self.assertEqual(bases[2].pings, [["C"]])
+        self.assertEqual([base.connection for base in bases], [True, True, True])
+
+    def test_group_failed(self):
+        arlo = tests.arlo.PyArlo(save_state=False, group_pings=True)
+        bases = [Base("A", "X", alive=False), Base("B", "X")]
+        ArloPinger(arlo, Pool()).ping(bases)
+        self.assertEqual(len(bases[0].pings), 2)
+        self.assertEqual(bases[1].pings, [None])
+        self.assertEqual([base.connection for base in bases], [False, True])
+
+    def test_overlap(self):
+        arlo = tests.arlo.PyArlo(save_state=False)
+        pool = Pool(hold=True)
+        pinger = ArloPinger(arlo, pool)
+        bases = [Base("A", "X")]
+        self.assertTrue(pinger.ping(bases))
+        self.assertFalse(pinger.ping(bases))
+        pool.run()
+        self.assertTrue(pinger.ping(bases))
+
+    def test_quiet_time(self):
+        arlo = tests.arlo.PyArlo(save_state=False, ping_quiet_time=120)
+        arlo.be.seen.update({"A": 10, "B": 300})
+        bases = [Base("A", "X"), Base("B", "X"), Base("C", "X")]
+        pinger = ArloPinger(arlo, Pool())
+        pinger.ping(bases)
+        self.assertEqual([len(base.pings) for base in bases], [0, 1, 1])
+        self.assertEqual([base.connection for base in bases], [True, True, True])
+        self.assertEqual(pinger.stats(), {"sent": 2, "saved": 1, "stale": 1, "failed": 0})
+
+    def test_quiet_time_overlap(self):
+        arlo = tests.arlo.PyArlo(save_state=False, ping_quiet_time=120)
+        arlo.be.seen.update({"A": 10, "B": 300})
+        pool = Pool(hold=True)
+        pinger = ArloPinger(arlo, pool)
+        bases = [Base("A", "X"), Base("B", "X")]
+
+        # A ping started while the last one is checking who's quiet is refused.
+        overlapped = []
+        last_seen = arlo.be.last_seen
+        arlo.be.last_seen = lambda device_id: overlapped.append(pinger.ping(bases)) or last_seen(device_id)
+        self.assertTrue(pinger.ping(bases))
+        self.assertEqual(overlapped, [False, False])
+        arlo.be.last_seen = last_seen
+
+        self.assertFalse(pinger.ping(bases))
+        pool.run()
+        self.assertEqual([len(base.pings) for base in bases], [0, 1])
+
+        # Nothing needed a ping, the next round can start.
+        arlo.be.seen.update({"B": 10})
+        self.assertTrue(pinger.ping(bases))
+        self.assertEqual(pool.tasks, [])
+        self.assertTrue(pinger.ping(bases))
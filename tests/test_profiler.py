@@ -0,0 +1,58 @@
+import json
+import threading
+from unittest import TestCase
+
+from pyaarlo.profiler import ArloProfiler
+
+
+class TestArloProfiler(TestCase):
+    def setUp(self):
+        self.profiler = ArloProfiler()
+
+    def test_nested(self):
+        with self.profiler.phase("login"):
+            self.profiler.request(10)
+            with self.profiler.phase("auth"):
+                self.profiler.request(100)
+        self.profiler.request(1000)
+
+        report = self.profiler.report()
+        self.assertEqual(list(report["phases"]), ["login", "auth"])
+        self.assertEqual(report["phases"]["login"]["requests"], 2)
+        self.assertEqual(report["phases"]["login"]["bytes"], 110)
+        self.assertEqual(report["phases"]["auth"]["requests"], 1)
+        self.assertEqual(report["phases"]["auth"]["bytes"], 100)
+        self.assertEqual(report["requests"], 3)
+        self.assertEqual(report["bytes"], 1110)
+        self.assertGreaterEqual(report["phases"]["login"]["duration"], report["phases"]["auth"]["duration"])
+
+    def test_attribute(self):
+        def task():
+            with self.profiler.attribute("bases"):
+                self.profiler.request(5)
+
+        self.profiler.begin("bases")
+        threads = [threading.Thread(target=task) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.profiler.end("bases")
+
+        phase = self.profiler.report()["phases"]["bases"]
+        self.assertEqual(phase["requests"], 3)
+        self.assertEqual(phase["bytes"], 15)
+
+    def test_finish(self):
+        with self.profiler.phase("devices"):
+            self.profiler.request(1)
+        self.profiler.ready()
+        self.profiler.finish()
+        self.assertTrue(self.profiler.finished)
+
+        with self.profiler.phase("ratls"):
+            self.profiler.request(1)
+        report = json.loads(self.profiler.json())
+        self.assertEqual(list(report["phases"]), ["devices"])
+        self.assertEqual(report["requests"], 1)
+        self.assertLessEqual(report["ready"], report["total"])
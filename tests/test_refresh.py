@@ -0,0 +1,101 @@
+from unittest import TestCase
+
+import pyaarlo
+import tests.arlo
+from pyaarlo.callbacks import ArloCallbacks
+
+
+def light(device_id, battery=100):
+    return {"deviceId": device_id, "deviceName": "light " + device_id, "deviceType": "lights",
+            "modelId": "AL1101", "state": "provisioned", "properties": {"batteryLevel": battery}}
+
+
+class ArloBackEnd(tests.arlo.ArloBackEnd):
+    def __init__(self):
+        super().__init__()
+        self.devices = []
+
+    def get(self, path, headers=None):
+        return list(self.devices)
+
+
+class PyArlo(tests.arlo.PyArlo):
+    _refresh_devices = pyaarlo.PyArlo._refresh_devices
+    _create_device = pyaarlo.PyArlo._create_device
+    _device_hash = pyaarlo.PyArlo.__dict__["_device_hash"]
+    _device_objects = pyaarlo.PyArlo._device_objects
+    _retire_device = pyaarlo.PyArlo._retire_device
+    _device_event = pyaarlo.PyArlo._device_event
+    add_device_callback = pyaarlo.PyArlo.add_device_callback
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._be = ArloBackEnd()
+        self._devices = []
+        self._device_hashes = {}
+        self._device_cbs = ArloCallbacks("*")
+        self._refreshed = True
+        self.setup = []
+
+    def _save_totals(self):
+        pass
+
+    def _setup_devices(self, objects):
+        self.setup += objects
+
+
+class TestRefreshDevices(TestCase):
+    def setUp(self):
+        self.arlo = PyArlo(save_state=False)
+        self.events = []
+        self.arlo.add_device_callback("*", lambda obj, event: self.events.append((obj.device_id, event)))
+        self.arlo.be.devices = [light("1234"), light("5678")]
+        self.arlo._refresh_devices()
+        self.events.clear()
+        self.arlo.setup.clear()
+
+    def _lights(self):
+        return {obj.device_id: obj for obj in self.arlo._registry.devices("lights")}
+
+    def test_unchanged(self):
+        lights = self._lights()
+        for obj in lights.values():
+            obj.update_resources = lambda props: self.fail("unchanged entry updated")
+        self.arlo._refresh_devices()
+        self.assertEqual(self._lights(), lights)
+        self.assertEqual(self.events, [])
+
+    def test_changed(self):
+        self.arlo.be.devices = [light("1234", battery=50), light("5678")]
+        self.arlo._refresh_devices()
+        lights = self._lights()
+        self.assertEqual(lights["1234"].battery_level, 50)
+        self.assertEqual(lights["5678"].battery_level, 100)
+        self.assertEqual(self.events, [])
+
+    def test_added(self):
+        self.arlo.be.devices.append(light("9abc"))
+        self.arlo._refresh_devices()
+        added = self._lights()["9abc"]
+        self.assertEqual(self.events, [("9abc", "added")])
+        self.assertEqual(self.arlo.setup, [added])
+        self.assertIn(added, [device for device, _ in self.arlo.be.listeners])
+
+    def test_removed(self):
+        gone = self._lights()["5678"]
+        self.arlo.be.devices = [light("1234")]
+        self.arlo._refresh_devices()
+        self.assertEqual(list(self._lights()), ["1234"])
+        self.assertEqual(self.events, [("5678", "removed")])
+        self.assertNotIn(gone, [device for device, _ in self.arlo.be.listeners])
+
+    def test_callback_fails(self):
+        def fail(obj, event):
+            raise RuntimeError("failed")
+        self.arlo.add_device_callback("*", fail)
+        self.arlo.be.devices = [light("1234"), light("9abc")]
+        self.arlo._refresh_devices()
+        self.assertEqual(sorted(self.events), [("5678", "removed"), ("9abc", "added")])
+        self.assertEqual(set(self.arlo._device_hashes), {"1234", "9abc"})
+        self.assertEqual(len(self.arlo.setup), 1)
+        self.assertIn("device-callback-error=RuntimeError", self.arlo.last_error)
@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+from pyaarlo.registry import ArloDeviceRegistry
+
+
+class Device(object):
+    def __init__(self, device_id, name):
+        self.device_id = device_id
+        self.unique_id = "camera-" + device_id
+        self.name = name
+        self.entity_id = name.lower().replace(" ", "_")
+
+
+class TestArloDeviceRegistry(TestCase):
+    def test_lookup(self):
+        registry = ArloDeviceRegistry()
+        cameras = registry.devices("cameras")
+        front = registry.add("cameras", Device("1234", "Front Door"))
+        back = registry.add("cameras", Device("5678", "Back Door"))
+        self.assertEqual(cameras, [front, back])
+        self.assertIs(registry.lookup("cameras", "device_id", "5678"), back)
+        self.assertIs(registry.lookup("cameras", "unique_id", "camera-1234"), front)
+        self.assertIs(registry.lookup("cameras", "name", "Back Door"), back)
+        self.assertIs(registry.lookup("cameras", "entity_id", "front_door"), front)
+        self.assertIsNone(registry.lookup("cameras", "device_id", "0000"))
+        self.assertIsNone(registry.lookup("bases", "device_id", "1234"))
+
+    def test_remove(self):
+        registry = ArloDeviceRegistry()
+        first = registry.add("cameras", Device("1234", "Camera"))
+        second = registry.add("cameras", Device("5678", "Camera"))
+        self.assertIs(registry.lookup("cameras", "name", "Camera"), first)
+        self.assertTrue(registry.remove("cameras", first))
+        self.assertFalse(registry.remove("cameras", first))
+        self.assertIs(registry.lookup("cameras", "name", "Camera"), second)
+        self.assertIsNone(registry.lookup("cameras", "device_id", "1234"))
+        self.assertEqual(registry.devices("cameras"), [second])
@@ -0,0 +1,65 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+import tests.arlo
+from pyaarlo.startup import ArloStartup
+
+
+class TestArloStartup(TestCase):
+    def setUp(self):
+        self.arlo = tests.arlo.PyArlo(save_state=False)
+        self.pool = ThreadPoolExecutor(max_workers=4)
+        self.lock = threading.Lock()
+        self.events = []
+        self.running = 0
+        self.most_running = 0
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def _task(self, name):
+        def task():
+            with self.lock:
+                self.running += 1
+                self.most_running = max(self.most_running, self.running)
+            time.sleep(0.02)
+            with self.lock:
+                self.running -= 1
+                self.events.append(name)
+        return task
+
+    def test_order(self):
+        startup = ArloStartup(self.arlo, self.pool)
+        startup.add_phase("bases", [self._task("base") for _ in range(3)])
+        startup.add_phase("modes", [self._task("mode") for _ in range(3)], depends_on=["bases"])
+        startup.add_phase("library", [self._task("library")])
+        startup.add_phase("media", [self._task("media")], depends_on=["library"])
+        startup.add_phase("empty", [], depends_on=["modes"])
+        timings = startup.run()
+
+        self.assertEqual(len(self.events), 8)
+        self.assertLess(self.events.index("library"), self.events.index("media"))
+        self.assertLess(max(i for i, e in enumerate(self.events) if e == "base"), self.events.index("mode"))
+        self.assertLessEqual(self.most_running, 4)
+        self.assertGreater(self.most_running, 1)
+        self.assertGreaterEqual(timings["modes"]["start"], timings["bases"]["duration"])
+        self.assertEqual(timings["bases"]["tasks"], 3)
+        self.assertIn("total", timings)
+        self.assertIn("empty", timings)
+
+    def test_errors(self):
+        def fail():
+            raise RuntimeError("failed")
+        startup = ArloStartup(self.arlo, self.pool)
+        startup.add_phase("bases", [fail, self._task("base")])
+        startup.add_phase("modes", [self._task("mode")], depends_on=["bases"])
+        timings = startup.run()
+        self.assertEqual(timings["bases"]["errors"], 1)
+        self.assertEqual(self.events, ["base", "mode"])
+
+    def test_unknown_phase(self):
+        startup = ArloStartup(self.arlo, self.pool)
+        with self.assertRaises(ValueError):
+            startup.add_phase("modes", [], depends_on=["bases"])
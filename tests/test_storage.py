@@ -0,0 +1,148 @@
+import os
+import pickle
+import tempfile
+from unittest import TestCase
+
+import tests.arlo
+from pyaarlo.storage import ArloSqliteStorage, ArloStorage
+
+
+class TestArloStorage(TestCase):
+    snapshot_storage = False
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.arlo = tests.arlo.PyArlo(storage_dir=self.dir.name, snapshot_storage=self.snapshot_storage)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_key_forms(self):
+        st = ArloStorage(self.arlo)
+        st.set(["ArloCamera", "1234", "batteryLevel"], 50)
+        self.assertEqual(st.get("ArloCamera/1234/batteryLevel"), 50)
+        self.assertEqual(st.get(("ArloCamera", "1234", "batteryLevel")), 50)
+        self.assertEqual(st.get(st.key("ArloCamera", "1234", "batteryLevel")), 50)
+        self.assertIsNone(st.get(["ArloCamera", "1234", "missing"]))
+        self.assertEqual(st.get(["ArloCamera", "5678", "batteryLevel"], 10), 10)
+
+    def test_matching(self):
+        st = ArloStorage(self.arlo)
+        st.set(["ArloBase", "1234", "modeNameToId", "armed"], "mode1")
+        st.set(["ArloBase", "1234", "modeNameToId", "disarmed"], "mode0")
+        st.set(["ArloBase", "1234", "modeIdToName", "mode0"], "disarmed")
+        st.set(["ArloBase", "5678", "modeNameToId", "armed"], "mode1")
+
+        items = st.get_matching(["ArloBase", "1234", "modeNameToId", "*"])
+        self.assertEqual(sorted(items), [
+            (("ArloBase", "1234", "modeNameToId", "armed"), "mode1"),
+            (("ArloBase", "1234", "modeNameToId", "disarmed"), "mode0"),
+        ])
+        self.assertEqual(len(st.keys_matching(["ArloBase", "*", "modeNameToId", "armed"])), 2)
+        self.assertEqual(len(st.keys_matching(["*", "*", "*", "*"])), 4)
+        self.assertEqual(st.keys_matching(["ArloBase", "1234", "modeNameToId"]), [])
+
+    def test_update(self):
+        st = ArloStorage(self.arlo)
+        st.set(["ArloCamera", "1234", "batteryLevel"], 50)
+        snap = st.snapshot()
+        changed = st.update([(["ArloCamera", "1234", "batteryLevel"], 50),
+                             (["ArloCamera", "1234", "signalStrength"], 3),
+                             (["ArloCamera", "5678", "batteryLevel"], 40)])
+        self.assertEqual(changed, [
+            (("ArloCamera", "1234", "signalStrength"), None, 3),
+            (("ArloCamera", "5678", "batteryLevel"), None, 40),
+        ])
+        self.assertEqual(st.get(["ArloCamera", "5678", "batteryLevel"]), 40)
+        self.assertIsNone(snap.get(["ArloCamera", "1234", "signalStrength"]))
+
+    def test_unset(self):
+        st = ArloStorage(self.arlo)
+        st.set(["ArloCamera", "1234", "batteryLevel"], 50)
+        st.unset(["ArloCamera", "1234", "batteryLevel"])
+        self.assertIsNone(st.get(["ArloCamera", "1234", "batteryLevel"]))
+        self.assertEqual(st.db, {})
+
+    def test_save_load(self):
+        st = ArloStorage(self.arlo)
+        st.set(["ArloCamera", "1234", "batteryLevel"], 50)
+        st.save()
+        st = ArloStorage(self.arlo)
+        self.assertEqual(st.get(["ArloCamera", "1234", "batteryLevel"]), 50)
+
+    def test_load_old_format(self):
+        with open(self.arlo.cfg.state_file, "wb") as dump:
+            pickle.dump({"ArloCamera/1234/batteryLevel": 50,
+                         "ArloBase/5678/modeNameToId/armed": "mode1"}, dump)
+        st = ArloStorage(self.arlo)
+        self.assertEqual(st.get(["ArloCamera", "1234", "batteryLevel"]), 50)
+        self.assertEqual(st.get(["ArloBase", "5678", "modeNameToId", "armed"]), "mode1")
+        self.assertTrue(os.path.exists(st.file_name()))
+
+    def test_snapshot(self):
+        st = ArloStorage(self.arlo)
+        st.set(["ArloCamera", "1234", "batteryLevel"], 50)
+        snap = st.snapshot()
+        st.set(["ArloCamera", "1234", "batteryLevel"], 40)
+        st.set(["ArloCamera", "5678", "batteryLevel"], 30)
+        self.assertEqual(snap.get(["ArloCamera", "1234", "batteryLevel"]), 50)
+        self.assertIsNone(snap.get(["ArloCamera", "5678", "batteryLevel"]))
+        self.assertEqual(len(snap.get_matching(["ArloCamera", "*", "batteryLevel"])), 1)
+        self.assertEqual(st.get(["ArloCamera", "1234", "batteryLevel"]), 40)
+
+
+class TestArloSnapshotStorage(TestArloStorage):
+    snapshot_storage = True
+
+
+class TestArloSqliteStorage(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.arlo = tests.arlo.PyArlo(storage_dir=self.dir.name, state_db=True)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_save_load(self):
+        st = ArloSqliteStorage(self.arlo)
+        st.set(["ArloCamera", "1234", "batteryLevel"], 50)
+        st.set(["ArloBase", "5678", "modeNameToId", "armed"], "mode1")
+        st.set(["ArloCamera", "1234", "signalStrength"], 3)
+        st.unset(["ArloCamera", "1234", "signalStrength"])
+        st.save()
+        st = ArloSqliteStorage(self.arlo)
+        self.assertEqual(st.get(["ArloCamera", "1234", "batteryLevel"]), 50)
+        self.assertEqual(st.get(["ArloBase", "5678", "modeNameToId", "armed"]), "mode1")
+        self.assertIsNone(st.get(["ArloCamera", "1234", "signalStrength"]))
+
+    def test_load_pickle(self):
+        st = ArloStorage(self.arlo)
+        st.set(["ArloCamera", "1234", "batteryLevel"], 50)
+        st.save()
+        st = ArloSqliteStorage(self.arlo)
+        st.save()
+        st = ArloSqliteStorage(self.arlo)
+        self.assertEqual(st.get(["ArloCamera", "1234", "batteryLevel"]), 50)
+
+    def test_history(self):
+        st = ArloSqliteStorage(self.arlo)
+        for level in (90, 80, 70):
+            st.record(["ArloCamera", "1234", "batteryLevel"], level)
+        st.record(["ArloCamera", "1234", "signalStrength"], 4)
+        st.record(["ArloCamera", "5678", "batteryLevel"], 20)
+        st.record(["ArloCamera", "1234", "lastImageData"], b"jpeg")
+
+        values = [value for _, _, _, value in st.history("1234", "batteryLevel")]
+        self.assertEqual(values, [90, 80, 70])
+        self.assertEqual(len(st.history("1234")), 4)
+        self.assertEqual(len(st.history(attr="batteryLevel")), 4)
+        self.assertEqual(st.history("1234", "batteryLevel", limit=1)[0][3], 70)
+        self.assertEqual(st.history(end=0), [])
+
+    def test_retention(self):
+        arlo = tests.arlo.PyArlo(storage_dir=self.dir.name, state_db=True, history_max_rows=2)
+        st = ArloSqliteStorage(arlo)
+        for level in (90, 80, 70):
+            st.record(["ArloCamera", "1234", "batteryLevel"], level)
+        values = [value for _, _, _, value in st.history("1234", "batteryLevel")]
+        self.assertEqual(values, [80, 70])
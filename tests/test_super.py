@@ -0,0 +1,67 @@
+from unittest import TestCase
+
+import tests.arlo
+from pyaarlo.super import ArloSuper
+
+
+class TestArloSuper(TestCase):
+    def setUp(self):
+        self.arlo = tests.arlo.PyArlo(save_state=False)
+        self.device = ArloSuper("test", self.arlo, {}, id="1234", type="test")
+        self.seen = []
+
+    def _cb(self, device, attr, value):
+        self.seen.append(("cb", attr, value))
+
+    def _any_cb(self, device, attr, value):
+        self.seen.append(("any", attr, value))
+
+    def test_callbacks(self):
+        self.device.add_attr_callback("batteryLevel", self._cb)
+        self.device.add_attr_callback("*", self._any_cb)
+        self.device._save_and_do_callbacks("batteryLevel", 50)
+        self.device._save_and_do_callbacks("batteryLevel", 50)
+        self.device._save_and_do_callbacks("signalStrength", 3)
+        self.assertEqual(self.seen, [
+            ("cb", "batteryLevel", 50),
+            ("any", "batteryLevel", 50),
+            ("any", "signalStrength", 3),
+        ])
+        self.assertEqual(self.device.attribute("batteryLevel"), 50)
+
+    def test_del_callback(self):
+        self.device.add_attr_callback("batteryLevel", self._cb)
+        self.device.add_attr_callback("*", self._any_cb)
+        self.assertTrue(self.device.del_attr_callback("batteryLevel", self._cb))
+        self.assertFalse(self.device.del_attr_callback("batteryLevel", self._cb))
+        self.assertTrue(self.device.del_attr_callback("*", self._any_cb))
+        self.device._save_and_do_callbacks("batteryLevel", 50)
+        self.assertEqual(self.seen, [])
+        self.assertEqual(len(self.device._attr_cbs_), 0)
+
+    def test_unsubscribe(self):
+        handle = self.device.add_attr_callback("batteryLevel", self._cb)
+        handle.unsubscribe()
+        handle.unsubscribe()
+        self.device._save_and_do_callbacks("batteryLevel", 50)
+        self.assertEqual(self.seen, [])
+
+    def test_update_resources(self):
+        diffs = []
+        self.device.add_attr_callback("batteryLevel", self._cb)
+        self.device.add_attr_callback("*", self._any_cb)
+        self.device.add_batch_callback(lambda device, diff: diffs.append(diff))
+        self.device.update_resources({"batteryLevel": 50, "signalStrength": 3, "unknownKey": 1})
+        self.device.update_resources({"batteryLevel": 50, "signalStrength": 4, "connectionState": None})
+        self.device.update_resources({"batteryLevel": 50})
+        self.assertEqual(self.seen, [
+            ("cb", "batteryLevel", 50),
+            ("any", "batteryLevel", 50),
+            ("any", "signalStrength", 3),
+            ("any", "signalStrength", 4),
+        ])
+        self.assertEqual(diffs, [
+            {"batteryLevel": (None, 50), "signalStrength": (None, 3)},
+            {"signalStrength": (3, 4)},
+        ])
+        self.assertIsNone(self.device.attribute("unknownKey"))
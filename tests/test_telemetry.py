@@ -0,0 +1,110 @@
+import base64
+import struct
+import zlib
+from unittest import TestCase
+
+import tests.arlo
+from pyaarlo.camera import ArloCamera
+from pyaarlo.telemetry import ArloSeries, ArloTelemetry
+from pyaarlo.timers import ArloTimerWheel
+
+
+class FakeDevice(object):
+    def __init__(self, device_id):
+        self.device_id = device_id
+
+
+class TestArloSeries(TestCase):
+    def test_ring(self):
+        series = ArloSeries(4)
+        for i in range(6):
+            series.append(i, i * 10)
+        self.assertEqual(len(series), 4)
+        self.assertEqual(series.samples(), [(2, 20), (3, 30), (4, 40), (5, 50)])
+        self.assertEqual(series.last(), (5, 50))
+        self.assertEqual(series.memory_usage(), ArloSeries(4).memory_usage())
+
+    def test_changes_only(self):
+        series = ArloSeries(4)
+        self.assertTrue(series.append(1, 10))
+        self.assertFalse(series.append(2, 10))
+        self.assertFalse(series.append(0, 20))
+        self.assertEqual(len(series), 1)
+
+    def test_queries(self):
+        series = ArloSeries(10)
+        for i, value in enumerate([100, 90, 95, 80, 70]):
+            series.append(i * 60, value)
+        self.assertEqual(series.min(), 70)
+        self.assertEqual(series.max(), 100)
+        self.assertEqual(series.mean(), 87)
+        self.assertEqual(series.min(start=60, end=180), 90)
+        self.assertAlmostEqual(series.rate(), -30 / 240)
+        self.assertIsNone(series.rate(start=240))
+        self.assertIsNone(ArloSeries(4).mean())
+
+    def test_downsample(self):
+        series = ArloSeries(10)
+        for i in range(8):
+            series.append(i, i)
+        buckets = series.downsample(2)
+        self.assertEqual(len(buckets), 2)
+        self.assertEqual(buckets[0][1:], (0, 1.5, 3))
+        self.assertEqual(buckets[1][1:], (4, 5.5, 7))
+        self.assertEqual(len(series.downsample(20)), 8)
+
+
+class TestArloTelemetry(TestCase):
+    def test_record(self):
+        arlo = tests.arlo.PyArlo(telemetry_size=8)
+        telemetry = ArloTelemetry(arlo)
+        camera = FakeDevice("1234")
+        telemetry.record(camera, "batteryLevel", 90, 1)
+        telemetry.record(camera, "batteryLevel", "85", 2)
+        telemetry.record(camera, "batteryLevel", None, 3)
+        telemetry.record(camera, "motionDetected", True, 3)
+        self.assertEqual(telemetry.series(camera, "batteryLevel").samples(), [(1, 90), (2, 85)])
+        self.assertIsNone(telemetry.series(camera, "motionDetected"))
+        self.assertIsNone(telemetry.series(FakeDevice("5678"), "batteryLevel"))
+        stats = telemetry.stats()
+        self.assertEqual(stats["series"], 1)
+        self.assertEqual(stats["samples"], 2)
+        self.assertEqual(stats["bytes"], telemetry.memory_usage())
+
+
+class CountingTelemetry(ArloTelemetry):
+    def __init__(self, arlo):
+        super().__init__(arlo)
+        self.recorded = []
+
+    def record(self, device, attr, value, ts=None):
+        self.recorded.append(attr)
+        super().record(device, attr, value, ts)
+
+
+class PyArlo(tests.arlo.PyArlo):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._telemetry = CountingTelemetry(self)
+        self.timers = ArloTimerWheel(self)
+
+    @property
+    def telemetry(self):
+        return self._telemetry
+
+
+def sensor_history(*points):
+    data = b""
+    for ts, temperature in points:
+        data += struct.pack(">I4xH4xH4xH", ts, temperature * 10, 500, 10)
+    return {"properties": {"payload": [base64.b64encode(zlib.compress(data)).decode()]}}
+
+
+class TestAmbientTelemetry(TestCase):
+    def test_recorded_once(self):
+        arlo = PyArlo(save_state=False, telemetry_size=8)
+        camera = ArloCamera("camera", arlo, {"deviceId": "1234", "deviceType": "camera"})
+        camera._event_handler("cameras/1234/ambientSensors/history", sensor_history((100, 20), (200, 21)))
+        self.assertEqual(camera.attribute("temperature"), 21)
+        self.assertEqual(arlo.telemetry.series(camera, "temperature").samples(), [(100, 20), (200, 21)])
+        self.assertEqual(arlo.telemetry.recorded.count("temperature"), 2)
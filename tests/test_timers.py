@@ -0,0 +1,107 @@
+import threading
+import time
+from unittest import TestCase
+
+import tests.arlo
+from pyaarlo.timers import ArloTimerShare, ArloTimerWheel
+
+
+class TestArloTimerWheel(TestCase):
+    def setUp(self):
+        self.arlo = tests.arlo.PyArlo(save_state=False)
+        self.fired = threading.Event()
+        self.at = None
+
+    def tearDown(self):
+        self.wheel.stop()
+
+    def _fired(self):
+        self.at = time.monotonic()
+        self.fired.set()
+
+    def test_fire(self):
+        self.wheel = ArloTimerWheel(self.arlo)
+        timer = self.wheel.timer(self._fired)
+        start = time.monotonic()
+        timer.arm(0.02)
+        self.assertTrue(timer.armed)
+        self.assertTrue(self.fired.wait(5))
+        self.assertGreaterEqual(self.at - start, 0.02)
+        self.assertFalse(timer.armed)
+        self.assertEqual(self.wheel.armed, 0)
+
+    def test_rearm(self):
+        self.wheel = ArloTimerWheel(self.arlo)
+        timer = self.wheel.timer(self._fired)
+        start = time.monotonic()
+        for _ in range(5):
+            timer.arm(0.05)
+            time.sleep(0.01)
+        self.assertEqual(self.wheel.armed, 1)
+        self.assertTrue(self.fired.wait(5))
+        self.assertGreaterEqual(self.at - start, 0.09)
+
+    def test_cancel(self):
+        self.wheel = ArloTimerWheel(self.arlo)
+        timer = self.wheel.timer(self._fired)
+        timer.arm(0.02)
+        timer.cancel()
+        self.assertFalse(timer.armed)
+        self.assertFalse(self.fired.wait(0.1))
+
+    def test_cascade(self):
+        # Small wheels so the timer starts on the top one, or past it.
+        self.wheel = ArloTimerWheel(self.arlo, bits=2, levels=3)
+        timer = self.wheel.timer(self._fired)
+        start = time.monotonic()
+        timer.arm(0.1)
+        self.assertTrue(self.fired.wait(5))
+        self.assertGreaterEqual(self.at - start, 0.1)
+
+    def test_dispatch(self):
+        ran = []
+        self.wheel = ArloTimerWheel(self.arlo, dispatch=lambda cb, **kw: ran.append(kw) or cb(**kw))
+        self.wheel.timer(self._fired).arm(0.01)
+        self.wheel.timer(lambda value: None, value=1).arm(0.01)
+        self.assertTrue(self.fired.wait(5))
+        time.sleep(0.05)
+        self.assertIn({"value": 1}, ran)
+
+
+class TestArloTimerShare(TestCase):
+    def setUp(self):
+        self.arlo = tests.arlo.PyArlo(save_state=False)
+        self.wheel = ArloTimerWheel(self.arlo)
+        self.ran = {"one": threading.Event(), "two": threading.Event()}
+
+    def tearDown(self):
+        self.wheel.stop()
+
+    def _share(self, name):
+        def dispatch(cb, **kwargs):
+            cb(**kwargs)
+            self.ran[name].set()
+        return ArloTimerShare(self.wheel, dispatch)
+
+    def test_dispatch(self):
+        one, two = self._share("one"), self._share("two")
+        one.timer(lambda: None).arm(0.01)
+        self.assertTrue(self.ran["one"].wait(5))
+        self.assertFalse(self.ran["two"].is_set())
+        two.timer(lambda: None).arm(0.01)
+        self.assertTrue(self.ran["two"].wait(5))
+        self.assertEqual(len(self.wheel.threads), 1)
+        self.assertEqual(one.threads, [])
+
+    def test_stop(self):
+        one, two = self._share("one"), self._share("two")
+        timer = one.timer(lambda: None)
+        timer.arm(0.05)
+        two.timer(lambda: None).arm(0.05)
+        self.assertEqual((one.armed, two.armed), (1, 1))
+        one.stop()
+        self.assertEqual((one.armed, self.wheel.armed), (0, 1))
+        timer.arm(0.01)
+        self.assertFalse(timer.armed)
+        self.assertTrue(self.ran["two"].wait(5))
+        self.assertFalse(self.ran["one"].is_set())
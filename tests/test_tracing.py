@@ -0,0 +1,52 @@
+import time
+from unittest import TestCase
+
+from pyaarlo.tracing import ArloTracer, server_time
+
+
+class TestServerTime(TestCase):
+    def test_trans_id(self):
+        packet = {"resource": "cameras/1234", "transId": "1234!c87fdfa6!1675735611287"}
+        self.assertEqual(server_time(packet), 1675735611.287)
+
+    def test_active_automations(self):
+        packet = {"resource": "activeAutomations", "1234": {"activeModes": ["mode1"], "timestamp": 1568142116238}}
+        self.assertEqual(server_time(packet), 1568142116.238)
+
+    def test_none(self):
+        self.assertIsNone(server_time({"transId": "web!33c2027d-9b96-4a9f-9b41-aaf412082e80"}))
+
+
+class TestArloTracer(TestCase):
+    def test_disabled(self):
+        tracer = ArloTracer()
+        trace = tracer.receive()
+        self.assertIsNone(trace)
+        tracer.dispatch(trace, {})
+        with tracer.attach(trace):
+            tracer.mark("storage")
+        self.assertEqual(tracer.stats(), {"skew": None, "stages": {}})
+
+    def test_stages(self):
+        tracer = ArloTracer(enabled=True)
+        trace = tracer.receive()
+        tracer.dispatch(trace, {"resource": "cameras/1234"})
+        with tracer.attach(trace):
+            tracer.mark("storage")
+            tracer.mark("callback")
+        tracer.mark("callback")
+        stages = tracer.stats()["stages"]
+        self.assertEqual(sorted(stages), ["callback", "dispatch", "queue", "storage"])
+        self.assertEqual(stages["callback"]["count"], 1)
+        self.assertEqual(sum(count for _, count in stages["queue"]["buckets"]), 1)
+
+    def test_skew(self):
+        tracer = ArloTracer(enabled=True)
+        now = int(time.time() * 1000)
+        # Our clock looks 2s ahead, then a packet is 0.5s late.
+        tracer.dispatch(tracer.receive(), {"transId": f"1234!abcd!{now - 2000}"})
+        tracer.dispatch(tracer.receive(), {"transId": f"1234!abcd!{now - 2500}"})
+        self.assertAlmostEqual(tracer.skew, 2, delta=0.1)
+        network = tracer.stats()["stages"]["network"]
+        self.assertEqual(network["count"], 2)
+        self.assertAlmostEqual(network["sum"], 0.5, delta=0.1)
@@ -0,0 +1,42 @@
+import tempfile
+from unittest import TestCase
+
+import tests.arlo
+from pyaarlo.warmstart import ArloWarmStart
+
+
+class MediaLibrary(object):
+    def raw(self):
+        return [{"deviceId": "1234", "contentType": "video/mp4"}]
+
+
+class PyArlo(tests.arlo.PyArlo):
+    devices = [{"deviceId": "1234", "deviceName": "camera", "deviceType": "camera"}]
+    location_data = {"userLocations": [{"locationId": "abcd"}]}
+    ml = MediaLibrary()
+
+
+class TestArloWarmStart(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_save_load(self):
+        arlo = PyArlo(storage_dir=self.dir.name, warm_start=True, username="user")
+        ArloWarmStart(arlo).save()
+        snapshot = ArloWarmStart(arlo).load()
+        self.assertEqual(snapshot["devices"], arlo.devices)
+        self.assertEqual(snapshot["locations"], arlo.location_data)
+        self.assertEqual(snapshot["library"], arlo.ml.raw())
+
+    def test_disabled(self):
+        arlo = PyArlo(storage_dir=self.dir.name, username="user")
+        ArloWarmStart(arlo).save()
+        self.assertIsNone(ArloWarmStart(arlo).load())
+
+    def test_other_user(self):
+        ArloWarmStart(PyArlo(storage_dir=self.dir.name, warm_start=True, username="user")).save()
+        arlo = PyArlo(storage_dir=self.dir.name, warm_start=True, username="other")
+        self.assertIsNone(ArloWarmStart(arlo).load())